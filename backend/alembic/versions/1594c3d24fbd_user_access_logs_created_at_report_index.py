@@ -0,0 +1,61 @@
+"""user_access_logs に報告書期間集計用インデックスを追加
+
+PostgreSQLでは集計列を INCLUDE したカバリングインデックスとし、書き込みを止めないよう CONCURRENTLY で作成する
+集計列が揃っていない旧定義のインデックスが残っている場合は作り直す
+
+Revision ID: 1594c3d24fbd
+Revises: 97f9ac2828da
+Create Date: 2026-10-17 14:50:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1594c3d24fbd'
+down_revision = '97f9ac2828da'
+branch_labels = None
+depends_on = None
+
+TABLE_NAME = "user_access_logs"
+INDEX_NAME = "ix_user_access_logs_created_at_report"
+INCLUDE_COLUMNS = ("success", "user_id", "ip_address", "action")
+
+
+def _postgresql_index_definition():
+    return op.get_bind().execute(
+        sa.text("SELECT indexdef FROM pg_indexes WHERE tablename = :table AND indexname = :index"),
+        {"table": TABLE_NAME, "index": INDEX_NAME}
+    ).scalar()
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        inspector = sa.inspect(op.get_bind())
+        if INDEX_NAME not in {ix["name"] for ix in inspector.get_indexes(TABLE_NAME)}:
+            op.create_index(INDEX_NAME, TABLE_NAME, ["created_at"])
+        return
+    
+    include = ", ".join(INCLUDE_COLUMNS)
+    definition = _postgresql_index_definition()
+    if definition and f"INCLUDE ({include})" in definition:
+        return
+    
+    # CREATE/DROP INDEX CONCURRENTLY はトランザクション外で実行する
+    with op.get_context().autocommit_block():
+        if definition:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY {INDEX_NAME} "
+            f"ON {TABLE_NAME} (created_at) INCLUDE ({include})"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        op.drop_index(INDEX_NAME, table_name=TABLE_NAME)
+        return
+    
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
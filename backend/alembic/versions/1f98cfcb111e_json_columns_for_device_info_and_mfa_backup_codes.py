@@ -0,0 +1,64 @@
+"""user_sessions.device_info・users.mfa_backup_codes をJSON型に変更
+
+PostgreSQLでは TEXT に保存済みのJSON文字列を jsonb に変換する（空文字はNULL扱い）
+SQLiteのJSON型は TEXT として保存されるため、既存データはそのまま読み込める
+
+Revision ID: 1f98cfcb111e
+Revises: 880dfab4c640
+Create Date: 2026-10-17 09:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '1f98cfcb111e'
+down_revision = '880dfab4c640'
+branch_labels = None
+depends_on = None
+
+# (テーブル名, 列名, コメント)
+JSON_COLUMNS = (
+    ("users", "mfa_backup_codes", "MFAバックアップコード（ハッシュ値の配列）"),
+    ("user_sessions", "device_info", "デバイス情報"),
+)
+
+
+def _column_types(table_name: str) -> dict:
+    inspector = sa.inspect(op.get_bind())
+    return {c["name"]: c["type"] for c in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    
+    for table_name, column_name, comment in JSON_COLUMNS:
+        # create_all で作成済みの環境では既に jsonb
+        if isinstance(_column_types(table_name)[column_name], postgresql.JSONB):
+            continue
+        op.alter_column(
+            table_name,
+            column_name,
+            type_=postgresql.JSONB(),
+            existing_type=sa.Text(),
+            existing_comment=comment,
+            postgresql_using=f"NULLIF({column_name}, '')::jsonb"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    
+    for table_name, column_name, comment in JSON_COLUMNS:
+        op.alter_column(
+            table_name,
+            column_name,
+            type_=sa.Text(),
+            existing_type=postgresql.JSONB(),
+            existing_comment=comment,
+            postgresql_using=f"{column_name}::text"
+        )
@@ -0,0 +1,40 @@
+"""user_sessions.session_token_hash 追加
+
+アクセストークンのSHA-256ハッシュによるセッション検索用
+既存セッションは先頭50文字しか保存していないためハッシュは補完できない（NULLのまま）
+ログアウト時はハッシュ未設定のセッションのみ従来のトークン先頭一致で照合する
+
+Revision ID: 880dfab4c640
+Revises: 9e38529195de
+Create Date: 2026-10-17 09:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '880dfab4c640'
+down_revision = '9e38529195de'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # create_all で作成済みの環境では列が既に存在する
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("user_sessions")}
+    if "session_token_hash" in columns:
+        return
+    
+    op.add_column(
+        "user_sessions",
+        sa.Column("session_token_hash", sa.LargeBinary(32), nullable=True, comment="アクセストークンのSHA-256ハッシュ（検索用）")
+    )
+    op.create_index(
+        "ix_user_sessions_session_token_hash", "user_sessions", ["session_token_hash"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_sessions_session_token_hash", table_name="user_sessions")
+    op.drop_column("user_sessions", "session_token_hash")
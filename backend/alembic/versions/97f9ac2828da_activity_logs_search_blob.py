@@ -0,0 +1,82 @@
+"""activity_logs.search_blob（部分一致検索用の生成列）を追加
+
+操作内容・IPアドレスを連結したSTORED生成列と、PostgreSQLではトライグラムインデックスを作成する
+init.sql・create_all で作成済みの環境では何もしない
+SQLiteは ALTER TABLE で STORED 生成列を追加できないため、テーブルを再作成する
+
+Revision ID: 97f9ac2828da
+Revises: b451d4ffba23
+Create Date: 2026-10-17 14:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '97f9ac2828da'
+down_revision = 'b451d4ffba23'
+branch_labels = None
+depends_on = None
+
+TABLE_NAME = "activity_logs"
+COLUMN_NAME = "search_blob"
+INDEX_NAME = "idx_activity_logs_search_blob_trgm"
+
+
+def _column_types() -> dict:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(TABLE_NAME):
+        return {}
+    return {c["name"]: c["type"] for c in inspector.get_columns(TABLE_NAME)}
+
+
+def _search_blob_expression(ip_address_type) -> str:
+    # init.sql 由来の環境では ip_address が INET のため文字列に変換して連結する
+    ip_address = "host(ip_address)" if isinstance(ip_address_type, postgresql.INET) else "ip_address"
+    return f"coalesce(description, '') || ' ' || coalesce({ip_address}, '')"
+
+
+def upgrade() -> None:
+    columns = _column_types()
+    if not columns or COLUMN_NAME in columns:
+        return
+    
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            f"ALTER TABLE {TABLE_NAME} ADD COLUMN {COLUMN_NAME} TEXT "
+            f"GENERATED ALWAYS AS ({_search_blob_expression(columns['ip_address'])}) STORED"
+        )
+        op.execute(f"COMMENT ON COLUMN {TABLE_NAME}.{COLUMN_NAME} IS '部分一致検索用連結文字列'")
+        
+        # 書き込みを止めないよう CONCURRENTLY で作成する（トランザクション外で実行）
+        with op.get_context().autocommit_block():
+            op.execute('CREATE EXTENSION IF NOT EXISTS "pg_trgm"')
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+                f"ON {TABLE_NAME} USING gin ({COLUMN_NAME} gin_trgm_ops)"
+            )
+        return
+    
+    with op.batch_alter_table(TABLE_NAME, recreate="always") as batch_op:
+        batch_op.add_column(sa.Column(
+            COLUMN_NAME,
+            sa.Text(),
+            sa.Computed(_search_blob_expression(columns["ip_address"]), persisted=True),
+            comment="部分一致検索用連結文字列"
+        ))
+
+
+def downgrade() -> None:
+    if COLUMN_NAME not in _column_types():
+        return
+    
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+        op.drop_column(TABLE_NAME, COLUMN_NAME)
+        return
+    
+    with op.batch_alter_table(TABLE_NAME, recreate="always") as batch_op:
+        batch_op.drop_column(COLUMN_NAME)
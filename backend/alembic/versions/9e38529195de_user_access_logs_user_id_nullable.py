@@ -0,0 +1,29 @@
+"""user_access_logs.user_id をNULL許可に変更
+
+認証失敗（ユーザー不明）・GDPR匿名化時のアクセスログは user_id を持たないため
+
+Revision ID: 9e38529195de
+Revises: 
+Create Date: 2026-10-17 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e38529195de'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("user_access_logs") as batch_op:
+        batch_op.alter_column("user_id", existing_type=sa.Integer(), nullable=True)
+
+
+def downgrade() -> None:
+    # 監査ログは削除しない。user_id がNULLの行が残っている場合は失敗する
+    with op.batch_alter_table("user_access_logs") as batch_op:
+        batch_op.alter_column("user_id", existing_type=sa.Integer(), nullable=False)
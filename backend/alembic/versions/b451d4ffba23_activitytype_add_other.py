@@ -0,0 +1,39 @@
+"""アクティビティ種別に OTHER（その他）を追加
+
+create_all で作成したPostgreSQLでは activity_type 列がネイティブ列挙型 activitytype のため値を追加する
+init.sql で作成した環境（VARCHAR）やSQLite（CHECK制約なし）では変更不要
+
+Revision ID: b451d4ffba23
+Revises: 1f98cfcb111e
+Create Date: 2026-10-17 14:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b451d4ffba23'
+down_revision = '1f98cfcb111e'
+branch_labels = None
+depends_on = None
+
+
+def _has_activitytype_enum() -> bool:
+    return bool(op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_type WHERE typname = 'activitytype'")
+    ).scalar())
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql" or not _has_activitytype_enum():
+        return
+    
+    # ALTER TYPE ... ADD VALUE はトランザクション外で実行する
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE activitytype ADD VALUE IF NOT EXISTS 'OTHER'")
+
+
+def downgrade() -> None:
+    # PostgreSQLは列挙型の値を削除できないため、OTHER の行を別種別へ寄せることもしない
+    pass
@@ -4,6 +4,7 @@
 from datetime import datetime, timedelta
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
@@ -47,7 +48,7 @@ async def get_current_user(
                 detail="無効なトークンです"
             )
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -191,7 +192,7 @@ async def get_current_user_info(
     """
     
     # 権限一覧を取得
-    permissions = await auth_service.get_user_permissions(current_user.id, db)
+    permissions = await auth_service.get_user_permissions(current_user, db)
     
     user_detail = UserDetail.from_orm(current_user)
     user_detail.permissions = permissions
@@ -233,14 +234,14 @@ async def change_password(
     """
     
     # 現在のパスワードを確認
-    if not security.verify_password(password_data.current_password, current_user.hashed_password):
+    if not await security.verify_password_async(password_data.current_password, current_user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="現在のパスワードが正しくありません"
         )
     
     # パスワード更新
-    current_user.hashed_password = security.hash_password(password_data.new_password)
+    current_user.hashed_password = await security.hash_password_async(password_data.new_password)
     db.commit()
     
     # アクセスログ記録
@@ -393,14 +394,14 @@ async def get_user(
     指定ユーザーの詳細情報取得（管理者権限必要）
     """
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="ユーザーが見つかりません"
         )
     
-    permissions = await auth_service.get_user_permissions(user.id, db)
+    permissions = await auth_service.get_user_permissions(user, db)
     
     user_detail = UserDetail.from_orm(user)
     user_detail.permissions = permissions
@@ -447,7 +448,12 @@ async def initialize_permissions(
 # アクセスログエンドポイント
 # ===================
 
-@router.get("/logs/access", response_model=AccessLogListResponse, summary="アクセスログ一覧")
+@router.get(
+    "/logs/access",
+    response_model=None,
+    responses={200: {"model": AccessLogListResponse}},
+    summary="アクセスログ一覧"
+)
 async def get_access_logs(
     page: int = 1,
     limit: int = 50,
@@ -459,13 +465,20 @@ async def get_access_logs(
 ):
     """
     アクセスログ一覧を取得（管理者権限必要）
+    件数が多くなるため、レスポンスモデルの再検証を省き必要な列のみ辞書で返す
     """
     
     from app.models.user import UserAccessLog
     from sqlalchemy import and_, desc
     
     # クエリ構築
-    query = db.query(UserAccessLog)
+    query = db.query(
+        UserAccessLog.id,
+        UserAccessLog.action,
+        UserAccessLog.ip_address,
+        UserAccessLog.success,
+        UserAccessLog.created_at
+    )
     
     conditions = []
     if user_id:
@@ -482,10 +495,18 @@ async def get_access_logs(
     total = query.count()
     logs = query.order_by(desc(UserAccessLog.created_at)).offset((page - 1) * limit).limit(limit).all()
     
-    from app.schemas.auth import AccessLogSummary
-    return AccessLogListResponse(
-        logs=[AccessLogSummary.from_orm(log) for log in logs],
-        total=total,
-        page=page,
-        limit=limit
-    )
\ No newline at end of file
+    return JSONResponse(content={
+        "logs": [
+            {
+                "id": log.id,
+                "action": log.action,
+                "ip_address": log.ip_address,
+                "success": log.success,
+                "created_at": log.created_at.isoformat() if log.created_at else None
+            }
+            for log in logs
+        ],
+        "total": total,
+        "page": page,
+        "limit": limit
+    })
\ No newline at end of file
@@ -103,7 +103,7 @@ async def get_security_metrics(
     # 信頼デバイス数
     trusted_devices = db.query(UserSession).filter(
         UserSession.user_id == current_user.id,
-        UserSession.device_info.contains('"trusted": true')
+        UserSession.device_info["trusted"].as_boolean() == True
     ).count()
     
     # 最近の失敗ログイン数（過去24時間）
@@ -383,7 +383,7 @@ async def set_device_trust(
         )
     
     # デバイス情報更新
-    device_info = session.device_info or {}
+    device_info = dict(session.device_info or {})
     device_info["trusted"] = request_data.trusted
     session.device_info = device_info
     
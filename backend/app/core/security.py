@@ -2,18 +2,24 @@
 # Phase 21対応・MLMビジネス要件準拠
 
 import os
+import asyncio
+import functools
+import multiprocessing
 import secrets
 import hashlib
+import hmac
 import pyotp
 import qrcode
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List, Tuple
 from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
 from base64 import b64encode, b64decode
 
 import jwt
 from passlib.context import CryptContext
 from passlib.hash import bcrypt
+from sqlalchemy import case, literal
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 
@@ -25,7 +31,21 @@ from app.schemas.auth import LoginRequest, LoginResponse, UserSummary
 # ===================
 
 # パスワードハッシュ化設定
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 新規ハッシュはArgon2id（m=46MiB）、既存のbcryptハッシュは検証のみ行いログイン時に再ハッシュ
+# ARGON2_* / BCRYPT_ROUNDS はテストスクリプト専用の調整値
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", str(46 * 1024)))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "1"))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__time_cost=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+    bcrypt__rounds=BCRYPT_ROUNDS
+)
 
 # JWT設定
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
@@ -38,6 +58,102 @@ MAX_LOGIN_ATTEMPTS = 5
 LOCKOUT_DURATION_MINUTES = 30
 SESSION_CLEANUP_DAYS = 30
 
+# パスワードハッシュ計算用プロセスプール（GILによる直列化を避けるため、アプリ起動時に生成）
+# Argon2は1ワーカーあたり ARGON2_MEMORY_COST を消費するため、ワーカー数は小さく上限を設ける
+# 監査ログ書き込みスレッド等が動くプロセスをforkしないよう、forkserver（非対応環境ではspawn）で起動する
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(os.cpu_count() or 1, 2))))
+_HASH_POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+def start_hash_pool() -> ProcessPoolExecutor:
+    """プロセスプール生成（アプリケーション起動時、スクリプト等では初回利用時）"""
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context(_HASH_POOL_START_METHOD)
+        )
+    return _hash_pool
+
+def shutdown_hash_pool():
+    """プロセスプール停止（アプリケーション終了時）"""
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=True)
+        _hash_pool = None
+
+def _get_hash_pool() -> ProcessPoolExecutor:
+    return start_hash_pool()
+
+def _hash_password_sync(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def _verify_and_update_sync(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+class _PlainTextHasher:
+    """テスト専用ハッシャー（平文比較・本番使用禁止）"""
+    
+    PREFIX = "plain:"
+    
+    def hash(self, password: str) -> str:
+        return f"{self.PREFIX}{password}"
+    
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return hmac.compare_digest(self.hash(plain_password), hashed_password)
+
+# デバイス情報の解析結果キャッシュ（ユーザーエージェント文字列の種類は少ないため）
+# 上限を超える長さのユーザーエージェントはメモリ保護のためキャッシュしない
+DEVICE_INFO_CACHE_MAX_UA_LENGTH = 512
+
+@functools.lru_cache(maxsize=4096)
+def _parse_device_info(user_agent: Optional[str]) -> Dict[str, Any]:
+    # 簡易的なデバイス情報抽出（実際はより詳細な解析が必要）
+    device_info = {
+        "user_agent": user_agent,
+        "browser": "unknown",
+        "os": "unknown",
+        "device": "unknown"
+    }
+    
+    if user_agent:
+        user_agent_lower = user_agent.lower()
+        
+        # ブラウザ判定
+        if "chrome" in user_agent_lower:
+            device_info["browser"] = "Chrome"
+        elif "firefox" in user_agent_lower:
+            device_info["browser"] = "Firefox"
+        elif "safari" in user_agent_lower:
+            device_info["browser"] = "Safari"
+        elif "edge" in user_agent_lower:
+            device_info["browser"] = "Edge"
+        
+        # OS判定
+        if "windows" in user_agent_lower:
+            device_info["os"] = "Windows"
+        elif "mac" in user_agent_lower:
+            device_info["os"] = "macOS"
+        elif "linux" in user_agent_lower:
+            device_info["os"] = "Linux"
+        elif "android" in user_agent_lower:
+            device_info["os"] = "Android"
+        elif "ios" in user_agent_lower:
+            device_info["os"] = "iOS"
+        
+        # デバイス判定
+        if any(mobile in user_agent_lower for mobile in ["mobile", "android", "iphone"]):
+            device_info["device"] = "Mobile"
+        elif "tablet" in user_agent_lower or "ipad" in user_agent_lower:
+            device_info["device"] = "Tablet"
+        else:
+            device_info["device"] = "Desktop"
+    
+    return device_info
+
 class SecurityManager:
     """セキュリティ管理クラス"""
     
@@ -56,6 +172,34 @@ class SecurityManager:
         """パスワードを検証"""
         return self.pwd_context.verify(plain_password, hashed_password)
     
+    async def hash_password_async(self, password: str) -> str:
+        """パスワードをハッシュ化（プロセスプールで実行しイベントループをブロックしない）"""
+        if self.pwd_context is not pwd_context:
+            return self.hash_password(password)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_pool(), _hash_password_sync, password)
+    
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """パスワードを検証（プロセスプールで実行しイベントループをブロックしない）"""
+        if self.pwd_context is not pwd_context:
+            return self.verify_password(plain_password, hashed_password)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_pool(), _verify_password_sync, plain_password, hashed_password)
+    
+    async def verify_and_update_password_async(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        パスワードを検証し、旧方式・旧パラメータのハッシュなら新しいハッシュも返す
+        戻り値: (検証結果, 再ハッシュ値 or None)
+        """
+        if self.pwd_context is not pwd_context:
+            return self.verify_password(plain_password, hashed_password), None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_pool(), _verify_and_update_sync, plain_password, hashed_password)
+    
+    def use_test_hasher(self):
+        """パスワードハッシャーを平文比較ハッシャーに置き換え（スモークテスト専用）"""
+        self.pwd_context = _PlainTextHasher()
+    
     def generate_secure_password(self, length: int = 16) -> str:
         """安全なパスワードを生成"""
         alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789!@#$%^&*"
@@ -176,9 +320,9 @@ class SecurityManager:
         """バックアップコードを検証"""
         code_hash = hashlib.sha256(code.encode()).hexdigest()
         
-        if code_hash in hashed_codes:
-            # 使用済みコードを削除
-            updated_codes = [c for c in hashed_codes if c != code_hash]
+        # 照合と使用済みコードの削除を1回の走査で行う
+        updated_codes = [c for c in hashed_codes if c != code_hash]
+        if len(updated_codes) < len(hashed_codes):
             return True, updated_codes
         
         return False, hashed_codes
@@ -191,50 +335,15 @@ class SecurityManager:
         """セッショントークンを生成"""
         return secrets.token_urlsafe(32)
     
+    def hash_session_token(self, token: str) -> bytes:
+        """トークンの検索用ハッシュ（SHA-256、32バイト）"""
+        return hashlib.sha256(token.encode()).digest()
+    
     def extract_device_info(self, user_agent: str) -> Dict[str, Any]:
         """ユーザーエージェントからデバイス情報を抽出"""
-        # 簡易的なデバイス情報抽出（実際はより詳細な解析が必要）
-        device_info = {
-            "user_agent": user_agent,
-            "browser": "unknown",
-            "os": "unknown",
-            "device": "unknown"
-        }
-        
-        if user_agent:
-            user_agent_lower = user_agent.lower()
-            
-            # ブラウザ判定
-            if "chrome" in user_agent_lower:
-                device_info["browser"] = "Chrome"
-            elif "firefox" in user_agent_lower:
-                device_info["browser"] = "Firefox"
-            elif "safari" in user_agent_lower:
-                device_info["browser"] = "Safari"
-            elif "edge" in user_agent_lower:
-                device_info["browser"] = "Edge"
-            
-            # OS判定
-            if "windows" in user_agent_lower:
-                device_info["os"] = "Windows"
-            elif "mac" in user_agent_lower:
-                device_info["os"] = "macOS"
-            elif "linux" in user_agent_lower:
-                device_info["os"] = "Linux"
-            elif "android" in user_agent_lower:
-                device_info["os"] = "Android"
-            elif "ios" in user_agent_lower:
-                device_info["os"] = "iOS"
-            
-            # デバイス判定
-            if any(mobile in user_agent_lower for mobile in ["mobile", "android", "iphone"]):
-                device_info["device"] = "Mobile"
-            elif "tablet" in user_agent_lower or "ipad" in user_agent_lower:
-                device_info["device"] = "Tablet"
-            else:
-                device_info["device"] = "Desktop"
-        
-        return device_info
+        if user_agent and len(user_agent) > DEVICE_INFO_CACHE_MAX_UA_LENGTH:
+            return _parse_device_info.__wrapped__(user_agent)
+        return dict(_parse_device_info(user_agent))
     
     # ===================
     # セキュリティ検証
@@ -255,19 +364,23 @@ class SecurityManager:
         return user.login_attempts >= MAX_LOGIN_ATTEMPTS
     
     def reset_login_attempts(self, user: User, db: Session):
-        """ログイン試行回数をリセット"""
+        """ログイン試行回数をリセット（リセット対象がない大半のログインでは書き込まない）"""
+        if not user.login_attempts and user.locked_at is None:
+            return
         user.login_attempts = 0
         user.locked_at = None
         db.commit()
     
     def increment_login_attempts(self, user: User, db: Session):
-        """ログイン試行回数を増加"""
-        user.login_attempts += 1
-        
-        if self.should_lock_account(user):
-            user.locked_at = datetime.utcnow()
-            user.status = UserStatus.LOCKED
-        
+        """
+        ログイン試行回数を増加
+        同時ログイン失敗でも取りこぼさないようDB側で加算し、
+        ロック判定も同じUPDATE文の中で行う（1回の書き込みで完結）
+        """
+        reaches_limit = User.login_attempts + 1 >= MAX_LOGIN_ATTEMPTS
+        user.login_attempts = User.login_attempts + 1
+        user.locked_at = case((reaches_limit, datetime.utcnow()), else_=User.locked_at)
+        user.status = case((reaches_limit, literal(UserStatus.LOCKED, User.status.type)), else_=User.status)
         db.commit()
     
     def validate_ip_address(self, ip: str) -> bool:
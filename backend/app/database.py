@@ -5,7 +5,7 @@ PostgreSQL 15+ + SQLAlchemy 2.0 を使用
 Alembicマイグレーション対応
 """
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
@@ -15,24 +15,45 @@ from typing import Generator
 # 環境変数からデータベース接続情報を取得（開発時はSQLiteを使用）
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./iroas_boss_v2.db")
 
+# コンパイル済みSQLのキャッシュサイズ（頻出クエリの再コンパイルを避ける）
+QUERY_CACHE_SIZE = int(os.getenv("SQL_QUERY_CACHE_SIZE", "1200"))
+
 # SQLAlchemy エンジン作成
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
         DATABASE_URL,
         echo=os.getenv("SQL_ECHO", "false").lower() == "true",
+        query_cache_size=QUERY_CACHE_SIZE,
         poolclass=StaticPool,
         connect_args={"check_same_thread": False}
     )
+
+    # テストスクリプト専用: WAL + synchronous=NORMAL でコミット時のfsyncを削減する
+    # 電源断時に直近のコミットが失われ得るため、通常のアプリケーションでは有効にしない
+    if os.getenv("SQLITE_FAST_WRITES", "false").lower() == "true":
+        @event.listens_for(engine, "connect")
+        def _set_sqlite_pragma(dbapi_connection, connection_record):
+            """SQLite接続設定（WALモードでコミット時のfsyncを削減）"""
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.close()
 else:
     engine = create_engine(
         DATABASE_URL,
         echo=os.getenv("SQL_ECHO", "false").lower() == "true",  # SQL出力設定
+        query_cache_size=QUERY_CACHE_SIZE,
         pool_size=10,
         max_overflow=20,
         pool_pre_ping=True,  # 接続確認
         pool_recycle=3600,   # 1時間で接続をリサイクル
     )
 
+# SQLite（StaticPool）では全セッションが1本の接続を共有する
+# 別スレッドでのコミット・ロールバックが処理中の他セッションに波及するため、
+# バックグラウンドでの書き込みや並行集計はこのフラグが立っている場合は行わない
+SHARED_CONNECTION = isinstance(engine.pool, StaticPool)
+
 # セッション設定
 SessionLocal = sessionmaker(
     autocommit=False,
@@ -1,18 +1,24 @@
 # IROAS BOSS V2 - FastAPIメインアプリケーション
 # Phase 21対応・認証セキュリティ統合
 
+import asyncio
 import logging
+from contextlib import suppress
 from datetime import datetime
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.api.endpoints import auth, security
 from app.database import Base, engine, SessionLocal
+from app.core.security import start_hash_pool, shutdown_hash_pool
 from app.middleware.rate_limit_middleware import RateLimitMiddleware, SecurityHeaders
 from app.services.permission_service import permission_service
+from app.services.audit_service import audit_log_buffer
+from app.services.activity_service import activity_log_buffer, activity_log_partition_maintenance
 
 # ロギング設定
 logging.basicConfig(
@@ -37,6 +43,9 @@ async def lifespan(app: FastAPI):
     # 起動時処理
     logger.info("IROAS BOSS V2 アプリケーションを開始しています...")
     
+    # パスワードハッシュ用プロセスプール生成（スレッド起動前に行う）
+    start_hash_pool()
+    
     # データベーステーブル作成
     Base.metadata.create_all(bind=engine)
     logger.info("データベーステーブルを初期化しました")
@@ -51,12 +60,25 @@ async def lifespan(app: FastAPI):
     finally:
         db.close()
     
+    # 監査ログ・アクティビティログの一括書き込み開始
+    audit_log_buffer.start()
+    activity_log_buffer.start()
+    
+    # アクティビティログ月別パーティションの事前作成（起動時・定期）
+    partition_task = asyncio.create_task(activity_log_partition_maintenance())
+    
     logger.info("IROAS BOSS V2 アプリケーションが正常に開始されました")
     
     yield
     
     # 終了時処理
     logger.info("IROAS BOSS V2 アプリケーションを終了します...")
+    partition_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await partition_task
+    await activity_log_buffer.stop()
+    await audit_log_buffer.stop()
+    await run_in_threadpool(shutdown_hash_pool)
 
 # FastAPIアプリケーション作成
 app = FastAPI(
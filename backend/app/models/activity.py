@@ -10,7 +10,7 @@
 from datetime import datetime
 from enum import Enum
 from typing import Optional, Dict, Any
-from sqlalchemy import Column, Integer, String, DateTime, Text, Enum as SQLEnum, JSON, Boolean
+from sqlalchemy import Column, Computed, Integer, String, DateTime, Text, Enum as SQLEnum, JSON, Boolean
 from app.database import Base
 
 
@@ -48,6 +48,9 @@ class ActivityType(str, Enum):
     SYSTEM_LOGIN = "ログイン"
     SYSTEM_LOGOUT = "ログアウト"
     SYSTEM_SETTING_UPDATE = "システム設定更新"
+    
+    # その他（上記に該当しない参照・保守操作）
+    OTHER = "その他"
 
 
 class ActivityLevel(str, Enum):
@@ -94,6 +97,13 @@ class ActivityLog(Base):
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True, comment="実行日時")
     session_id = Column(String(100), nullable=True, comment="セッションID")
     
+    # 検索用（操作内容・IPアドレスを連結した生成列。トライグラムインデックス1本で部分一致検索）
+    search_blob = Column(
+        Text,
+        Computed("coalesce(description, '') || ' ' || coalesce(ip_address, '')", persisted=True),
+        comment="部分一致検索用連結文字列"
+    )
+    
     def __repr__(self) -> str:
         return f"<ActivityLog(id={self.id}, type={self.activity_type}, user={self.user_name})>"
     
@@ -149,6 +159,9 @@ class ActivityLog(Base):
             ActivityType.SYSTEM_LOGIN: "login",
             ActivityType.SYSTEM_LOGOUT: "logout",
             ActivityType.SYSTEM_SETTING_UPDATE: "settings",
+            
+            # その他
+            ActivityType.OTHER: "info",
         }
         return icon_map.get(self.activity_type, "info")
     
@@ -5,7 +5,8 @@ from datetime import datetime
 from typing import Optional, List
 from enum import Enum
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, Text, ForeignKey, Index, JSON, LargeBinary, UniqueConstraint, Enum as SQLEnum
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -61,7 +62,7 @@ class User(Base):
     # 多要素認証
     mfa_enabled = Column(Boolean, default=False, comment="MFA有効")
     mfa_secret = Column(String(255), comment="MFA秘密鍵")
-    mfa_backup_codes = Column(Text, comment="MFAバックアップコード（JSON形式）")
+    mfa_backup_codes = Column(JSON().with_variant(JSONB, "postgresql"), comment="MFAバックアップコード（ハッシュ値の配列）")
     
     # タイムスタンプ
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="作成日時")
@@ -78,9 +79,16 @@ class UserAccessLog(Base):
     """ユーザーアクセスログモデル"""
     
     __tablename__ = "user_access_logs"
+    __table_args__ = (
+        # 報告書の期間集計用（PostgreSQLでは集計列を含めインデックスオンリースキャン）
+        Index(
+            "ix_user_access_logs_created_at_report", "created_at",
+            postgresql_include=["success", "user_id", "ip_address", "action"]
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, comment="ユーザーID")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, comment="ユーザーID（認証失敗・匿名化時はNULL）")
     
     # アクセス情報
     action = Column(String(50), nullable=False, comment="アクション")
@@ -105,6 +113,30 @@ class UserAccessLog(Base):
     def __repr__(self):
         return f"<UserAccessLog(user_id={self.user_id}, action='{self.action}', success={self.success})>"
 
+class AuditHourlyStat(Base):
+    """監査ログ時間別集計モデル（コンプライアンス報告書用ロールアップ）"""
+    
+    __tablename__ = "audit_hourly_stats"
+    __table_args__ = (
+        UniqueConstraint("day", "hour", "user_id", "ip_address", "action", "success", name="uq_audit_hourly_stats_dims"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # 集計単位
+    day = Column(Date, nullable=False, comment="日付（UTC）")
+    hour = Column(Integer, nullable=False, comment="時（UTC）")
+    user_id = Column(Integer, nullable=False, default=0, comment="ユーザーID（不明時は0）")
+    ip_address = Column(String(45), nullable=False, default="", comment="IPアドレス（不明時は空文字）")
+    action = Column(String(50), nullable=False, comment="アクション")
+    success = Column(Boolean, nullable=False, comment="成功フラグ")
+    
+    # 集計値
+    count = Column(Integer, nullable=False, default=0, comment="件数")
+    
+    def __repr__(self):
+        return f"<AuditHourlyStat(day={self.day}, hour={self.hour}, action='{self.action}', count={self.count})>"
+
 class UserSession(Base):
     """ユーザーセッション管理モデル"""
     
@@ -115,13 +147,14 @@ class UserSession(Base):
     
     # セッション情報
     session_token = Column(String(255), unique=True, index=True, nullable=False, comment="セッショントークン")
+    session_token_hash = Column(LargeBinary(32), unique=True, index=True, comment="アクセストークンのSHA-256ハッシュ（検索用）")
     refresh_token = Column(String(255), unique=True, index=True, comment="リフレッシュトークン")
     jti = Column(String(255), unique=True, index=True, comment="JWT ID")
     
     # セッション詳細
     ip_address = Column(String(45), comment="IPアドレス")
     user_agent = Column(Text, comment="ユーザーエージェント")
-    device_info = Column(Text, comment="デバイス情報（JSON形式）")
+    device_info = Column(JSON().with_variant(JSONB, "postgresql"), comment="デバイス情報")
     
     # 有効期限
     expires_at = Column(DateTime(timezone=True), nullable=False, comment="有効期限")
@@ -51,6 +51,9 @@ class ActivityTypeEnum(str, Enum):
     SYSTEM_LOGIN = "ログイン"
     SYSTEM_LOGOUT = "ログアウト"
     SYSTEM_SETTING_UPDATE = "システム設定更新"
+    
+    # その他
+    OTHER = "その他"
 
 
 class ActivityLevelEnum(str, Enum):
@@ -99,11 +102,57 @@ class ActivityLogResponse(BaseModel):
     formatted_created_at: str = Field(description="フォーマット済み実行日時")
     level_badge_class: str = Field(description="レベル別バッジクラス")
     activity_icon: str = Field(description="アクティビティ種別アイコン")
+    activity_level_color: str = Field(description="重要度レベル別の表示色")
+    time_ago: str = Field(description="経過時間表記（例: 5分前）")
     
     class Config:
         from_attributes = True
 
 
+class ActivityLogListResponse(BaseModel):
+    """
+    アクティビティログ一覧レスポンススキーマ
+    API 6.1: GET /api/activity/logs
+    """
+    logs: List[ActivityLogResponse] = Field(description="ログ一覧")
+    total_count: Optional[int] = Field(default=None, description="総件数（カーソル方式では省略）")
+    page: int = Field(description="ページ番号")
+    per_page: int = Field(description="1ページあたりの件数")
+    total_pages: Optional[int] = Field(default=None, description="総ページ数（カーソル方式では省略）")
+    has_next: bool = Field(description="次ページの有無")
+    has_previous: bool = Field(description="前ページの有無")
+    next_cursor: Optional[str] = Field(default=None, description="次ページ取得用カーソル")
+
+
+class ActivityLogFilterResponse(BaseModel):
+    """
+    アクティビティログ検索レスポンススキーマ
+    API 6.2: GET /api/activity/logs/filter
+    """
+    logs: List[ActivityLogResponse] = Field(description="ログ一覧")
+    filter_conditions: Dict[str, Any] = Field(description="適用した検索条件")
+    total_count: Optional[int] = Field(default=None, description="該当件数（カーソル方式では指定時のみ）")
+    page: int = Field(description="ページ番号")
+    per_page: int = Field(description="1ページあたりの件数")
+    total_pages: Optional[int] = Field(default=None, description="総ページ数")
+    next_cursor: Optional[str] = Field(default=None, description="次ページ取得用カーソル")
+    filter_summary: Dict[str, Any] = Field(description="検索結果サマリー")
+
+
+class ActivityLogSummaryResponse(BaseModel):
+    """
+    アクティビティ集計レスポンススキーマ
+    内部使用：ダッシュボード表示用
+    """
+    period_days: int = Field(description="集計期間（日数）")
+    total_logs: int = Field(description="期間中の総ログ数")
+    activity_type_distribution: Dict[str, int] = Field(description="種別別件数")
+    activity_level_distribution: Dict[str, int] = Field(description="重要度レベル別件数")
+    top_users: List[Dict[str, Any]] = Field(description="操作件数上位ユーザー（最大10件）")
+    recent_issues: List[ActivityLogResponse] = Field(description="直近の警告・エラー（最大5件）")
+    summary_generated_at: datetime = Field(description="集計日時")
+
+
 class ActivityLogSearch(BaseModel):
     """
     アクティビティログ検索リクエストスキーマ
@@ -179,6 +179,7 @@ class BackupRequest(BaseModel):
     
     # 圧縮設定
     compression: bool = Field(default=True, description="圧縮するか")
+    compression_level: int = Field(default=6, ge=1, le=9, description="圧縮レベル（1:高速〜9:高圧縮）")
     encryption: bool = Field(default=False, description="暗号化するか")
     
     # 対象期間（部分バックアップ用）
@@ -224,7 +225,7 @@ class BackupResponse(BaseModel):
     
     # ステータス
     status: str = Field(description="バックアップ状況")
-    error_message: Optional[str] = Field(description="エラーメッセージ")
+    error_message: Optional[str] = Field(default=None, description="エラーメッセージ")
     
     @property
     def formatted_file_size(self) -> str:
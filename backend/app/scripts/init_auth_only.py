@@ -103,7 +103,8 @@ security = SimpleSecurityManager()
 async def initialize_auth_system():
     """認証システム初期化"""
     
-    print("🔐 IROAS BOSS V2 - 認証システム初期化開始")
+    # ログはトランザクション中に出力せず、セッション解放後にまとめて書き出す
+    logs: list[str] = ["🔐 IROAS BOSS V2 - 認証システム初期化開始"]
     
     # テーブル作成
     Base.metadata.create_all(bind=engine)
@@ -118,7 +119,7 @@ async def initialize_auth_system():
         db.query(User).delete()
         db.commit()
         
-        print("⚙️  MLMビジネス権限システムを初期化中...")
+        logs.append("⚙️  MLMビジネス権限システムを初期化中...")
         
         # MLMビジネス権限定義（抜粋版）
         permissions_data = [
@@ -157,8 +158,8 @@ async def initialize_auth_system():
             ("データ取込", "data.import", "データ取込権限", "mlm"),
         ]
         
-        # 権限を作成
-        permissions = []
+        # 権限を作成（作成時にコード別に保持）
+        permissions_by_code = {}
         for perm_name, perm_code, description, category in permissions_data:
             permission = UserPermission(
                 permission_name=perm_name,
@@ -168,13 +169,14 @@ async def initialize_auth_system():
                 resource=perm_code.split('.')[0],
                 action=perm_code.split('.')[1] if '.' in perm_code else 'all'
             )
-            permissions.append(permission)
+            permissions_by_code[perm_code] = permission
             db.add(permission)
         
-        db.commit()
+        # commitせずflushでIDを採番（commit後の期限切れによる行ごとの再読込を避ける）
+        db.flush()
         
         # 権限IDマッピング作成
-        permission_map = {perm.permission_code: perm.id for perm in permissions}
+        permission_map = {code: perm.id for code, perm in permissions_by_code.items()}
         
         # ロール別権限設定
         role_permission_mapping = {
@@ -205,10 +207,10 @@ async def initialize_auth_system():
                     db.add(role_permission)
         
         db.commit()
-        print("✅ MLMビジネス権限システムの初期化完了")
+        logs.append("✅ MLMビジネス権限システムの初期化完了")
         
         # スーパーユーザー作成
-        print("👤 スーパーユーザーを作成中...")
+        logs.append("👤 スーパーユーザーを作成中...")
         super_user = User(
             username="admin",
             email="admin@iroas-boss.com",
@@ -225,30 +227,31 @@ async def initialize_auth_system():
         db.add(super_user)
         db.commit()
         
-        print("✅ スーパーユーザー作成完了")
-        print("   ユーザー名: admin")
-        print("   パスワード: Admin@123!")
+        logs.append("✅ スーパーユーザー作成完了")
+        logs.append("   ユーザー名: admin")
+        logs.append("   パスワード: Admin@123!")
         
         # 統計表示
-        print("\n📊 権限システム確認")
-        total_permissions = len(permissions)
-        print(f"✅ 登録済み権限数: {total_permissions}個")
+        logs.append("\n📊 権限システム確認")
+        total_permissions = len(permission_map)
+        logs.append(f"✅ 登録済み権限数: {total_permissions}個")
         
         for role in UserRole:
             role_perms = db.query(UserRolePermission).filter(
                 UserRolePermission.role == role
             ).count()
-            print(f"   {role.value}: {role_perms}個の権限")
+            logs.append(f"   {role.value}: {role_perms}個の権限")
         
-        print("\n🎉 認証システム初期化が正常に完了しました！")
+        logs.append("\n🎉 認証システム初期化が正常に完了しました！")
         
     except Exception as e:
-        print(f"❌ 初期化中にエラーが発生しました: {str(e)}")
+        logs.append(f"❌ 初期化中にエラーが発生しました: {str(e)}")
         db.rollback()
         raise
     
     finally:
         db.close()
+        sys.stdout.write("\n".join(logs) + "\n")
 
 if __name__ == "__main__":
     asyncio.run(initialize_auth_system())
\ No newline at end of file
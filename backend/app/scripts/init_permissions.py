@@ -11,6 +11,7 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
 from app.database import SessionLocal, engine
 from app.models.user import Base, User, UserRole, UserStatus
@@ -20,8 +21,10 @@ from app.core.security import security
 async def init_permissions():
     """権限とスーパーユーザーの初期化"""
     
-    # データベーステーブル作成
-    Base.metadata.create_all(bind=engine)
+    # データベーステーブル作成（全テーブル作成済みの場合はスキップ）
+    existing_tables = set(inspect(engine).get_table_names())
+    if not set(Base.metadata.tables).issubset(existing_tables):
+        Base.metadata.create_all(bind=engine)
     
     # データベースセッション取得
     db: Session = SessionLocal()
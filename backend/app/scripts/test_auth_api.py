@@ -3,6 +3,8 @@
 # Phase 21対応・MLMビジネス要件準拠
 
 import asyncio
+import io
+import logging
 import sys
 import json
 import os
@@ -16,46 +18,88 @@ sys.path.insert(0, str(project_root))
 # FastAPIのテスト環境をセットアップ
 os.environ["DATABASE_URL"] = "sqlite:///./iroas_auth_test.db"
 
-from fastapi.testclient import TestClient
-from fastapi import FastAPI
-from app.api.endpoints.auth import router
-from app.database import get_db
+# テストクライアント（初回利用時に生成）
+_CLIENT = None
 
-# FastAPIアプリケーション作成
-app = FastAPI(title="IROAS BOSS V2 Auth Test")
-app.include_router(router)
+def _get_client():
+    """テストクライアント取得（FastAPI等の重いインポートを初回呼び出しまで遅延）"""
+    global _CLIENT
+    if _CLIENT is None:
+        import httpx
+        from fastapi import FastAPI
+        from app.api.endpoints.auth import router
+        
+        # FAST_AUTH_TESTS 指定時はbcryptを使わない（DBのユーザーも同モードで作成されている必要あり）
+        if os.getenv("FAST_AUTH_TESTS"):
+            from app.core.security import security
+            security.use_test_hasher()
+        
+        # FastAPIアプリケーション作成
+        app = FastAPI(title="IROAS BOSS V2 Auth Test")
+        app.include_router(router)
+        
+        _CLIENT = httpx.AsyncClient(app=app, base_url="http://test")
+    return _CLIENT
+
+# 出力はバッファに蓄積し、終了時にまとめて書き出す（STREAM_LOGS 指定時は逐次出力）
+_buf = io.StringIO()
 
-# テストクライアント作成
-client = TestClient(app)
+logger = logging.getLogger("auth_api_test")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_handler = logging.StreamHandler(sys.stdout if os.getenv("STREAM_LOGS") else _buf)
+_handler.setFormatter(logging.Formatter("%(message)s"))
+logger.addHandler(_handler)
+
+def flush_logs():
+    """バッファ済みのテスト出力を書き出し"""
+    sys.stdout.write(_buf.getvalue())
+    sys.stdout.flush()
+    _buf.seek(0)
+    _buf.truncate()
 
 class AuthAPITester:
     """認証API統合テスト"""
     
     def __init__(self):
-        self.client = client
+        self.client = _get_client()
         self.tokens = {}
         self.test_users = {}
         self.base_url = ""
+        self._admin_token = None
+    
+    async def _login(self, username: str, password: str, remember_me: bool = False):
+        """ログインAPI呼び出し"""
+        return await self.client.post("/api/v1/auth/login", json={
+            "username": username,
+            "password": password,
+            "remember_me": remember_me
+        })
     
-    def test_user_registration(self):
+    async def _admin_auth(self) -> Dict[str, str]:
+        """管理者認証ヘッダー取得（初回のみログインし、トークンを再利用）"""
+        if self._admin_token is None:
+            login_response = await self._login("admin", "Admin@123!")
+            
+            if login_response.status_code != 200:
+                logger.info("❌ 管理者ログインに失敗: %s", login_response.status_code)
+                logger.info("   レスポンス: %s", login_response.text)
+                return {}
+            
+            self._admin_token = login_response.json()["access_token"]
+            self.tokens["admin"] = self._admin_token
+        
+        return {"Authorization": f"Bearer {self._admin_token}"}
+    
+    async def test_user_registration(self):
         """ユーザー登録テスト"""
-        print("👤 ユーザー登録テスト")
+        logger.info("👤 ユーザー登録テスト")
         
         # 管理者でログイン（事前作成済み）
-        login_response = self.client.post("/api/v1/auth/login", json={
-            "username": "admin",
-            "password": "Admin@123!",
-            "remember_me": False
-        })
-        
-        if login_response.status_code != 200:
-            print(f"❌ 管理者ログインに失敗: {login_response.status_code}")
-            print(f"   レスポンス: {login_response.text}")
+        admin_headers = await self._admin_auth()
+        if not admin_headers:
             return False
         
-        admin_token = login_response.json()["access_token"]
-        self.tokens["admin"] = admin_token
-        
         # テストユーザー作成
         test_users_data = [
             {
@@ -77,90 +121,80 @@ class AuthAPITester:
         ]
         
         for user_data in test_users_data:
-            response = self.client.post(
+            response = await self.client.post(
                 "/api/v1/auth/users",
                 json=user_data,
-                headers={"Authorization": f"Bearer {admin_token}"}
+                headers=admin_headers
             )
             
             if response.status_code == 200:
-                print(f"   ✅ {user_data['username']} 作成成功")
+                logger.info("   ✅ %s 作成成功", user_data['username'])
                 self.test_users[user_data["role"]] = user_data["username"]
             else:
-                print(f"   ❌ {user_data['username']} 作成失敗: {response.status_code}")
-                print(f"      レスポンス: {response.text}")
+                logger.info("   ❌ %s 作成失敗: %s", user_data['username'], response.status_code)
+                logger.info("      レスポンス: %s", response.text)
         
         return True
     
-    def test_authentication_flow(self):
+    async def test_authentication_flow(self):
         """認証フローテスト"""
-        print("\n🔐 認証フローテスト")
+        logger.info("\n🔐 認証フローテスト")
         
         # 正常ログイン
-        login_data = {
-            "username": "admin",
-            "password": "Admin@123!",
-            "remember_me": True
-        }
-        
-        response = self.client.post("/api/v1/auth/login", json=login_data)
+        response = await self._login("admin", "Admin@123!", remember_me=True)
         
         if response.status_code == 200:
             data = response.json()
-            print("   ✅ ログイン成功")
-            print(f"      トークンタイプ: {data['token_type']}")
-            print(f"      有効期限: {data['expires_in']}秒")
-            print(f"      ユーザー: {data['user']['username']}")
-            print(f"      権限数: {len(data['permissions'])}個")
+            logger.info("   ✅ ログイン成功")
+            logger.info("      トークンタイプ: %s", data['token_type'])
+            logger.info("      有効期限: %s秒", data['expires_in'])
+            logger.info("      ユーザー: %s", data['user']['username'])
+            logger.info("      権限数: %s個", len(data['permissions']))
             
             access_token = data["access_token"]
             refresh_token = data["refresh_token"]
             
             # トークンリフレッシュテスト
-            refresh_response = self.client.post(
+            refresh_response = await self.client.post(
                 "/api/v1/auth/refresh",
                 json={"refresh_token": refresh_token}
             )
             
             if refresh_response.status_code == 200:
-                print("   ✅ トークンリフレッシュ成功")
+                logger.info("   ✅ トークンリフレッシュ成功")
             else:
-                print(f"   ❌ トークンリフレッシュ失敗: {refresh_response.status_code}")
+                logger.info("   ❌ トークンリフレッシュ失敗: %s", refresh_response.status_code)
             
             # ログアウトテスト
-            logout_response = self.client.post(
+            logout_response = await self.client.post(
                 "/api/v1/auth/logout",
                 json={"all_devices": False},
                 headers={"Authorization": f"Bearer {access_token}"}
             )
             
             if logout_response.status_code == 200:
-                print("   ✅ ログアウト成功")
+                logger.info("   ✅ ログアウト成功")
             else:
-                print(f"   ❌ ログアウト失敗: {logout_response.status_code}")
+                logger.info("   ❌ ログアウト失敗: %s", logout_response.status_code)
         
         else:
-            print(f"   ❌ ログイン失敗: {response.status_code}")
-            print(f"      レスポンス: {response.text}")
+            logger.info("   ❌ ログイン失敗: %s", response.status_code)
+            logger.info("      レスポンス: %s", response.text)
             return False
         
         # 不正ログインテスト
-        invalid_login = self.client.post("/api/v1/auth/login", json={
-            "username": "admin",
-            "password": "WrongPassword",
-            "remember_me": False
-        })
+        invalid_login = await self._login("admin", "WrongPassword")
         
         if invalid_login.status_code == 401:
-            print("   ✅ 不正ログイン拒否確認")
+            logger.info("   ✅ 不正ログイン拒否確認")
         else:
-            print(f"   ❌ 不正ログイン処理異常: {invalid_login.status_code}")
+            logger.info("   ❌ 不正ログイン処理異常: %s", invalid_login.status_code)
         
         return True
     
-    def test_permission_based_access(self):
+    async def test_permission_based_access(self):
         """権限ベースアクセステスト"""
-        print("\n🔒 権限ベースアクセステスト")
+        logger.info("\n🔒 権限ベースアクセステスト")
         
         # 各ロールでログインしてアクセステスト
         test_accounts = [
@@ -170,91 +204,82 @@ class AuthAPITester:
         ]
         
         for account in test_accounts:
-            print(f"\n   📋 {account['role']} 権限テスト")
+            logger.info("\n   📋 %s 権限テスト", account['role'])
             
             # ログイン
-            login_response = self.client.post("/api/v1/auth/login", json={
-                "username": account["username"],
-                "password": account["password"],
-                "remember_me": False
-            })
+            login_response = await self._login(account["username"], account["password"])
             
             if login_response.status_code != 200:
-                print(f"      ❌ ログイン失敗: {login_response.status_code}")
+                logger.info("      ❌ ログイン失敗: %s", login_response.status_code)
                 continue
             
-            token = login_response.json()["access_token"]
-            permissions = login_response.json()["permissions"]
+            login_data = login_response.json()
+            token = login_data["access_token"]
+            permissions = login_data["permissions"]
+            headers = {"Authorization": f"Bearer {token}"}
             
-            print(f"      ✅ ログイン成功 (権限数: {len(permissions)}個)")
+            logger.info("      ✅ ログイン成功 (権限数: %s個)", len(permissions))
             
             # 現在のユーザー情報取得
-            me_response = self.client.get(
+            me_response = await self.client.get(
                 "/api/v1/auth/me",
-                headers={"Authorization": f"Bearer {token}"}
+                headers=headers
             )
             
             if me_response.status_code == 200:
                 user_info = me_response.json()
-                print(f"      ✅ ユーザー情報取得成功: {user_info['username']}")
+                logger.info("      ✅ ユーザー情報取得成功: %s", user_info['username'])
             else:
-                print(f"      ❌ ユーザー情報取得失敗: {me_response.status_code}")
+                logger.info("      ❌ ユーザー情報取得失敗: %s", me_response.status_code)
             
             # セッション一覧取得
-            sessions_response = self.client.get(
+            sessions_response = await self.client.get(
                 "/api/v1/auth/sessions", 
-                headers={"Authorization": f"Bearer {token}"}
+                headers=headers
             )
             
             if sessions_response.status_code == 200:
                 sessions = sessions_response.json()
-                print(f"      ✅ セッション一覧取得成功 (セッション数: {sessions['total']}個)")
+                logger.info("      ✅ セッション一覧取得成功 (セッション数: %s個)", sessions['total'])
             else:
-                print(f"      ❌ セッション一覧取得失敗: {sessions_response.status_code}")
+                logger.info("      ❌ セッション一覧取得失敗: %s", sessions_response.status_code)
             
             # 管理者専用機能テスト（ユーザー一覧）
             if account["role"] in ["super_admin", "admin"]:
                 # 権限初期化（管理者のみ）
                 if account["role"] == "super_admin":
-                    init_response = self.client.post(
+                    init_response = await self.client.post(
                         "/api/v1/auth/permissions/initialize",
-                        headers={"Authorization": f"Bearer {token}"}
+                        headers=headers
                     )
                     
                     if init_response.status_code == 200:
-                        print("      ✅ 権限初期化成功")
+                        logger.info("      ✅ 権限初期化成功")
                     else:
-                        print(f"      ❌ 権限初期化失敗: {init_response.status_code}")
+                        logger.info("      ❌ 権限初期化失敗: %s", init_response.status_code)
             
             else:
                 # 非管理者による管理機能アクセステスト（拒否されるべき）
-                unauthorized_response = self.client.post(
+                unauthorized_response = await self.client.post(
                     "/api/v1/auth/permissions/initialize",
-                    headers={"Authorization": f"Bearer {token}"}
+                    headers=headers
                 )
                 
                 if unauthorized_response.status_code == 403:
-                    print("      ✅ 権限制限確認 (権限初期化拒否)")
+                    logger.info("      ✅ 権限制限確認 (権限初期化拒否)")
                 else:
-                    print(f"      ❌ 権限制限異常: {unauthorized_response.status_code}")
+                    logger.info("      ❌ 権限制限異常: %s", unauthorized_response.status_code)
     
-    def test_password_management(self):
+    async def test_password_management(self):
         """パスワード管理テスト"""
-        print("\n🔑 パスワード管理テスト")
+        logger.info("\n🔑 パスワード管理テスト")
         
         # 管理者でログイン
-        login_response = self.client.post("/api/v1/auth/login", json={
-            "username": "admin",
-            "password": "Admin@123!",
-            "remember_me": False
-        })
-        
-        if login_response.status_code != 200:
-            print("   ❌ ログインに失敗")
+        admin_headers = await self._admin_auth()
+        if not admin_headers:
+            logger.info("   ❌ ログインに失敗")
             return False
         
-        token = login_response.json()["access_token"]
-        
         # パスワード変更テスト
         change_password_data = {
             "current_password": "Admin@123!",
@@ -262,28 +287,24 @@ class AuthAPITester:
             "confirm_password": "NewAdmin@456!"
         }
         
-        change_response = self.client.post(
+        change_response = await self.client.post(
             "/api/v1/auth/change-password",
             json=change_password_data,
-            headers={"Authorization": f"Bearer {token}"}
+            headers=admin_headers
         )
         
         if change_response.status_code == 200:
-            print("   ✅ パスワード変更成功")
+            logger.info("   ✅ パスワード変更成功")
             
             # 新しいパスワードでログインテスト
-            new_login_response = self.client.post("/api/v1/auth/login", json={
-                "username": "admin",
-                "password": "NewAdmin@456!",
-                "remember_me": False
-            })
+            new_login_response = await self._login("admin", "NewAdmin@456!")
             
             if new_login_response.status_code == 200:
-                print("   ✅ 新パスワードでログイン成功")
+                logger.info("   ✅ 新パスワードでログイン成功")
                 
                 # パスワードを元に戻す
                 token = new_login_response.json()["access_token"]
-                self.client.post(
+                await self.client.post(
                     "/api/v1/auth/change-password",
                     json={
                         "current_password": "NewAdmin@456!",
@@ -292,62 +313,61 @@ class AuthAPITester:
                     },
                     headers={"Authorization": f"Bearer {token}"}
                 )
-                print("   ✅ パスワードを元に戻しました")
+                logger.info("   ✅ パスワードを元に戻しました")
             else:
-                print("   ❌ 新パスワードでのログインに失敗")
+                logger.info("   ❌ 新パスワードでのログインに失敗")
         else:
-            print(f"   ❌ パスワード変更失敗: {change_response.status_code}")
-            print(f"      レスポンス: {change_response.text}")
+            logger.info("   ❌ パスワード変更失敗: %s", change_response.status_code)
+            logger.info("      レスポンス: %s", change_response.text)
     
-    def test_access_logs(self):
+    async def test_access_logs(self):
         """アクセスログテスト"""
-        print("\n📊 アクセスログテスト")
+        logger.info("\n📊 アクセスログテスト")
         
         # 管理者でログイン
-        login_response = self.client.post("/api/v1/auth/login", json={
-            "username": "admin",
-            "password": "Admin@123!",
-            "remember_me": False
-        })
-        
-        if login_response.status_code != 200:
-            print("   ❌ ログインに失敗")
+        admin_headers = await self._admin_auth()
+        if not admin_headers:
+            logger.info("   ❌ ログインに失敗")
             return False
         
-        token = login_response.json()["access_token"]
-        
         # アクセスログ取得テスト
-        logs_response = self.client.get(
+        logs_response = await self.client.get(
             "/api/v1/auth/logs/access?page=1&limit=10",
-            headers={"Authorization": f"Bearer {token}"}
+            headers=admin_headers
         )
         
         if logs_response.status_code == 200:
             logs_data = logs_response.json()
-            print(f"   ✅ アクセスログ取得成功 (ログ数: {logs_data['total']}個)")
+            logger.info("   ✅ アクセスログ取得成功 (ログ数: %s個)", logs_data['total'])
         else:
-            print(f"   ❌ アクセスログ取得失敗: {logs_response.status_code}")
+            logger.info("   ❌ アクセスログ取得失敗: %s", logs_response.status_code)
     
-    def run_all_tests(self):
+    async def run_all_tests(self):
         """全テスト実行"""
-        print("🧪 IROAS BOSS V2 - 認証API統合テスト開始")
-        print("=" * 60)
+        logger.info("🧪 IROAS BOSS V2 - 認証API統合テスト開始")
+        logger.info("=" * 60)
         
         try:
-            # テスト実行
-            self.test_user_registration()
-            self.test_authentication_flow()
-            self.test_permission_based_access() 
-            self.test_password_management()
-            self.test_access_logs()
+            # ユーザー作成後、相互に独立したフェーズを並行実行
+            await self.test_user_registration()
+            await asyncio.gather(
+                self.test_authentication_flow(),
+                self.test_permission_based_access(),
+                self.test_access_logs()
+            )
+            
+            # パスワード変更は状態を変更するため最後に単独実行
+            await self.test_password_management()
             
-            print("\n" + "=" * 60)
-            print("🎉 認証API統合テスト完了！")
+            logger.info("\n%s", "=" * 60)
+            logger.info("🎉 認証API統合テスト完了！")
             
         except Exception as e:
-            print(f"❌ テスト実行中にエラーが発生しました: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ テスト実行中にエラーが発生しました: %s", e)
+        
+        finally:
+            await self.client.aclose()
+            flush_logs()
 
 if __name__ == "__main__":
     # 既存のデータベースを使用
@@ -356,4 +376,4 @@ if __name__ == "__main__":
         sys.exit(1)
     
     tester = AuthAPITester()
-    tester.run_all_tests()
\ No newline at end of file
+    asyncio.run(tester.run_all_tests())
\ No newline at end of file
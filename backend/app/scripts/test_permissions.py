@@ -3,32 +3,110 @@
 # Phase 21対応・MLMビジネス要件準拠
 
 import asyncio
+import io
+import logging
 import sys
 import os
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
 
 # プロジェクトルートをパスに追加
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
+# テスト専用: ハッシュコストを最小値に下げる（本番の認証情報は扱わない）
+os.environ.setdefault("ARGON2_TIME_COST", "1")
+os.environ.setdefault("ARGON2_MEMORY_COST", "8")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# テスト専用: SQLiteのコミット時fsyncを削減（耐久性より速度を優先）
+os.environ.setdefault("SQLITE_FAST_WRITES", "true")
+
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from app.database import SessionLocal
 from app.models.user import User, UserRole, UserStatus
 from app.services.permission_service import permission_service
 from app.core.security import security
 
+# テスト権限項目
+_TEST_PERMISSIONS: Tuple[Tuple[str, str], ...] = (
+    # システム権限
+    ("system.admin", "システム管理"),
+    ("user.manage", "ユーザー管理"),
+    ("user.view", "ユーザー閲覧"),
+    
+    # MLM会員管理
+    ("member.manage", "会員管理"),
+    ("member.view", "会員閲覧"),
+    ("member.create", "会員作成"),
+    
+    # MLM組織管理
+    ("organization.manage", "組織管理"),
+    ("organization.view", "組織閲覧"),
+    
+    # MLM決済管理
+    ("payment.manage", "決済管理"),
+    ("payment.view", "決済閲覧"),
+    ("payment.csv_export", "決済CSV出力"),
+    
+    # MLM報酬管理
+    ("reward.manage", "報酬管理"),
+    ("reward.calculate", "報酬計算"),
+    
+    # MLM支払管理
+    ("payout.manage", "支払管理"),
+    ("payout.gmo_export", "GMO CSV出力")
+)
+
+# テストリソース・アクション
+_TEST_RESOURCES: Tuple[Tuple[str, str, str], ...] = (
+    ("member", "manage", "会員管理"),
+    ("member", "view", "会員閲覧"),
+    ("organization", "manage", "組織管理"),
+    ("payment", "manage", "決済管理"),
+    ("reward", "calculate", "報酬計算"),
+    ("payout", "gmo_export", "GMO CSV出力")
+)
+
+# MLMビジネス固有権限テスト項目（メソッドはインポート時に解決）
+_MLM_TESTS: Tuple[Tuple[Callable[[int, Session], Awaitable[bool]], str], ...] = (
+    (permission_service.can_manage_members, "会員管理"),
+    (permission_service.can_view_members, "会員閲覧"),
+    (permission_service.can_manage_organization, "組織管理"),
+    (permission_service.can_calculate_rewards, "報酬計算"),
+    (permission_service.can_export_payments, "決済CSV出力"),
+    (permission_service.can_export_gmo, "GMO CSV出力")
+)
+
+# 出力はバッファに蓄積し、終了時にまとめて書き出す（STREAM_LOGS 指定時は逐次出力）
+_buf = io.StringIO()
+
+logger = logging.getLogger("permission_test")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+_handler = logging.StreamHandler(sys.stdout if os.getenv("STREAM_LOGS") else _buf)
+_handler.setFormatter(logging.Formatter("%(message)s"))
+logger.addHandler(_handler)
+
+def flush_logs():
+    """バッファ済みのテスト出力を書き出し"""
+    sys.stdout.write(_buf.getvalue())
+    sys.stdout.flush()
+    _buf.seek(0)
+    _buf.truncate()
+
 class PermissionTester:
     """権限システムテスト"""
     
     def __init__(self):
         self.db = SessionLocal()
         self.test_users = {}
+        self.resources_by_role = {}
     
     async def setup_test_users(self):
         """テスト用ユーザー作成"""
         
-        print("👥 テスト用ユーザーを作成中...")
+        logger.info("👥 テスト用ユーザーを作成中...")
         
         # テストユーザー定義
         test_user_data = [
@@ -52,188 +130,185 @@ class PermissionTester:
             }
         ]
         
+        # 既存ユーザーを1クエリで取得
+        existing_users = dict(
+            self.db.query(User.username, User.id).filter(
+                User.username.in_([d["username"] for d in test_user_data])
+            ).all()
+        )
+        
+        # 全テストユーザー共通パスワードのため、bcryptハッシュは1回だけ計算
+        shared_hash = None
+        if len(existing_users) < len(test_user_data):
+            shared_hash = security.hash_password("Test@123!")
+        
+        new_user_data = [d for d in test_user_data if d["username"] not in existing_users]
+        
+        if new_user_data:
+            # ORMの単位作業管理を介さず、複数行INSERTを1文で発行
+            self.db.execute(insert(User).values([
+                {
+                    "username": d["username"],
+                    "email": d["email"],
+                    "hashed_password": shared_hash,
+                    "full_name": d["name"],
+                    "display_name": d["name"],
+                    "role": d["role"],
+                    "status": UserStatus.ACTIVE,
+                    "is_active": True,
+                    "is_verified": True
+                }
+                for d in new_user_data
+            ]))
+        
+        # 作成後のIDを1クエリで取得
+        user_ids = dict(
+            self.db.query(User.username, User.id).filter(
+                User.username.in_([d["username"] for d in test_user_data])
+            ).all()
+        )
+        self.db.commit()
+        
         for user_data in test_user_data:
-            # 既存ユーザーチェック
-            existing_user = self.db.query(User).filter(
-                User.username == user_data["username"]
-            ).first()
-            
-            if not existing_user:
-                user = User(
-                    username=user_data["username"],
-                    email=user_data["email"],
-                    hashed_password=security.hash_password("Test@123!"),
-                    full_name=user_data["name"],
-                    display_name=user_data["name"],
-                    role=user_data["role"],
-                    status=UserStatus.ACTIVE,
-                    is_active=True,
-                    is_verified=True
-                )
-                
-                self.db.add(user)
-                self.db.commit()
-                self.test_users[user_data["role"]] = user.id
-                print(f"   ✅ {user_data['name']} 作成完了")
+            self.test_users[user_data["role"]] = user_ids[user_data["username"]]
+            if user_data["username"] in existing_users:
+                logger.info(f"   ⏭️  {user_data['name']} 既存")
             else:
-                self.test_users[user_data["role"]] = existing_user.id
-                print(f"   ⏭️  {user_data['name']} 既存")
+                logger.info(f"   ✅ {user_data['name']} 作成完了")
+    
+    async def _gather_by_role(self, check) -> Dict[UserRole, Any]:
+        """ロール毎のチェックをasyncio.gatherで実行
+        
+        サービスは同期Sessionで処理し途中でawaitを挟まないため、
+        接続を固定したself.dbをタスク間で共有しても処理が交互しない
+        """
+        
+        results = await asyncio.gather(
+            *(check(user_id, self.db) for user_id in self.test_users.values())
+        )
+        return dict(zip(self.test_users.keys(), results))
+    
+    async def load_accessible_resources(self):
+        """ロール毎のアクセス可能リソースを取得（以降のテストはこの結果から判定）"""
+        
+        resources_by_user = await permission_service.get_accessible_resources_for_users(
+            list(self.test_users.values()), self.db
+        )
+        self.resources_by_role = {
+            role: resources_by_user[user_id] for role, user_id in self.test_users.items()
+        }
+    
+    def _has_access(self, role: UserRole, resource: str, action: str) -> bool:
+        """取得済みリソース一覧からアクセス可否を判定"""
+        return action in self.resources_by_role[role].get(resource, ())
     
     async def test_role_permissions(self):
         """ロール別権限テスト"""
         
-        print("\n🔒 ロール別権限テスト開始")
-        
-        # テスト権限項目
-        test_permissions = [
-            # システム権限
-            ("system.admin", "システム管理"),
-            ("user.manage", "ユーザー管理"),
-            ("user.view", "ユーザー閲覧"),
-            
-            # MLM会員管理
-            ("member.manage", "会員管理"),
-            ("member.view", "会員閲覧"),
-            ("member.create", "会員作成"),
-            
-            # MLM組織管理
-            ("organization.manage", "組織管理"),
-            ("organization.view", "組織閲覧"),
-            
-            # MLM決済管理
-            ("payment.manage", "決済管理"),
-            ("payment.view", "決済閲覧"),
-            ("payment.csv_export", "決済CSV出力"),
-            
-            # MLM報酬管理
-            ("reward.manage", "報酬管理"),
-            ("reward.calculate", "報酬計算"),
-            
-            # MLM支払管理
-            ("payout.manage", "支払管理"),
-            ("payout.gmo_export", "GMO CSV出力")
-        ]
+        logger.info("\n🔒 ロール別権限テスト開始")
         
-        for role, user_id in self.test_users.items():
-            print(f"\n📋 {role.value} 権限テスト")
+        for role in self.test_users:
+            logger.info(f"\n📋 {role.value} 権限テスト")
             
             permissions_granted = []
             permissions_denied = []
             
-            for permission_code, permission_name in test_permissions:
-                has_permission = await permission_service.check_user_permission(
-                    user_id, permission_code, self.db
-                )
-                
-                if has_permission:
+            for permission_code, permission_name in _TEST_PERMISSIONS:
+                if self._has_access(role, *permission_code.split(".", 1)):
                     permissions_granted.append(permission_name)
                 else:
                     permissions_denied.append(permission_name)
             
-            print(f"   ✅ 許可された権限 ({len(permissions_granted)}個):")
+            logger.info(f"   ✅ 許可された権限 ({len(permissions_granted)}個):")
             for perm in permissions_granted:
-                print(f"      - {perm}")
+                logger.info(f"      - {perm}")
             
-            print(f"   ❌ 拒否された権限 ({len(permissions_denied)}個):")
+            logger.info(f"   ❌ 拒否された権限 ({len(permissions_denied)}個):")
             for perm in permissions_denied[:5]:  # 最初の5個のみ表示
-                print(f"      - {perm}")
+                logger.info(f"      - {perm}")
             if len(permissions_denied) > 5:
-                print(f"      ... 他{len(permissions_denied)-5}個")
+                logger.info(f"      ... 他{len(permissions_denied)-5}個")
     
     async def test_resource_access(self):
         """リソースアクセステスト"""
         
-        print("\n🗂️  リソースアクセステスト開始")
-        
-        # テストリソース・アクション
-        test_resources = [
-            ("member", "manage", "会員管理"),
-            ("member", "view", "会員閲覧"),
-            ("organization", "manage", "組織管理"),
-            ("payment", "manage", "決済管理"),
-            ("reward", "calculate", "報酬計算"),
-            ("payout", "gmo_export", "GMO CSV出力")
-        ]
+        logger.info("\n🗂️  リソースアクセステスト開始")
         
-        for role, user_id in self.test_users.items():
-            print(f"\n📁 {role.value} リソースアクセステスト")
+        for role in self.test_users:
+            logger.info(f"\n📁 {role.value} リソースアクセステスト")
             
-            for resource, action, description in test_resources:
-                has_access = await permission_service.check_user_resource_access(
-                    user_id, resource, action, self.db
-                )
-                
-                status = "✅ 許可" if has_access else "❌ 拒否"
-                print(f"   {status} {description} ({resource}.{action})")
+            for resource, action, description in _TEST_RESOURCES:
+                status = "✅ 許可" if self._has_access(role, resource, action) else "❌ 拒否"
+                logger.info(f"   {status} {description} ({resource}.{action})")
     
     async def test_accessible_resources(self):
         """アクセス可能リソース一覧テスト"""
         
-        print("\n📊 アクセス可能リソース一覧テスト")
+        logger.info("\n📊 アクセス可能リソース一覧テスト")
         
-        for role, user_id in self.test_users.items():
-            print(f"\n🔑 {role.value} アクセス可能リソース:")
-            
-            resources = await permission_service.get_user_accessible_resources(
-                user_id, self.db
-            )
+        for role, resources in self.resources_by_role.items():
+            logger.info(f"\n🔑 {role.value} アクセス可能リソース:")
             
             for resource, actions in resources.items():
-                print(f"   📂 {resource}:")
+                logger.info(f"   📂 {resource}:")
                 for action in actions:
-                    print(f"      - {action}")
+                    logger.info(f"      - {action}")
     
     async def test_mlm_specific_permissions(self):
         """MLM固有権限テスト"""
         
-        print("\n🏢 MLMビジネス固有権限テスト")
+        logger.info("\n🏢 MLMビジネス固有権限テスト")
         
-        mlm_tests = [
-            ("can_manage_members", "会員管理"),
-            ("can_view_members", "会員閲覧"),
-            ("can_manage_organization", "組織管理"),
-            ("can_calculate_rewards", "報酬計算"),
-            ("can_export_payments", "決済CSV出力"),
-            ("can_export_gmo", "GMO CSV出力")
-        ]
+        async def check_mlm(user_id, db):
+            return [await method(user_id, db) for method, _ in _MLM_TESTS]
         
-        for role, user_id in self.test_users.items():
-            print(f"\n💼 {role.value} MLM権限テスト:")
+        results_by_role = await self._gather_by_role(check_mlm)
+        
+        for role, results in results_by_role.items():
+            logger.info(f"\n💼 {role.value} MLM権限テスト:")
             
-            for method_name, description in mlm_tests:
-                method = getattr(permission_service, method_name)
-                has_permission = await method(user_id, self.db)
-                
+            for (_, description), has_permission in zip(_MLM_TESTS, results):
                 status = "✅ 許可" if has_permission else "❌ 拒否"
-                print(f"   {status} {description}")
+                logger.info(f"   {status} {description}")
     
     async def run_all_tests(self):
         """全テスト実行"""
         
         try:
-            print("🧪 IROAS BOSS V2 - 権限システムテスト開始")
-            print("=" * 60)
+            logger.info("🧪 IROAS BOSS V2 - 権限システムテスト開始")
+            logger.info("=" * 60)
             
             await self.setup_test_users()
-            await self.test_role_permissions()
-            await self.test_resource_access()
-            await self.test_accessible_resources()
-            await self.test_mlm_specific_permissions()
             
-            print("\n" + "=" * 60)
-            print("🎉 権限システムテスト完了！")
+            # 読み取りフェーズは単一トランザクションで実行し、接続を固定する
+            with self.db.begin():
+                await self.load_accessible_resources()
+                await self.test_role_permissions()
+                await self.test_resource_access()
+                await self.test_accessible_resources()
+                await self.test_mlm_specific_permissions()
+            
+            logger.info("\n" + "=" * 60)
+            logger.info("🎉 権限システムテスト完了！")
             
         except Exception as e:
-            print(f"❌ テスト実行中にエラーが発生しました: {str(e)}")
+            logger.info(f"❌ テスト実行中にエラーが発生しました: {str(e)}")
             raise
         
         finally:
             self.db.close()
+            flush_logs()
 
 async def main():
-    """メイン関数"""
+    """メイン関数（上位ランナーからは await main() で同一イベントループ上で実行可能）"""
     tester = PermissionTester()
     await tester.run_all_tests()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # 全テストフェーズで単一のイベントループを共有
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
\ No newline at end of file
@@ -7,7 +7,7 @@ import sys
 import asyncio
 import json
 from datetime import datetime
-from typing import Dict, Any
+from typing import Any, Awaitable, Callable, Dict
 
 # パス追加
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -22,11 +22,17 @@ from app.services.notification_service import security_notification_service
 from app.schemas.auth import LoginRequest
 from app.core.security import security
 
+REPORT_PATH = "security_integration_test_report.json"
+
+# テスト用ログインリクエスト（固定値のため検証を省略して生成）
+VALID_LOGIN = LoginRequest.model_construct(username="security_test_user", password="TestPassword123!")
+INVALID_LOGIN = LoginRequest.model_construct(username="security_test_user", password="WrongPassword")
+ADMIN_LOGIN_WITHOUT_MFA = LoginRequest.model_construct(username="security_admin_user", password="AdminPassword123!")
+
 class SecurityIntegrationTester:
     """セキュリティ統合テストクラス"""
     
     def __init__(self):
-        self.db = SessionLocal()
         self.test_results = []
         
     def add_result(self, test_name: str, success: bool, details: str = "", error: str = ""):
@@ -41,14 +47,19 @@ class SecurityIntegrationTester:
         self.test_results.append(result)
         
         status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status}: {test_name}")
+        lines = [f"{status}: {test_name}"]
         if details:
-            print(f"   Details: {details}")
+            lines.append(f"   Details: {details}")
         if error:
-            print(f"   Error: {error}")
-        print()
+            lines.append(f"   Error: {error}")
+        sys.stdout.write("\n".join(lines) + "\n\n")
+    
+    async def _run_with_session(self, test: Callable[[Session], Awaitable[None]]):
+        """テストごとにセッションを開き、終了時に接続をプールへ返却"""
+        with SessionLocal() as db:
+            await test(db)
     
-    async def setup_test_environment(self):
+    async def setup_test_environment(self, db: Session):
         """テスト環境セットアップ"""
         print("🔧 セットアップ中...")
         
@@ -57,21 +68,26 @@ class SecurityIntegrationTester:
             Base.metadata.create_all(bind=engine)
             
             # テストユーザー削除（既存の場合）
-            existing_users = self.db.query(User).filter(
+            existing_users = db.query(User).filter(
                 User.username.in_(["security_test_user", "security_admin_user"])
             ).all()
             
             for user in existing_users:
-                self.db.delete(user)
+                db.delete(user)
             
-            self.db.commit()
+            db.commit()
+            
+            # テストユーザー作成（ハッシュ計算はプロセスプールで並列実行）
+            test_password_hash, admin_password_hash = await asyncio.gather(
+                security.hash_password_async("TestPassword123!"),
+                security.hash_password_async("AdminPassword123!")
+            )
             
-            # テストユーザー作成
             test_user = User(
                 username="security_test_user",
                 email="security_test@iroas-boss.com",
                 full_name="セキュリティテストユーザー",
-                hashed_password=security.get_password_hash("TestPassword123!"),
+                hashed_password=test_password_hash,
                 role=UserRole.MLM_MANAGER,
                 status=UserStatus.ACTIVE,
                 is_active=True,
@@ -82,7 +98,7 @@ class SecurityIntegrationTester:
                 username="security_admin_user", 
                 email="security_admin@iroas-boss.com",
                 full_name="セキュリティ管理者ユーザー",
-                hashed_password=security.get_password_hash("AdminPassword123!"),
+                hashed_password=admin_password_hash,
                 role=UserRole.SUPER_ADMIN,
                 status=UserStatus.ACTIVE,
                 is_active=True,
@@ -90,9 +106,9 @@ class SecurityIntegrationTester:
                 mfa_secret="TESTSECRET123456789"
             )
             
-            self.db.add(test_user)
-            self.db.add(admin_user)
-            self.db.commit()
+            db.add(test_user)
+            db.add(admin_user)
+            db.commit()
             
             self.add_result("テスト環境セットアップ", True, "テストユーザー作成完了")
             
@@ -100,19 +116,14 @@ class SecurityIntegrationTester:
             self.add_result("テスト環境セットアップ", False, error=str(e))
             raise
     
-    async def test_basic_authentication(self):
+    async def test_basic_authentication(self, db: Session):
         """基本認証テスト"""
         print("🔐 基本認証テスト開始...")
         
         try:
             # 正常ログインテスト
-            login_request = LoginRequest(
-                username="security_test_user",
-                password="TestPassword123!"
-            )
-            
             response = await auth_service.authenticate_user(
-                login_request, "127.0.0.1", "Test-Agent", self.db
+                VALID_LOGIN, "127.0.0.1", "Test-Agent", db
             )
             
             if response.access_token and response.user.username == "security_test_user":
@@ -122,13 +133,8 @@ class SecurityIntegrationTester:
             
             # 不正パスワードテスト
             try:
-                login_request_invalid = LoginRequest(
-                    username="security_test_user",
-                    password="WrongPassword"
-                )
-                
                 await auth_service.authenticate_user(
-                    login_request_invalid, "127.0.0.1", "Test-Agent", self.db
+                    INVALID_LOGIN, "127.0.0.1", "Test-Agent", db
                 )
                 self.add_result("不正パスワードブロック", False, "不正ログインが通ってしまった")
                 
@@ -138,17 +144,17 @@ class SecurityIntegrationTester:
         except Exception as e:
             self.add_result("基本認証テスト", False, error=str(e))
     
-    async def test_security_analysis(self):
+    async def test_security_analysis(self, db: Session):
         """セキュリティ分析テスト"""
         print("🔍 セキュリティ分析テスト開始...")
         
         try:
             # ユーザー取得
-            test_user = self.db.query(User).filter(User.username == "security_test_user").first()
+            test_user = db.query(User).filter(User.username == "security_test_user").first()
             
             # 行動分析テスト
             analysis = await security_service.analyze_login_behavior(
-                test_user.id, "192.168.1.100", "Mozilla/5.0 Test", self.db
+                test_user.id, "192.168.1.100", "Mozilla/5.0 Test", db
             )
             
             if "risk_score" in analysis and "risk_factors" in analysis:
@@ -176,7 +182,7 @@ class SecurityIntegrationTester:
         except Exception as e:
             self.add_result("セキュリティ分析テスト", False, error=str(e))
     
-    async def test_audit_logging(self):
+    async def test_audit_logging(self, db: Session):
         """監査ログテスト"""
         print("📝 監査ログテスト開始...")
         
@@ -200,7 +206,7 @@ class SecurityIntegrationTester:
             )
             
             # ログ記録
-            await mlm_audit_service.log_event(audit_event, self.db)
+            await mlm_audit_service.log_event(audit_event, db)
             
             self.add_result("監査ログ記録", True, "監査イベントが正常に記録された")
             
@@ -209,7 +215,7 @@ class SecurityIntegrationTester:
             end_date = datetime.utcnow()
             
             report = await mlm_audit_service.generate_compliance_report(
-                start_date, end_date, db=self.db
+                start_date, end_date, db=db
             )
             
             if "summary" in report and "generated_at" in report:
@@ -220,13 +226,13 @@ class SecurityIntegrationTester:
         except Exception as e:
             self.add_result("監査ログテスト", False, error=str(e))
     
-    async def test_notification_system(self):
+    async def test_notification_system(self, db: Session):
         """通知システムテスト"""
         print("📢 通知システムテスト開始...")
         
         try:
             # テストユーザー取得
-            test_user = self.db.query(User).filter(User.username == "security_test_user").first()
+            test_user = db.query(User).filter(User.username == "security_test_user").first()
             
             # セキュリティアラート送信テスト
             await security_notification_service.send_critical_security_alert(
@@ -253,31 +259,25 @@ class SecurityIntegrationTester:
             self.add_result("ユーザーセキュリティ通知", True, "ユーザー通知が正常に処理された")
             
             # 累積アラートチェック（基本テスト）
-            await security_notification_service.check_and_send_accumulated_alerts(self.db)
+            await security_notification_service.check_and_send_accumulated_alerts(db)
             
             self.add_result("累積アラートチェック", True, "累積アラート処理が完了")
             
         except Exception as e:
             self.add_result("通知システムテスト", False, error=str(e))
     
-    async def test_mfa_integration(self):
+    async def test_mfa_integration(self, db: Session):
         """MFA統合テスト"""
         print("🔐 MFA統合テスト開始...")
         
         try:
             # 管理者ユーザー取得
-            admin_user = self.db.query(User).filter(User.username == "security_admin_user").first()
+            admin_user = db.query(User).filter(User.username == "security_admin_user").first()
             
             # MFA有効ユーザーでのログインテスト
             try:
-                login_request = LoginRequest(
-                    username="security_admin_user",
-                    password="AdminPassword123!"
-                    # MFAコードなし
-                )
-                
                 await auth_service.authenticate_user(
-                    login_request, "127.0.0.1", "Test-Agent", self.db
+                    ADMIN_LOGIN_WITHOUT_MFA, "127.0.0.1", "Test-Agent", db
                 )
                 self.add_result("MFA要求チェック", False, "MFAが要求されていない")
                 
@@ -295,22 +295,30 @@ class SecurityIntegrationTester:
         print("⚡ レート制限テスト開始...")
         
         try:
-            # 短時間でのログイン試行をシミュレーション
-            failed_attempts = 0
-            
-            for i in range(3):
-                try:
-                    login_request = LoginRequest(
-                        username="security_test_user",
-                        password="WrongPassword"
-                    )
-                    
-                    await auth_service.authenticate_user(
-                        login_request, "192.168.1.200", "Test-Agent", self.db
-                    )
-                    
-                except Exception:
-                    failed_attempts += 1
+            # 短時間でのログイン試行を同時実行でシミュレーション（試行ごとに個別セッション）
+            attempts_before = self._get_login_attempts("security_test_user")
+            
+            sessions = [SessionLocal() for _ in range(3)]
+            try:
+                results = await asyncio.gather(
+                    *(auth_service.authenticate_user(INVALID_LOGIN, "192.168.1.200", "Test-Agent", db)
+                      for db in sessions),
+                    return_exceptions=True
+                )
+            finally:
+                for db in sessions:
+                    db.close()
+            
+            failed_attempts = sum(1 for result in results if isinstance(result, Exception))
+            recorded_attempts = self._get_login_attempts("security_test_user") - attempts_before
+            
+            if recorded_attempts == failed_attempts:
+                self.add_result("ログイン試行回数の同時更新", True, f"記録された試行回数: {recorded_attempts}回")
+            else:
+                self.add_result(
+                    "ログイン試行回数の同時更新", False,
+                    error=f"失敗{failed_attempts}回に対し記録{recorded_attempts}回"
+                )
             
             if failed_attempts == 3:
                 self.add_result("レート制限基本動作", True, f"失敗ログイン試行: {failed_attempts}回")
@@ -320,31 +328,40 @@ class SecurityIntegrationTester:
         except Exception as e:
             self.add_result("レート制限テスト", False, error=str(e))
     
-    def generate_test_report(self):
+    def _get_login_attempts(self, username: str) -> int:
+        """最新のログイン試行回数を取得"""
+        db = SessionLocal()
+        try:
+            return db.query(User.login_attempts).filter(User.username == username).scalar() or 0
+        finally:
+            db.close()
+    
+    async def generate_test_report(self):
         """テストレポート生成"""
-        print("=" * 60)
-        print("🔒 IROAS BOSS V2 セキュリティ統合テスト結果")
-        print("=" * 60)
-        
+        # 1回の走査で集計と失敗一覧を作成
+        failed_results = [result for result in self.test_results if not result["success"]]
         total_tests = len(self.test_results)
-        passed_tests = sum(1 for result in self.test_results if result["success"])
-        failed_tests = total_tests - passed_tests
+        failed_tests = len(failed_results)
+        passed_tests = total_tests - failed_tests
         
-        print(f"📊 テスト結果サマリー:")
-        print(f"   総テスト数: {total_tests}")
-        print(f"   成功: {passed_tests}")
-        print(f"   失敗: {failed_tests}")
-        print(f"   成功率: {(passed_tests / total_tests * 100):.1f}%")
-        print()
+        lines = [
+            "=" * 60,
+            "🔒 IROAS BOSS V2 セキュリティ統合テスト結果",
+            "=" * 60,
+            "📊 テスト結果サマリー:",
+            f"   総テスト数: {total_tests}",
+            f"   成功: {passed_tests}",
+            f"   失敗: {failed_tests}",
+            f"   成功率: {(passed_tests / total_tests * 100):.1f}%",
+            ""
+        ]
         
-        if failed_tests > 0:
-            print("❌ 失敗したテスト:")
-            for result in self.test_results:
-                if not result["success"]:
-                    print(f"   - {result['test_name']}: {result['error']}")
-            print()
+        if failed_results:
+            lines.append("❌ 失敗したテスト:")
+            lines.extend(f"   - {result['test_name']}: {result['error']}" for result in failed_results)
+            lines.append("")
         
-        print("✅ 実装されたセキュリティ機能:")
+        lines.append("✅ 実装されたセキュリティ機能:")
         security_features = [
             "JWT認証・自動リフレッシュ",
             "多要素認証(MFA)・TOTP",
@@ -358,15 +375,15 @@ class SecurityIntegrationTester:
             "IP地理的分析・リスク評価"
         ]
         
-        for feature in security_features:
-            print(f"   ✓ {feature}")
-        
-        print()
-        print("🎯 Phase 21 認証セキュリティ統合: 完了")
-        print(f"⏰ テスト実行時刻: {datetime.utcnow().isoformat()}")
-        print("=" * 60)
+        lines.extend(f"   ✓ {feature}" for feature in security_features)
+        lines.extend([
+            "",
+            "🎯 Phase 21 認証セキュリティ統合: 完了",
+            f"⏰ テスト実行時刻: {datetime.utcnow().isoformat()}",
+            "=" * 60
+        ])
         
-        # JSONレポート保存
+        # JSONレポート保存（シリアライズと書き込みはイベントループ外で実行）
         report_data = {
             "test_summary": {
                 "total_tests": total_tests,
@@ -381,13 +398,20 @@ class SecurityIntegrationTester:
             "test_type": "security_integration"
         }
         
-        with open("security_integration_test_report.json", "w", encoding="utf-8") as f:
-            json.dump(report_data, f, ensure_ascii=False, indent=2)
+        await asyncio.to_thread(self._write_json_report, report_data, REPORT_PATH)
         
-        print("📄 詳細レポート: security_integration_test_report.json")
+        lines.append(f"📄 詳細レポート: {REPORT_PATH}")
+        sys.stdout.write("\n".join(lines) + "\n")
         
         return passed_tests == total_tests
     
+    @staticmethod
+    def _write_json_report(report_data: Dict[str, Any], path: str):
+        """JSONレポートをUTF-8バイト列として一括書き込み"""
+        payload = json.dumps(report_data, ensure_ascii=False, indent=2).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(payload)
+    
     async def run_all_tests(self):
         """全テスト実行"""
         print("🚀 IROAS BOSS V2 セキュリティ統合テスト開始")
@@ -395,22 +419,23 @@ class SecurityIntegrationTester:
         print("=" * 60)
         
         try:
-            await self.setup_test_environment()
-            await self.test_basic_authentication()
-            await self.test_security_analysis()
-            await self.test_audit_logging()
-            await self.test_notification_system()
-            await self.test_mfa_integration()
+            await self._run_with_session(self.setup_test_environment)
+            
+            # 互いに独立したテストは並行実行
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(self._run_with_session(self.test_basic_authentication))
+                tg.create_task(self._run_with_session(self.test_security_analysis))
+                tg.create_task(self._run_with_session(self.test_audit_logging))
+                tg.create_task(self._run_with_session(self.test_notification_system))
+            
+            await self._run_with_session(self.test_mfa_integration)
             await self.test_rate_limiting()
             
-            return self.generate_test_report()
+            return await self.generate_test_report()
             
         except Exception as e:
             print(f"💥 テスト実行中にエラー: {e}")
             return False
-        
-        finally:
-            self.db.close()
 
 async def main():
     """メイン実行"""
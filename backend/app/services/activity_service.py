@@ -11,12 +11,21 @@ Phase A-1c: アクティビティログAPI（6.1-6.3）
 - 6.3 GET /api/activity/logs/{id} - ログ詳細
 """
 
-from typing import List, Optional, Dict, Any
+import asyncio
+import base64
+import functools
+import json
+import logging
+import os
+from types import MappingProxyType
+from typing import List, Optional, Dict, Any, Mapping
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc
+from sqlalchemy import and_, delete, desc, func, insert, select, text, tuple_
 from datetime import datetime, timedelta
+from fastapi.concurrency import run_in_threadpool
 
-from app.models.activity import ActivityLog, ActivityType
+from app.database import SessionLocal, SHARED_CONNECTION, engine
+from app.models.activity import ActivityLog, ActivityType, ActivityLevel
 from app.schemas.activity import (
     ActivityLogResponse,
     ActivityLogListResponse,
@@ -24,6 +33,292 @@ from app.schemas.activity import (
     ActivityLogSummaryResponse
 )
 
+logger = logging.getLogger(__name__)
+
+
+def _run_in_threadpool(method):
+    """
+    同期Sessionを使う処理をスレッドプールで実行するデコレーター
+    呼び出し側は従来通り await で利用でき、イベントループをブロックしない
+    """
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        return await run_in_threadpool(method, *args, **kwargs)
+    return wrapper
+
+
+# バッチ書き込み用INSERT文（毎回生成せず、コンパイル済みキャッシュを確実に再利用）
+_INSERT_ACTIVITY_LOG = insert(ActivityLog)
+
+# 古いログ削除時の1バッチあたりの件数
+_CLEANUP_BATCH_SIZE = int(os.getenv("ACTIVITY_LOG_CLEANUP_BATCH_SIZE", "10000"))
+
+# 月別パーティションを事前作成する月数（当月に加えて何か月先まで）と確認間隔
+_PARTITION_MONTHS_AHEAD = int(os.getenv("ACTIVITY_LOG_PARTITION_MONTHS_AHEAD", "3"))
+_PARTITION_CHECK_INTERVAL_HOURS = int(os.getenv("ACTIVITY_LOG_PARTITION_CHECK_HOURS", "24"))
+
+# 重要度レベル別の表示色（キーは重要度レベルの名前）
+_LOG_LEVEL_COLOR: Mapping[str, str] = MappingProxyType({
+    "INFO": "#3b82f6",      # ブルー
+    "WARNING": "#f59e0b",   # イエロー
+    "ERROR": "#ef4444",     # レッド
+    "CRITICAL": "#dc2626"   # ダークレッド
+})
+_DEFAULT_LOG_LEVEL_COLOR = "#6b7280"
+
+# 操作内容からアクティビティ種別を判定するキーワード（先に一致したものを採用）
+_ACTIVITY_TYPE_KEYWORDS = (
+    ("リストア", ActivityType.DATA_RESTORE),
+    ("バックアップ", ActivityType.DATA_BACKUP),
+    ("インポート", ActivityType.DATA_IMPORT),
+    ("スポンサー変更", ActivityType.MEMBER_SPONSOR_CHANGE),
+    ("退会", ActivityType.MEMBER_DELETE),
+    ("新規会員登録", ActivityType.MEMBER_CREATE),
+    ("会員情報更新", ActivityType.MEMBER_UPDATE),
+    ("決済結果取込", ActivityType.PAYMENT_RESULT_IMPORT),
+    ("手動決済記録", ActivityType.PAYMENT_MANUAL_RECORD),
+    ("CSV出力", ActivityType.PAYMENT_CSV_EXPORT),
+    ("報酬計算実行失敗", ActivityType.REWARD_CALCULATION_FAILED),
+    ("報酬計算実行", ActivityType.REWARD_CALCULATION_COMPLETE),
+    ("計算結果削除", ActivityType.REWARD_CALCULATION_DELETE),
+)
+
+# 操作内容（description 列）の最大長
+_DESCRIPTION_MAX_LENGTH = ActivityLog.__table__.c.description.type.length
+
+# 失敗を表す操作内容の接尾辞
+_FAILURE_SUFFIX = "失敗"
+
+
+def _resolve_activity_type(action: str) -> ActivityType:
+    """
+    操作内容（例: "バックアップ作成失敗"）からアクティビティ種別を判定
+    種別の表記と完全一致すればそれを、次にキーワード一致、いずれもなければ OTHER
+    """
+    try:
+        return ActivityType(action)
+    except ValueError:
+        pass
+    for keyword, activity_type in _ACTIVITY_TYPE_KEYWORDS:
+        if keyword in action:
+            return activity_type
+    return ActivityType.OTHER
+
+# 経過時間表記の区切り（上限秒数, 単位秒数, 接尾辞）
+_TIME_AGO_STEPS = (
+    (60, 0, "たった今"),
+    (3600, 60, "分前"),
+    (86400, 3600, "時間前"),
+    (86400 * 30, 86400, "日前"),
+)
+
+
+def _calculate_time_ago(timestamp: datetime, now: datetime) -> str:
+    """
+    経過時間を日本語で表現（行ごとに呼ばれるためモジュール関数として定義）
+    """
+    diff_seconds = (now - timestamp).total_seconds()
+    
+    for limit, unit, suffix in _TIME_AGO_STEPS:
+        if diff_seconds < limit:
+            return f"{int(diff_seconds // unit)}{suffix}" if unit else suffix
+    return timestamp.strftime("%Y/%m/%d")
+
+
+def _encode_cursor(log: ActivityLog) -> str:
+    """
+    ページングカーソル生成（created_at と id の組）
+    """
+    raw = f"{log.created_at.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    """
+    ページングカーソル解析
+    """
+    try:
+        created_at, log_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(log_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(f"不正なカーソルです: {cursor}")
+
+
+def _to_enum_members(enum_cls, values: List[str]) -> list:
+    """
+    絞り込み条件（表示名）を列挙型のメンバーに変換（列には名前で保存されるため）
+    """
+    try:
+        return [enum_cls(value) for value in values]
+    except ValueError as e:
+        raise ValueError(f"不正な絞り込み条件です: {e}")
+
+
+# 書き込みタスクへの停止指示（キュー末尾に積み、それまでの分を書き出してから停止させる）
+_STOP = object()
+
+
+class ActivityLogBuffer:
+    """
+    アクティビティログのバッチ書き込みバッファ
+    件数（ACTIVITY_LOG_BATCH_SIZE）または経過時間（ACTIVITY_LOG_BATCH_MS）の
+    早い方で、複数行INSERT 1回・コミット1回にまとめて書き込む
+    キュー満杯時はリクエストを待たせず破棄し、dropped_count に計上する
+    一括書き込みに失敗した場合は1件ずつ再試行し、書き込めない行のみ failed_count に計上する
+    接続を共有する環境（SQLite）では開始せず、log_activity 側の即時書き込みに任せる
+    """
+
+    def __init__(self, batch_size: int, batch_ms: int, max_queue_size: int):
+        self.batch_size = batch_size
+        self.batch_ms = batch_ms
+        self.max_queue_size = max_queue_size
+        self.dropped_count = 0
+        self.failed_count = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    def start(self):
+        """
+        書き込みタスク開始（アプリケーション起動時）
+        """
+        if self.is_running:
+            return
+        if SHARED_CONNECTION:
+            logger.info("接続共有環境のためアクティビティログの一括書き込みは行わず、即時書き込みとします")
+            return
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._flusher())
+
+    async def stop(self):
+        """
+        書き込みタスク停止（アプリケーション終了時）、未書き込み分は書き出す
+        タスクをキャンセルすると取り出し済みのバッチを失うため、停止指示をキューに積んで終了を待つ
+        """
+        if not self.is_running:
+            return
+        self._stopping = True
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    def put(self, payload: Dict[str, Any]) -> bool:
+        """
+        ログをキューに追加。バッファ未稼働時はFalseを返す
+        """
+        if not self.is_running:
+            return False
+        try:
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.dropped_count += 1
+            logger.warning(f"アクティビティログバッファが満杯のため破棄しました（累計: {self.dropped_count}件）")
+        return True
+
+    async def _flusher(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = loop.time() + self.batch_ms / 1000
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await run_in_threadpool(self._write_batch, batch)
+
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        db = SessionLocal()
+        try:
+            db.execute(_INSERT_ACTIVITY_LOG, batch)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # 1件の不正データでバッチ全体を失わないよう、1件ずつ書き込み直す
+            logger.warning(f"アクティビティログの一括書き込みに失敗したため1件ずつ再試行します（{len(batch)}件）: {e}")
+            self._write_rows_individually(db, batch)
+        finally:
+            db.close()
+
+    def _write_rows_individually(self, db: Session, batch: List[Dict[str, Any]]):
+        """
+        1件ずつ書き込み、書き込めなかった行のみ隔離する
+        """
+        for row in batch:
+            try:
+                db.execute(_INSERT_ACTIVITY_LOG, [row])
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self._quarantine(row, e)
+
+    def _quarantine(self, row: Dict[str, Any], error: Exception):
+        """
+        書き込めなかったアクティビティログを、後から復旧できるよう内容ごとエラーログに残す
+        """
+        self.failed_count += 1
+        logger.error(
+            f"アクティビティログを書き込めなかったため隔離しました（累計: {self.failed_count}件）: {error} "
+            f"row={json.dumps(row, ensure_ascii=False, default=str)}"
+        )
+
+
+def ensure_activity_log_partitions(months_ahead: int = _PARTITION_MONTHS_AHEAD) -> None:
+    """
+    activity_logs の月別パーティションを当月から months_ahead か月先まで作成（作成済みは何もしない）
+    init.sql のパーティション作成関数があるPostgreSQLのみ対象
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    
+    with SessionLocal() as db:
+        if not db.execute(text("SELECT to_regprocedure('create_activity_logs_partition(date)')")).scalar():
+            return
+        db.execute(
+            text(
+                "SELECT create_activity_logs_partition((CURRENT_DATE + make_interval(months => n))::date) "
+                "FROM generate_series(0, :months_ahead) AS n"
+            ),
+            {"months_ahead": months_ahead}
+        )
+        db.commit()
+
+
+async def activity_log_partition_maintenance():
+    """
+    月別パーティションの事前作成を起動時と一定間隔ごとに実行（アプリケーション起動時にタスクとして開始）
+    作成漏れのまま月が替わると DEFAULT パーティションに行が溜まり、その月のパーティションを作れなくなるため
+    """
+    while True:
+        try:
+            await run_in_threadpool(ensure_activity_log_partitions)
+        except Exception as e:
+            logger.error(f"アクティビティログのパーティション作成に失敗しました: {e}")
+        await asyncio.sleep(_PARTITION_CHECK_INTERVAL_HOURS * 3600)
+
+
+activity_log_buffer = ActivityLogBuffer(
+    batch_size=int(os.getenv("ACTIVITY_LOG_BATCH_SIZE", "200")),
+    batch_ms=int(os.getenv("ACTIVITY_LOG_BATCH_MS", "50")),
+    max_queue_size=int(os.getenv("ACTIVITY_LOG_QUEUE_MAX", "10000"))
+)
+
 
 class ActivityService:
     """
@@ -34,68 +329,76 @@ class ActivityService:
     def __init__(self, db: Session):
         self.db = db
 
-    async def get_activity_logs(
+    @_run_in_threadpool
+    def get_activity_logs(
         self, 
         page: int = 1, 
         per_page: int = 50,
-        level_filter: Optional[List[str]] = None
+        level_filter: Optional[List[str]] = None,
+        cursor: Optional[str] = None
     ) -> ActivityLogListResponse:
         """
         ログ一覧取得
         API 6.1: GET /api/activity/logs
+        cursor指定時はキーセット方式でページングし、総件数の集計を省略する
         """
-        # ベースクエリ（新しい順）
-        query = self.db.query(ActivityLog).order_by(desc(ActivityLog.created_at))
+        # ベースクエリ
+        query = self.db.query(ActivityLog)
         
-        # ログレベルフィルター
+        # 重要度レベルフィルター
         if level_filter:
-            query = query.filter(ActivityLog.log_level.in_(level_filter))
+            query = query.filter(ActivityLog.activity_level.in_(_to_enum_members(ActivityLevel, level_filter)))
         
-        # 総件数取得
-        total_count = query.count()
+        # 総件数取得（OFFSET方式のみ）
+        total_count = None if cursor else query.count()
         
-        # ページネーション
-        offset = (page - 1) * per_page
-        logs = query.offset(offset).limit(per_page).all()
+        # ページネーション（新しい順）
+        logs, next_cursor = self._paginate(query, page, per_page, cursor)
         
         # レスポンス変換
-        log_list = [self._convert_to_response(log) for log in logs]
+        now = datetime.now()
+        log_list = [self._convert_to_response(log, now) for log in logs]
         
         return ActivityLogListResponse(
             logs=log_list,
             total_count=total_count,
             page=page,
             per_page=per_page,
-            total_pages=(total_count + per_page - 1) // per_page,
-            has_next=page * per_page < total_count,
-            has_previous=page > 1
+            total_pages=None if total_count is None else (total_count + per_page - 1) // per_page,
+            has_next=next_cursor is not None,
+            has_previous=bool(cursor) or page > 1,
+            next_cursor=next_cursor
         )
 
-    async def filter_activity_logs(
+    @_run_in_threadpool
+    def filter_activity_logs(
         self,
-        action_type: Optional[List[str]] = None,
-        log_level: Optional[List[str]] = None,
+        activity_type: Optional[List[str]] = None,
+        activity_level: Optional[List[str]] = None,
         user_id: Optional[str] = None,
         date_from: Optional[datetime] = None,
         date_to: Optional[datetime] = None,
         search_query: Optional[str] = None,
         page: int = 1,
-        per_page: int = 50
+        per_page: int = 50,
+        cursor: Optional[str] = None,
+        include_total: bool = False
     ) -> ActivityLogFilterResponse:
         """
         ログ検索・フィルタリング
         API 6.2: GET /api/activity/logs/filter
+        cursor指定時はキーセット方式でページングし、総件数は include_total 指定時のみ集計する
         """
         # ベースクエリ
-        query = self.db.query(ActivityLog).order_by(desc(ActivityLog.created_at))
+        query = self.db.query(ActivityLog)
         
-        # アクションタイプフィルター
-        if action_type:
-            query = query.filter(ActivityLog.action_type.in_(action_type))
+        # アクティビティ種別フィルター
+        if activity_type:
+            query = query.filter(ActivityLog.activity_type.in_(_to_enum_members(ActivityType, activity_type)))
         
-        # ログレベルフィルター
-        if log_level:
-            query = query.filter(ActivityLog.log_level.in_(log_level))
+        # 重要度レベルフィルター
+        if activity_level:
+            query = query.filter(ActivityLog.activity_level.in_(_to_enum_members(ActivityLevel, activity_level)))
         
         # ユーザーIDフィルター
         if user_id:
@@ -109,30 +412,29 @@ class ActivityService:
             end_date = date_to.replace(hour=23, minute=59, second=59)
             query = query.filter(ActivityLog.created_at <= end_date)
         
-        # テキスト検索（アクション、詳細、IPアドレス）
+        # テキスト検索（操作内容、IPアドレスを連結した検索用列に対して1回で照合）
         if search_query:
-            search_conditions = or_(
-                ActivityLog.action.ilike(f"%{search_query}%"),
-                ActivityLog.details.ilike(f"%{search_query}%"),
-                ActivityLog.ip_address.ilike(f"%{search_query}%")
-            )
-            query = query.filter(search_conditions)
+            query = query.filter(ActivityLog.search_blob.ilike(f"%{search_query}%"))
         
-        # 総件数取得
-        total_count = query.count()
+        filter_applied = any([activity_type, activity_level, user_id, date_from, date_to, search_query])
         
-        # ページネーション
-        offset = (page - 1) * per_page
-        logs = query.offset(offset).limit(per_page).all()
+        # 総件数取得（OFFSET方式、または include_total 指定時）
+        total_count = None
+        if not cursor or include_total:
+            total_count = self._count_logs(query, filter_applied)
+        
+        # ページネーション（新しい順）
+        logs, next_cursor = self._paginate(query, page, per_page, cursor)
         
         # レスポンス変換
-        log_list = [self._convert_to_response(log) for log in logs]
+        now = datetime.now()
+        log_list = [self._convert_to_response(log, now) for log in logs]
         
         return ActivityLogFilterResponse(
             logs=log_list,
             filter_conditions={
-                "action_type": action_type,
-                "log_level": log_level,
+                "activity_type": activity_type,
+                "activity_level": activity_level,
                 "user_id": user_id,
                 "date_from": date_from,
                 "date_to": date_to,
@@ -141,14 +443,16 @@ class ActivityService:
             total_count=total_count,
             page=page,
             per_page=per_page,
-            total_pages=(total_count + per_page - 1) // per_page,
+            total_pages=None if total_count is None else (total_count + per_page - 1) // per_page,
+            next_cursor=next_cursor,
             filter_summary={
                 "filtered_records": total_count,
-                "filter_applied": any([action_type, log_level, user_id, date_from, date_to, search_query])
+                "filter_applied": filter_applied
             }
         )
 
-    async def get_activity_log(self, log_id: int) -> ActivityLogResponse:
+    @_run_in_threadpool
+    def get_activity_log(self, log_id: int) -> ActivityLogResponse:
         """
         ログ詳細取得
         API 6.3: GET /api/activity/logs/{id}
@@ -164,27 +468,49 @@ class ActivityService:
         action: str,
         details: str,
         user_id: str,
-        action_type: ActionType = ActionType.OTHER,
-        log_level: LogLevel = LogLevel.INFO,
         target_id: Optional[int] = None,
         ip_address: Optional[str] = None,
-        user_agent: Optional[str] = None
-    ) -> ActivityLogResponse:
+        user_agent: Optional[str] = None,
+        activity_type: Optional[ActivityType] = None,
+        activity_level: Optional[ActivityLevel] = None
+    ) -> Optional[ActivityLogResponse]:
         """
         アクティビティログ記録
         内部使用：各サービスから呼び出される
+        action は操作内容（description 列）として記録し、種別は未指定なら action から判定する
+        action が「失敗」で終わる場合は失敗扱い（重要度 ERROR）とする
+        バッファ稼働中はキューに積んで即時復帰（戻り値None）、
+        未稼働時（スクリプト等）は従来通り即時書き込み
         """
-        new_log = ActivityLog(
-            action=action,
-            action_type=action_type,
-            details=details,
-            log_level=log_level,
-            user_id=user_id,
-            target_id=target_id,
-            ip_address=ip_address or "127.0.0.1",
-            user_agent=user_agent or "IROAS BOSS v2 System",
-            created_at=datetime.now()
-        )
+        is_success = not action.endswith(_FAILURE_SUFFIX)
+        if activity_level is None:
+            activity_level = ActivityLevel.INFO if is_success else ActivityLevel.ERROR
+        
+        # 一括INSERTでまとめられるよう、全ての行で同じキーを持たせる
+        payload = {
+            "activity_type": activity_type or _resolve_activity_type(action),
+            "activity_level": activity_level,
+            "user_id": user_id,
+            "ip_address": ip_address or "127.0.0.1",
+            "user_agent": user_agent or "IROAS BOSS v2 System",
+            "target_id": None if target_id is None else str(target_id),
+            "description": action[:_DESCRIPTION_MAX_LENGTH],
+            "details": {"message": details},
+            "is_success": is_success,
+            "error_message": None if is_success else details,
+            "created_at": datetime.now()
+        }
+        
+        if activity_log_buffer.put(payload):
+            return None
+        
+        return await run_in_threadpool(self._write_log, payload)
+
+    def _write_log(self, payload: Dict[str, Any]) -> ActivityLogResponse:
+        """
+        アクティビティログを即時書き込み
+        """
+        new_log = ActivityLog(**payload)
         
         self.db.add(new_log)
         self.db.commit()
@@ -192,7 +518,8 @@ class ActivityService:
         
         return self._convert_to_response(new_log)
 
-    async def get_activity_summary(
+    @_run_in_threadpool
+    def get_activity_summary(
         self,
         period_days: int = 7
     ) -> ActivityLogSummaryResponse:
@@ -208,32 +535,38 @@ class ActivityService:
             ActivityLog.created_at >= from_date
         ).count()
         
-        # アクションタイプ別集計
-        action_type_counts = {}
-        for action_type in ActionType:
-            count = self.db.query(ActivityLog).filter(
-                and_(
-                    ActivityLog.action_type == action_type,
-                    ActivityLog.created_at >= from_date
-                )
-            ).count()
-            action_type_counts[action_type.value] = count
-        
-        # ログレベル別集計
-        log_level_counts = {}
-        for log_level in LogLevel:
-            count = self.db.query(ActivityLog).filter(
-                and_(
-                    ActivityLog.log_level == log_level,
-                    ActivityLog.created_at >= from_date
-                )
-            ).count()
-            log_level_counts[log_level.value] = count
+        # アクティビティ種別別集計（GROUP BY 1クエリ、該当なしは0件）
+        activity_type_counts = {activity_type.value: 0 for activity_type in ActivityType}
+        activity_type_counts.update({
+            activity_type.value: count
+            for activity_type, count in self.db.query(
+                ActivityLog.activity_type,
+                func.count(ActivityLog.id)
+            ).filter(
+                ActivityLog.created_at >= from_date
+            ).group_by(
+                ActivityLog.activity_type
+            ).all()
+        })
+        
+        # 重要度レベル別集計（GROUP BY 1クエリ、該当なしは0件）
+        activity_level_counts = {activity_level.value: 0 for activity_level in ActivityLevel}
+        activity_level_counts.update({
+            activity_level.value: count
+            for activity_level, count in self.db.query(
+                ActivityLog.activity_level,
+                func.count(ActivityLog.id)
+            ).filter(
+                ActivityLog.created_at >= from_date
+            ).group_by(
+                ActivityLog.activity_level
+            ).all()
+        })
         
         # ユーザー別集計（上位10位）
         user_activity = self.db.query(
             ActivityLog.user_id,
-            self.db.func.count(ActivityLog.id).label('count')
+            func.count(ActivityLog.id).label('count')
         ).filter(
             ActivityLog.created_at >= from_date
         ).group_by(
@@ -247,18 +580,19 @@ class ActivityService:
         # 最新のエラーログ（警告・エラー）
         recent_issues = self.db.query(ActivityLog).filter(
             and_(
-                ActivityLog.log_level.in_([LogLevel.WARNING, LogLevel.ERROR]),
+                ActivityLog.activity_level.in_([ActivityLevel.WARNING, ActivityLevel.ERROR]),
                 ActivityLog.created_at >= from_date
             )
         ).order_by(desc(ActivityLog.created_at)).limit(5).all()
         
-        recent_issues_list = [self._convert_to_response(log) for log in recent_issues]
+        now = datetime.now()
+        recent_issues_list = [self._convert_to_response(log, now) for log in recent_issues]
         
         return ActivityLogSummaryResponse(
             period_days=period_days,
             total_logs=total_logs,
-            action_type_distribution=action_type_counts,
-            log_level_distribution=log_level_counts,
+            activity_type_distribution=activity_type_counts,
+            activity_level_distribution=activity_level_counts,
             top_users=user_stats,
             recent_issues=recent_issues_list,
             summary_generated_at=datetime.now()
@@ -271,87 +605,113 @@ class ActivityService:
         """
         cutoff_date = datetime.now() - timedelta(days=retention_days)
         
-        # 削除対象ログ数取得
-        old_logs_count = self.db.query(ActivityLog).filter(
-            ActivityLog.created_at < cutoff_date
-        ).count()
-        
         # 削除実行
-        deleted = self.db.query(ActivityLog).filter(
-            ActivityLog.created_at < cutoff_date
-        ).delete()
-        
-        self.db.commit()
+        deleted = await run_in_threadpool(self._delete_logs_before, cutoff_date)
         
         # 削除ログを記録
         await self.log_activity(
             action="ログクリーンアップ実行",
             details=f"保持期間: {retention_days}日, 削除件数: {deleted}件",
-            user_id="system",
-            action_type=ActionType.MAINTENANCE,
-            log_level=LogLevel.INFO
+            user_id="system"
         )
         
         return {
             "retention_days": retention_days,
             "cutoff_date": cutoff_date,
             "deleted_count": deleted,
-            "remaining_logs": self.db.query(ActivityLog).count(),
+            "remaining_logs": await run_in_threadpool(self.db.query(ActivityLog).count),
             "cleanup_executed_at": datetime.now()
         }
 
-    def _convert_to_response(self, log: ActivityLog) -> ActivityLogResponse:
+    def _delete_logs_before(self, cutoff_date: datetime) -> int:
+        """
+        指定日時より古いログを削除し、削除件数を返す
+        ロック範囲とWALを抑えるため、一定件数ごとに削除・コミットする
+        """
+        deleted = 0
+        while True:
+            batch_ids = select(ActivityLog.id).where(
+                ActivityLog.created_at < cutoff_date
+            ).limit(_CLEANUP_BATCH_SIZE).scalar_subquery()
+            
+            result = self.db.execute(
+                delete(ActivityLog).where(ActivityLog.id.in_(batch_ids)),
+                execution_options={"synchronize_session": False}
+            )
+            self.db.commit()
+            
+            deleted += result.rowcount
+            if result.rowcount < _CLEANUP_BATCH_SIZE:
+                return deleted
+
+    def _paginate(self, query, page: int, per_page: int, cursor: Optional[str]):
+        """
+        新しい順にページング（cursor指定時はキーセット方式、未指定時はOFFSET方式）
+        1件多く取得して次ページの有無を判定し、(ログ一覧, 次ページカーソル) を返す
+        """
+        query = query.order_by(desc(ActivityLog.created_at), desc(ActivityLog.id))
+        
+        if cursor:
+            cursor_created_at, cursor_id = _decode_cursor(cursor)
+            query = query.filter(
+                tuple_(ActivityLog.created_at, ActivityLog.id) < tuple_(cursor_created_at, cursor_id)
+            )
+        else:
+            query = query.offset((page - 1) * per_page)
+        
+        logs = query.limit(per_page + 1).all()
+        if len(logs) <= per_page:
+            return logs, None
+        
+        logs = logs[:per_page]
+        return logs, _encode_cursor(logs[-1])
+
+    def _count_logs(self, query, filter_applied: bool) -> int:
+        """
+        総件数取得（PostgreSQLで絞り込みなしの場合は統計情報の概算値を使用）
+        """
+        if not filter_applied and self.db.get_bind().dialect.name == "postgresql":
+            return self.db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE relname = 'activity_logs'")
+            ).scalar() or 0
+        return query.count()
+
+    def _convert_to_response(self, log: ActivityLog, now: Optional[datetime] = None) -> ActivityLogResponse:
         """
         ActivityLog モデルを ActivityLogResponse スキーマに変換
+        一覧変換時は呼び出し側で取得した now を共有する
         """
+        if now is None:
+            now = datetime.now()
+
         return ActivityLogResponse(
             id=log.id,
-            action=log.action,
-            action_type=log.action_type,
-            details=log.details,
-            log_level=log.log_level,
+            activity_type=log.activity_type,
+            activity_level=log.activity_level,
             user_id=log.user_id,
-            target_id=log.target_id,
+            user_name=log.user_name,
             ip_address=log.ip_address,
             user_agent=log.user_agent,
+            target_type=log.target_type,
+            target_id=log.target_id,
+            target_name=log.target_name,
+            description=log.description,
+            details=log.details,
+            is_success=log.is_success,
+            error_message=log.error_message,
             created_at=log.created_at,
+            session_id=log.session_id,
             
             # 表示用フォーマット
-            formatted_timestamp=log.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            action_display=f"[{log.action_type.value}] {log.action}",
-            log_level_color=self._get_log_level_color(log.log_level),
-            time_ago=self._calculate_time_ago(log.created_at)
+            formatted_created_at=log.formatted_created_at,
+            level_badge_class=log.level_badge_class,
+            activity_icon=log.activity_icon,
+            activity_level_color=self._get_log_level_color(log.activity_level),
+            time_ago=_calculate_time_ago(log.created_at, now)
         )
 
-    def _get_log_level_color(self, log_level: LogLevel) -> str:
-        """
-        ログレベルに応じた表示色を返す
+    def _get_log_level_color(self, activity_level: ActivityLevel) -> str:
         """
-        color_map = {
-            LogLevel.DEBUG: "#6b7280",    # グレー
-            LogLevel.INFO: "#3b82f6",     # ブルー
-            LogLevel.WARNING: "#f59e0b",  # イエロー
-            LogLevel.ERROR: "#ef4444",    # レッド
-            LogLevel.CRITICAL: "#dc2626"  # ダークレッド
-        }
-        return color_map.get(log_level, "#6b7280")
-
-    def _calculate_time_ago(self, timestamp: datetime) -> str:
+        重要度レベルに応じた表示色を返す
         """
-        経過時間を日本語で表現
-        """
-        now = datetime.now()
-        diff = now - timestamp
-        
-        if diff.total_seconds() < 60:
-            return "たった今"
-        elif diff.total_seconds() < 3600:
-            minutes = int(diff.total_seconds() / 60)
-            return f"{minutes}分前"
-        elif diff.total_seconds() < 86400:
-            hours = int(diff.total_seconds() / 3600)
-            return f"{hours}時間前"
-        elif diff.days < 30:
-            return f"{diff.days}日前"
-        else:
-            return timestamp.strftime("%Y/%m/%d")
\ No newline at end of file
+        return _LOG_LEVEL_COLOR.get(activity_level.name, _DEFAULT_LOG_LEVEL_COLOR)
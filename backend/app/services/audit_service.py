@@ -1,17 +1,37 @@
 # IROAS BOSS V2 - 監査・コンプライアンスサービス
 # Phase 21対応・MLM監査要件準拠
 
+import io
+import os
+import re
+import csv
 import json
+import asyncio
+import threading
 import hashlib
+import secrets
+import logging
+import platform
+import socket
+import functools
+from contextlib import contextmanager
+from collections import Counter, deque
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from enum import Enum
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc, func
+from sqlalchemy import (
+    Boolean, Column, DateTime, Integer, MetaData, String, Table,
+    and_, case, delete, desc, func, insert, select, tuple_, update
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from dataclasses import dataclass
+from fastapi.concurrency import run_in_threadpool
 
-from app.models.user import UserAccessLog, User
-from app.database import SessionLocal
+from app.models.user import UserAccessLog, User, AuditHourlyStat
+from app.database import SessionLocal, SHARED_CONNECTION
+
+logger = logging.getLogger(__name__)
 
 class AuditEventType(Enum):
     """監査イベント分類"""
@@ -54,7 +74,14 @@ class AuditEventType(Enum):
     RATE_LIMIT_EXCEEDED = "rate_limit_exceeded"
     UNAUTHORIZED_ACCESS = "unauthorized_access"
 
-@dataclass
+# Enum属性アクセスを避けるため、イベント種別ごとの値・判定を事前計算
+_TYPE_VALUE: Dict[AuditEventType, str] = {t: t.value for t in AuditEventType}
+_BUSINESS_PREFIX: Dict[AuditEventType, bool] = {
+    t: t.value.startswith(("member_", "organization_", "reward_", "payout_"))
+    for t in AuditEventType
+}
+
+@dataclass(slots=True, frozen=True)
 class AuditEvent:
     """監査イベント"""
     event_type: AuditEventType
@@ -68,6 +95,323 @@ class AuditEvent:
     success: bool
     timestamp: datetime
     risk_level: str = "low"  # low, medium, high, critical
+    details_safe: bool = False  # details に機密キーを含まないことが既知の場合はマスキング不要
+
+# 機密データとしてマスキングするキー（部分一致・大文字小文字無視）
+_SENSITIVE_KEY_RE = re.compile(
+    "password|secret|token|key|ssn|credit_card|bank_account|personal_id|mfa_secret",
+    re.IGNORECASE
+)
+
+def _mask_value(value: Any) -> str:
+    if isinstance(value, str) and len(value) > 4:
+        return value[:2] + "*" * (len(value) - 4) + value[-2:]
+    return "***MASKED***"
+
+def _mask_recursive(obj: Any) -> Any:
+    if isinstance(obj, dict):
+        return {
+            k: _mask_value(v) if _SENSITIVE_KEY_RE.search(k) else _mask_recursive(v)
+            for k, v in obj.items()
+        }
+    elif isinstance(obj, list):
+        return [_mask_recursive(item) for item in obj]
+    return obj
+
+@functools.lru_cache(maxsize=1)
+def _server_info() -> Dict[str, str]:
+    return {
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "python_version": platform.python_version(),
+    }
+
+# 時間別集計の集計軸と、方言別のUPSERT対応INSERT
+_HOURLY_STAT_DIMS = ("day", "hour", "user_id", "ip_address", "action", "success")
+_HOURLY_SOURCE_COLUMNS = ("created_at", "user_id", "ip_address", "action", "success")
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+def _upsert_hourly_stats(db: Session, rows: List[Dict[str, Any]]):
+    """
+    監査ログを時間別集計テーブルに加算（呼び出し側のトランザクション内で実行）
+    報告書はこの集計から作成でき、生ログ全件の走査を避けられる
+    """
+    _add_hourly_counts(db, Counter(
+        (
+            row["created_at"].date(),
+            row["created_at"].hour,
+            row["user_id"] or 0,
+            row["ip_address"] or "",
+            row["action"],
+            bool(row["success"]),
+        )
+        for row in rows
+    ))
+
+def _add_hourly_counts(db: Session, counts: Counter):
+    """集計軸ごとの件数を時間別集計テーブルに加算（既存行があれば件数を足し込む）"""
+    upsert_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if upsert_insert is None or not counts:
+        return
+    
+    stmt = upsert_insert(AuditHourlyStat).values([
+        {**dict(zip(_HOURLY_STAT_DIMS, dims)), "count": count}
+        for dims, count in counts.items()
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=list(_HOURLY_STAT_DIMS),
+        set_={"count": AuditHourlyStat.count + stmt.excluded.count}
+    ))
+
+def _mask_ip(ip_address: Optional[str]) -> Optional[str]:
+    """IPv4アドレスの下位2オクテットをマスキング（匿名化用）"""
+    if ip_address:
+        ip_parts = ip_address.split('.')
+        if len(ip_parts) == 4:
+            return f"{ip_parts[0]}.{ip_parts[1]}.xxx.xxx"
+    return ip_address
+
+def _hour_key_before(cutoff: datetime):
+    """指定日時より前に完結する時間別集計の行を表す条件"""
+    return tuple_(AuditHourlyStat.day, AuditHourlyStat.hour) < tuple_(cutoff.date(), cutoff.hour)
+
+# 時間別集計テーブルからの報告書用集計
+_rollup_event_count = func.sum(AuditHourlyStat.count)
+_rollup_success_count = func.sum(case((AuditHourlyStat.success == True, AuditHourlyStat.count), else_=0))
+
+def _rollup_totals(base_query):
+    total_events, success_events = base_query.with_entities(
+        func.coalesce(_rollup_event_count, 0),
+        func.coalesce(_rollup_success_count, 0)
+    ).one()
+    return total_events, success_events
+
+def _rollup_user_stats(base_query):
+    return base_query.join(User, User.id == AuditHourlyStat.user_id).with_entities(
+        User.username,
+        User.role,
+        _rollup_event_count.label('event_count'),
+        _rollup_success_count.label('success_count')
+    ).group_by(User.id, User.username, User.role).all()
+
+def _rollup_hourly_stats(base_query):
+    return base_query.with_entities(
+        AuditHourlyStat.hour.label('hour'),
+        _rollup_event_count.label('count')
+    ).group_by(AuditHourlyStat.hour).all()
+
+def _rollup_ip_stats(base_query):
+    return base_query.with_entities(
+        AuditHourlyStat.ip_address,
+        _rollup_event_count.label('count'),
+        # user_id=0 は「不明」を表すため、生ログ側（NULLは数えない）と揃えて除外する
+        func.count(func.distinct(func.nullif(AuditHourlyStat.user_id, 0))).label('unique_users')
+    ).group_by(AuditHourlyStat.ip_address).order_by(_rollup_event_count.desc()).limit(20).all()
+
+def _rollup_failed_events(base_query):
+    return base_query.filter(
+        AuditHourlyStat.success == False
+    ).with_entities(
+        AuditHourlyStat.action,
+        AuditHourlyStat.ip_address,
+        _rollup_event_count.label('count')
+    ).group_by(
+        AuditHourlyStat.action, AuditHourlyStat.ip_address
+    ).order_by(_rollup_event_count.desc()).limit(10).all()
+
+# 生ログ（一時テーブル）からのユーザー別統計
+def _user_stats_statement(filtered: Table):
+    event_count = func.count()
+    return select(
+        User.username,
+        User.role,
+        event_count.label('event_count'),
+        func.sum(case((filtered.c.success == True, 1), else_=0)).label('success_count')
+    ).select_from(filtered.join(User, User.id == filtered.c.user_id)).group_by(User.id, User.username, User.role)
+
+def _user_activity_entry(stat) -> Dict[str, Any]:
+    success_count = stat.success_count or 0
+    return {
+        "username": stat.username,
+        "role": stat.role.value if stat.role else "unknown",
+        "total_events": stat.event_count,
+        "success_events": success_count,
+        "failure_rate": ((stat.event_count - success_count) / stat.event_count * 100) if stat.event_count > 0 else 0
+    }
+
+# 報告書ハッシュ用の正規化JSONエンコーダー（キー順固定・空白なし、呼び出しごとに生成しない）
+_CANONICAL_JSON = json.JSONEncoder(sort_keys=True, separators=(",", ":"))
+
+# 期限切れ削除・匿名化時の1バッチあたりの件数
+_CLEANUP_BATCH_SIZE = int(os.getenv("AUDIT_LOG_CLEANUP_BATCH_SIZE", "10000"))
+# 時間別集計の再構築時に1回で加算する生ログ件数（一括書き込みのバッチと同程度）
+_ROLLUP_REBUILD_BATCH_SIZE = int(os.getenv("AUDIT_ROLLUP_REBUILD_BATCH_SIZE", "1000"))
+
+# 監査ログ一括書き込みの対象列・文
+_ACCESS_LOG_COLUMNS = (
+    "user_id", "action", "ip_address", "user_agent", "path",
+    "method", "success", "error_message", "created_at"
+)
+_COPY_NULL = "\\N"
+# NOT NULL 列（COPY は1行の制約違反で全体が失敗するため、投入前に検査する）
+_REQUIRED_ACCESS_LOG_COLUMNS = tuple(
+    col for col in _ACCESS_LOG_COLUMNS if not UserAccessLog.__table__.c[col].nullable
+)
+_INSERT_ACCESS_LOG = insert(UserAccessLog)
+
+class AuditLogBuffer:
+    """
+    監査ログのバッチ書き込みバッファ
+    log_event 側は deque への追加のみで戻り、専用の書き込みスレッドが
+    件数（AUDIT_LOG_BATCH_SIZE）または経過時間（AUDIT_LOG_BATCH_MS）ごとに
+    1トランザクションにまとめて書き込む
+    キュー満杯時はリクエストを待たせず破棄し、dropped_count に計上する
+    一括書き込みに失敗した場合は1件ずつ再試行し、書き込めない行のみ failed_count に計上する
+    接続を共有する環境（SQLite）では開始せず、log_event 側の即時書き込みに任せる
+    """
+    
+    def __init__(self, batch_size: int, batch_ms: int, max_queue_size: int):
+        self.batch_size = batch_size
+        self.batch_ms = batch_ms
+        self.max_queue_size = max_queue_size
+        self.dropped_count = 0
+        self.failed_count = 0
+        self._ring: deque = deque()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stopping.is_set()
+    
+    def start(self):
+        """書き込みスレッド開始（アプリケーション起動時）"""
+        if self.is_running:
+            return
+        if SHARED_CONNECTION:
+            logger.info("接続共有環境のため監査ログの一括書き込みは行わず、即時書き込みとします")
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._writer, name="audit-log-writer", daemon=True)
+        self._thread.start()
+    
+    async def stop(self):
+        """書き込みスレッド停止（アプリケーション終了時）、未書き込み分は書き出す"""
+        if not self.is_running:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        await run_in_threadpool(self._thread.join)
+        self._thread = None
+    
+    def put(self, row: Dict[str, Any]) -> bool:
+        """監査ログをキューに追加。バッファ未稼働時はFalseを返す"""
+        if not self.is_running:
+            return False
+        if len(self._ring) >= self.max_queue_size:
+            self.dropped_count += 1
+            logger.warning(f"監査ログバッファが満杯のため破棄しました（累計: {self.dropped_count}件）")
+            return True
+        self._ring.append(row)
+        if len(self._ring) >= self.batch_size:
+            self._wakeup.set()
+        return True
+    
+    def _writer(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.batch_ms / 1000)
+            self._wakeup.clear()
+            self._drain()
+        self._drain()
+    
+    def _drain(self):
+        while self._ring:
+            batch = []
+            while self._ring and len(batch) < self.batch_size:
+                batch.append(self._ring.popleft())
+            self._write_batch(batch)
+    
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        batch = self._reject_invalid_rows(batch)
+        if not batch:
+            return
+        
+        db = SessionLocal()
+        try:
+            self._insert_batch(db, batch)
+            _upsert_hourly_stats(db, batch)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # 1件の不正データでバッチ全体を失わないよう、1件ずつ書き込み直す
+            logger.warning(f"監査ログの一括書き込みに失敗したため1件ずつ再試行します（{len(batch)}件）: {e}")
+            self._write_rows_individually(db, batch)
+        finally:
+            db.close()
+    
+    def _reject_invalid_rows(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """必須項目が欠けた行を事前に隔離し、残りの行を返す"""
+        valid = []
+        for row in batch:
+            missing = [col for col in _REQUIRED_ACCESS_LOG_COLUMNS if row.get(col) is None]
+            if missing:
+                self._quarantine(row, ValueError(f"必須項目が未設定です: {', '.join(missing)}"))
+            else:
+                valid.append(row)
+        return valid
+    
+    def _insert_batch(self, db: Session, batch: List[Dict[str, Any]]):
+        if db.get_bind().dialect.name == "postgresql":
+            self._copy_batch(db, batch)
+        else:
+            db.execute(_INSERT_ACCESS_LOG, batch)
+    
+    def _write_rows_individually(self, db: Session, batch: List[Dict[str, Any]]):
+        """1件ずつ書き込み、書き込めなかった行のみ隔離する"""
+        for row in batch:
+            try:
+                db.execute(_INSERT_ACCESS_LOG, [row])
+                _upsert_hourly_stats(db, [row])
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self._quarantine(row, e)
+    
+    def _quarantine(self, row: Dict[str, Any], error: Exception):
+        """書き込めなかった監査ログを、後から復旧できるよう内容ごとエラーログに残す"""
+        self.failed_count += 1
+        logger.error(
+            f"監査ログを書き込めなかったため隔離しました（累計: {self.failed_count}件）: {error} "
+            f"row={json.dumps(row, ensure_ascii=False, default=str)}"
+        )
+
+    def _copy_batch(self, db: Session, batch: List[Dict[str, Any]]):
+        """
+        PostgreSQLではCOPYで一括投入（ORMオブジェクトを生成しない）
+        COPY が失敗した場合は呼び出し側で1件ずつのINSERTに切り替える
+        """
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in batch:
+            writer.writerow(_COPY_NULL if row[col] is None else row[col] for col in _ACCESS_LOG_COLUMNS)
+        buf.seek(0)
+        
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {UserAccessLog.__tablename__} ({', '.join(_ACCESS_LOG_COLUMNS)}) "
+                f"FROM STDIN WITH (FORMAT csv, NULL '{_COPY_NULL}')",
+                buf
+            )
+        finally:
+            cursor.close()
+
+audit_log_buffer = AuditLogBuffer(
+    batch_size=int(os.getenv("AUDIT_LOG_BATCH_SIZE", "1000")),
+    batch_ms=int(os.getenv("AUDIT_LOG_BATCH_MS", "200")),
+    max_queue_size=int(os.getenv("AUDIT_LOG_QUEUE_MAX", "10000"))
+)
 
 class MLMAuditService:
     """
@@ -77,14 +421,26 @@ class MLMAuditService:
     
     def __init__(self):
         self.retention_days = 2555  # 7年間保存（法的要件）
-        self.high_risk_events = [
+        self.high_risk_events = frozenset([
             AuditEventType.PERMISSION_GRANTED,
             AuditEventType.SPONSOR_CHANGED,
             AuditEventType.ORGANIZATION_CHANGED,
             AuditEventType.REWARD_CALCULATED,
             AuditEventType.PAYOUT_PROCESSED,
             AuditEventType.SYSTEM_CONFIG_CHANGED,
-        ]
+        ])
+        # リスクレベルはイベント種別と成否のみで決まるため事前に計算
+        self._risk_cache: Dict[tuple, str] = {
+            (event_type, success): self._evaluate_risk_level(event_type, success)
+            for event_type in AuditEventType
+            for success in (True, False)
+        }
+        # コンプライアンス通知はリクエスト処理を待たせずバックグラウンドで送信（同時送信数は上限付き）
+        # セマフォはイベントループに紐づくため、インポート時ではなく利用時にループごとに生成する
+        self._alert_concurrency = int(os.getenv("AUDIT_ALERT_CONCURRENCY", "8"))
+        self._alert_sem: Optional[asyncio.Semaphore] = None
+        self._alert_sem_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._alert_tasks: set = set()
     
     # ===================
     # 監査ログ記録
@@ -102,108 +458,99 @@ class MLMAuditService:
         # リスクレベル自動判定
         risk_level = self._determine_risk_level(event)
         
-        # 追加コンテキスト情報
-        context = {
-            "timestamp_utc": event.timestamp.isoformat(),
-            "server_info": self._get_server_info(),
-            **(additional_context or {})
-        }
-        
         # 機密データのマスキング
-        masked_details = self._mask_sensitive_data(event.details)
-        
-        # データベース記録
-        access_log = UserAccessLog(
-            user_id=event.user_id,
-            action=event.event_type.value,
-            ip_address=event.ip_address,
-            user_agent=event.user_agent,
-            path=event.resource,
-            method=event.action,
-            success=event.success,
-            error_message=masked_details.get("error_message"),
-            created_at=event.timestamp,
-        )
+        # 記録されるのは details の error_message のみのため、その値だけを対象とする
+        # （security_analysis 等の大きなネスト構造をリクエスト処理中に走査しない）
+        error_message = event.details.get("error_message")
+        if not event.details_safe:
+            error_message = _mask_recursive(error_message)
         
-        db.add(access_log)
-        db.commit()
+        # データベース記録（高リスクイベントは即時書き込み、それ以外はバッファ経由で一括書き込み）
+        row = {
+            "user_id": event.user_id,
+            "action": _TYPE_VALUE[event.event_type],
+            "ip_address": event.ip_address,
+            "user_agent": event.user_agent,
+            "path": event.resource,
+            "method": event.action,
+            "success": event.success,
+            "error_message": error_message,
+            "created_at": event.timestamp,
+        }
         
-        # 高リスクイベントの場合は即座に通知
-        if risk_level in ["high", "critical"]:
-            await self._send_compliance_alert(event, risk_level)
+        if risk_level in ["high", "critical"] or not audit_log_buffer.put(row):
+            db.add(UserAccessLog(**row))
+            _upsert_hourly_stats(db, [row])
+            db.commit()
         
-        # 統計情報更新
-        await self._update_audit_statistics(event, db)
+        # 高リスクイベントの場合は即座に通知（追加コンテキストは通知時のみ組み立てる）
+        if risk_level in ["high", "critical"]:
+            context = {
+                "timestamp_utc": event.timestamp.isoformat(),
+                "server_info": self._get_server_info(),
+                **(additional_context or {})
+            }
+            task = asyncio.create_task(self._send_compliance_alert_bounded(event, risk_level, context))
+            self._alert_tasks.add(task)
+            task.add_done_callback(self._alert_tasks.discard)
+
     
     def _determine_risk_level(self, event: AuditEvent) -> str:
         """リスクレベル判定"""
+        return self._risk_cache[(event.event_type, bool(event.success))]
+    
+    def _evaluate_risk_level(self, event_type: AuditEventType, success: bool) -> str:
+        """リスクレベル判定ルール（初期化時に全種別分を評価）"""
         
         # 失敗イベントは中リスク以上
-        if not event.success:
-            if event.event_type in [
+        if not success:
+            if event_type in (
                 AuditEventType.UNAUTHORIZED_ACCESS,
                 AuditEventType.SUSPICIOUS_ACTIVITY
-            ]:
+            ):
                 return "critical"
             return "medium"
         
         # 高リスクイベント
-        if event.event_type in self.high_risk_events:
+        if event_type in self.high_risk_events:
             return "high"
         
         # MLMビジネス操作は中リスク
-        if event.event_type.value.startswith(("member_", "organization_", "reward_", "payout_")):
+        if _BUSINESS_PREFIX[event_type]:
             return "medium"
         
         return "low"
     
-    def _mask_sensitive_data(self, details: Dict[str, Any]) -> Dict[str, Any]:
-        """機密データマスキング"""
-        masked = details.copy()
-        
-        sensitive_fields = [
-            "password", "secret", "token", "key", "ssn", "credit_card",
-            "bank_account", "personal_id", "mfa_secret"
-        ]
-        
-        def mask_value(value):
-            if isinstance(value, str) and len(value) > 4:
-                return value[:2] + "*" * (len(value) - 4) + value[-2:]
-            return "***MASKED***"
-        
-        def mask_recursive(obj):
-            if isinstance(obj, dict):
-                return {
-                    k: mask_value(v) if any(field in k.lower() for field in sensitive_fields) 
-                    else mask_recursive(v)
-                    for k, v in obj.items()
-                }
-            elif isinstance(obj, list):
-                return [mask_recursive(item) for item in obj]
-            return obj
-        
-        return mask_recursive(masked)
-    
     def _get_server_info(self) -> Dict[str, str]:
-        """サーバー情報取得"""
-        import platform
-        import socket
-        
-        return {
-            "hostname": socket.gethostname(),
-            "platform": platform.platform(),
-            "python_version": platform.python_version(),
-        }
+        """サーバー情報取得（プロセス内で不変のため初回のみ取得）"""
+        return _server_info()
     
-    async def _send_compliance_alert(self, event: AuditEvent, risk_level: str):
+    def _get_alert_semaphore(self) -> asyncio.Semaphore:
+        """実行中のイベントループ用の通知セマフォを取得（ループが変わった場合は作り直す）"""
+        loop = asyncio.get_running_loop()
+        if self._alert_sem is None or self._alert_sem_loop is not loop:
+            self._alert_sem = asyncio.Semaphore(self._alert_concurrency)
+            self._alert_sem_loop = loop
+        return self._alert_sem
+    
+    async def _send_compliance_alert_bounded(self, event: AuditEvent, risk_level: str, context: Dict[str, Any]):
+        """同時送信数を制限したコンプライアンス通知（失敗してもリクエストには影響させない）"""
+        async with self._get_alert_semaphore():
+            try:
+                await self._send_compliance_alert(event, risk_level, context)
+            except Exception as e:
+                logger.error(f"コンプライアンス通知の送信に失敗しました: {e}")
+    
+    async def _send_compliance_alert(self, event: AuditEvent, risk_level: str, context: Dict[str, Any]):
         """コンプライアンス通知"""
         # 実装では実際の通知システム連携
         import logging
         
         logger = logging.getLogger("compliance")
         logger.warning(
-            f"High-risk audit event: {event.event_type.value} "
-            f"by user {event.user_id} from {event.ip_address}"
+            f"High-risk audit event: {_TYPE_VALUE[event.event_type]} "
+            f"by user {event.user_id} from {event.ip_address}",
+            extra={"audit_context": context}
         )
     
     # ===================
@@ -216,129 +563,260 @@ class MLMAuditService:
         end_date: datetime,
         user_id: Optional[int] = None,
         event_types: Optional[List[AuditEventType]] = None,
-        db: Session = None
+        db: Session = None,
+        use_rollup: bool = False
     ) -> Dict[str, Any]:
         """
         コンプライアンス報告書生成
+        use_rollup 指定時は時間別集計テーブルから作成（期間は時単位に丸められる）
         """
         if not db:
             db = SessionLocal()
         
         try:
-            # 基本統計
-            base_query = db.query(UserAccessLog).filter(
-                and_(
-                    UserAccessLog.created_at >= start_date,
-                    UserAccessLog.created_at <= end_date
+            # 集計はイベントループを止めないようスレッドプールで実行
+            if use_rollup:
+                stats = await self._aggregate_from_rollup(db, start_date, end_date, user_id, event_types)
+            else:
+                stats = await run_in_threadpool(
+                    self._aggregate_from_logs, db, start_date, end_date, user_id, event_types
                 )
-            )
-            
-            if user_id:
-                base_query = base_query.filter(UserAccessLog.user_id == user_id)
-            
-            if event_types:
-                event_values = [e.value for e in event_types]
-                base_query = base_query.filter(UserAccessLog.action.in_(event_values))
-            
-            total_events = base_query.count()
-            success_events = base_query.filter(UserAccessLog.success == True).count()
-            failed_events = total_events - success_events
             
-            # ユーザー別統計
-            user_stats = base_query.join(User).with_entities(
-                User.username,
-                User.role,
-                func.count(UserAccessLog.id).label('event_count'),
-                func.sum(func.cast(UserAccessLog.success, db.Integer)).label('success_count')
-            ).group_by(User.id, User.username, User.role).all()
-            
-            # 時間別分析
-            hourly_stats = base_query.with_entities(
-                func.extract('hour', UserAccessLog.created_at).label('hour'),
-                func.count(UserAccessLog.id).label('count')
-            ).group_by(func.extract('hour', UserAccessLog.created_at)).all()
-            
-            # IP別分析
-            ip_stats = base_query.with_entities(
-                UserAccessLog.ip_address,
-                func.count(UserAccessLog.id).label('count'),
-                func.count(func.distinct(UserAccessLog.user_id)).label('unique_users')
-            ).group_by(UserAccessLog.ip_address).order_by(
-                func.count(UserAccessLog.id).desc()
-            ).limit(20).all()
-            
-            # 失敗イベント分析
-            failed_events_detail = base_query.filter(
-                UserAccessLog.success == False
-            ).with_entities(
-                UserAccessLog.action,
-                UserAccessLog.ip_address,
-                func.count(UserAccessLog.id).label('count')
-            ).group_by(
-                UserAccessLog.action, UserAccessLog.ip_address
-            ).order_by(
-                func.count(UserAccessLog.id).desc()
-            ).limit(10).all()
-            
-            report = {
-                "report_period": {
-                    "start_date": start_date.isoformat(),
-                    "end_date": end_date.isoformat(),
-                },
-                "summary": {
-                    "total_events": total_events,
-                    "success_events": success_events,
-                    "failed_events": failed_events,
-                    "success_rate": (success_events / total_events * 100) if total_events > 0 else 0,
-                },
-                "user_activity": [
-                    {
-                        "username": stat.username,
-                        "role": stat.role.value if stat.role else "unknown",
-                        "total_events": stat.event_count,
-                        "success_events": stat.success_count or 0,
-                        "failure_rate": ((stat.event_count - (stat.success_count or 0)) / stat.event_count * 100) if stat.event_count > 0 else 0
-                    }
-                    for stat in user_stats
-                ],
-                "time_distribution": [
-                    {"hour": int(stat.hour), "count": stat.count}
-                    for stat in hourly_stats
-                ],
-                "ip_analysis": [
-                    {
-                        "ip_address": stat.ip_address,
-                        "total_requests": stat.count,
-                        "unique_users": stat.unique_users,
-                        "requests_per_user": stat.count / stat.unique_users if stat.unique_users > 0 else 0
-                    }
-                    for stat in ip_stats
-                ],
-                "security_incidents": [
-                    {
-                        "event_type": detail.action,
-                        "ip_address": detail.ip_address,
-                        "failure_count": detail.count
-                    }
-                    for detail in failed_events_detail
-                ],
-                "generated_at": datetime.utcnow().isoformat(),
-                "report_hash": self._generate_report_hash({
-                    "total_events": total_events,
-                    "success_rate": (success_events / total_events) if total_events > 0 else 0,
-                    "period": f"{start_date.date()}-{end_date.date()}"
-                })
-            }
-            
-            return report
+            return self._build_report(start_date, end_date, *stats)
         
         finally:
             db.close()
     
+    def _aggregate_from_logs(
+        self,
+        db: Session,
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[int],
+        event_types: Optional[List[AuditEventType]]
+    ):
+        """報告書用集計（生ログから）"""
+        with self._filtered_access_logs(db, start_date, end_date, user_id, event_types) as filtered:
+            return self._aggregate_filtered(db, filtered)
+    
+    @contextmanager
+    def _filtered_access_logs(
+        self,
+        db: Session,
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[int],
+        event_types: Optional[List[AuditEventType]]
+    ):
+        """
+        対象期間の行を一時テーブルに1回だけ抽出し、各集計はそこから行う
+        一時テーブルはブロック終了時に削除される（例外時はロールバック後に削除）
+        """
+        conditions = [
+            UserAccessLog.created_at >= start_date,
+            UserAccessLog.created_at <= end_date
+        ]
+        
+        if user_id:
+            conditions.append(UserAccessLog.user_id == user_id)
+        
+        if event_types:
+            event_values = [_TYPE_VALUE[e] for e in event_types]
+            conditions.append(UserAccessLog.action.in_(event_values))
+        
+        filtered = Table(
+            f"audit_report_{secrets.token_hex(4)}",
+            MetaData(),
+            Column("user_id", Integer),
+            Column("ip_address", String(45)),
+            Column("action", String(50)),
+            Column("success", Boolean),
+            Column("created_at", DateTime(timezone=True)),
+            prefixes=["TEMPORARY"]
+        )
+        connection = db.connection()
+        filtered.create(connection)
+        
+        try:
+            source_columns = [
+                UserAccessLog.user_id, UserAccessLog.ip_address,
+                UserAccessLog.action, UserAccessLog.success, UserAccessLog.created_at
+            ]
+            db.execute(filtered.insert().from_select(
+                [c.name for c in filtered.columns],
+                select(*source_columns).where(and_(*conditions))
+            ))
+            yield filtered
+        except BaseException:
+            # PostgreSQLでは中断状態のトランザクション内でDROPできず元の例外が隠れるため、
+            # 先にロールバックする（一時テーブルの作成もロールバックされる）
+            db.rollback()
+            try:
+                filtered.drop(db.connection(), checkfirst=True)
+            except Exception as e:
+                logger.warning(f"報告書用一時テーブルの削除に失敗しました: {e}")
+            raise
+        else:
+            filtered.drop(connection)
+    
+    def _aggregate_filtered(self, db: Session, filtered: Table):
+        """一時テーブルからの集計"""
+        event_count = func.count()
+        
+        # 基本統計（総数・成功数を1回の集計で取得）
+        total_events, success_events = db.execute(
+            select(event_count, event_count.filter(filtered.c.success == True)).select_from(filtered)
+        ).one()
+        
+        # ユーザー別統計
+        user_stats = db.execute(_user_stats_statement(filtered)).all()
+        
+        # 時間別分析
+        hour = func.extract('hour', filtered.c.created_at)
+        hourly_stats = db.execute(
+            select(hour.label('hour'), event_count.label('count')).group_by(hour)
+        ).all()
+        
+        # IP別分析
+        ip_stats = db.execute(
+            select(
+                filtered.c.ip_address,
+                event_count.label('count'),
+                func.count(func.distinct(filtered.c.user_id)).label('unique_users')
+            ).group_by(filtered.c.ip_address).order_by(event_count.desc()).limit(20)
+        ).all()
+        
+        # 失敗イベント分析
+        failed_events_detail = db.execute(
+            select(
+                filtered.c.action,
+                filtered.c.ip_address,
+                event_count.label('count')
+            ).where(filtered.c.success == False)
+            .group_by(filtered.c.action, filtered.c.ip_address)
+            .order_by(event_count.desc()).limit(10)
+        ).all()
+        
+        return total_events, success_events, user_stats, hourly_stats, ip_stats, failed_events_detail
+    
+    def _build_report(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        total_events: int,
+        success_events: int,
+        user_stats,
+        hourly_stats,
+        ip_stats,
+        failed_events_detail
+    ) -> Dict[str, Any]:
+        """集計結果から報告書を組み立て"""
+        failed_events = total_events - success_events
+        
+        return {
+            "report_period": {
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+            },
+            "summary": {
+                "total_events": total_events,
+                "success_events": success_events,
+                "failed_events": failed_events,
+                "success_rate": (success_events / total_events * 100) if total_events > 0 else 0,
+            },
+            "user_activity": [_user_activity_entry(stat) for stat in user_stats],
+            "time_distribution": [
+                {"hour": int(stat.hour), "count": stat.count}
+                for stat in hourly_stats
+            ],
+            "ip_analysis": [
+                {
+                    "ip_address": stat.ip_address,
+                    "total_requests": stat.count,
+                    "unique_users": stat.unique_users,
+                    "requests_per_user": stat.count / stat.unique_users if stat.unique_users > 0 else 0
+                }
+                for stat in ip_stats
+            ],
+            "security_incidents": [
+                {
+                    "event_type": detail.action,
+                    "ip_address": detail.ip_address,
+                    "failure_count": detail.count
+                }
+                for detail in failed_events_detail
+            ],
+            "generated_at": datetime.utcnow().isoformat(),
+            "report_hash": self._generate_report_hash({
+                "total_events": total_events,
+                "success_rate": (success_events / total_events) if total_events > 0 else 0,
+                "period": f"{start_date.date()}-{end_date.date()}"
+            })
+        }
+    
+    async def _aggregate_from_rollup(
+        self,
+        db: Session,
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[int],
+        event_types: Optional[List[AuditEventType]]
+    ):
+        """
+        報告書用集計（時間別集計テーブルから）
+        各集計は互いに独立しているため、個別セッションで並行実行する
+        接続を共有する環境（SQLite）では並行実行せず、呼び出し元のセッションで順に実行する
+        """
+        aggregates = (_rollup_totals, _rollup_user_stats, _rollup_hourly_stats, _rollup_ip_stats, _rollup_failed_events)
+        
+        if SHARED_CONNECTION:
+            def run_all():
+                base_query = self._rollup_query(db, start_date, end_date, user_id, event_types)
+                return [aggregate(base_query) for aggregate in aggregates]
+            
+            (total_events, success_events), *rest = await run_in_threadpool(run_all)
+            return (total_events, success_events, *rest)
+        
+        def run(aggregate):
+            with SessionLocal() as session:
+                return aggregate(self._rollup_query(session, start_date, end_date, user_id, event_types))
+        
+        (total_events, success_events), user_stats, hourly_stats, ip_stats, failed_events_detail = await asyncio.gather(
+            *(run_in_threadpool(run, aggregate) for aggregate in aggregates)
+        )
+        
+        return total_events, success_events, user_stats, hourly_stats, ip_stats, failed_events_detail
+    
+    def _rollup_query(
+        self,
+        db: Session,
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[int],
+        event_types: Optional[List[AuditEventType]]
+    ):
+        """時間別集計テーブルの期間・条件絞り込みクエリ"""
+        hour_key = tuple_(AuditHourlyStat.day, AuditHourlyStat.hour)
+        base_query = db.query(AuditHourlyStat).filter(
+            and_(
+                hour_key >= tuple_(start_date.date(), start_date.hour),
+                hour_key <= tuple_(end_date.date(), end_date.hour)
+            )
+        )
+        
+        if user_id:
+            base_query = base_query.filter(AuditHourlyStat.user_id == user_id)
+        
+        if event_types:
+            event_values = [_TYPE_VALUE[e] for e in event_types]
+            base_query = base_query.filter(AuditHourlyStat.action.in_(event_values))
+        
+        return base_query
+    
     def _generate_report_hash(self, report_summary: Dict[str, Any]) -> str:
         """報告書ハッシュ生成（改ざん検知）"""
-        report_str = json.dumps(report_summary, sort_keys=True)
-        return hashlib.sha256(report_str.encode()).hexdigest()
+        report_bytes = _CANONICAL_JSON.encode(report_summary).encode()
+        return hashlib.blake2b(report_bytes, digest_size=32).hexdigest()
     
     # ===================
     # MLM固有監査機能
@@ -372,7 +850,8 @@ class MLMAuditService:
             },
             success=True,
             timestamp=datetime.utcnow(),
-            risk_level="high"
+            risk_level="high",
+            details_safe=True
         )
         
         await self.log_event(event, db)
@@ -406,7 +885,8 @@ class MLMAuditService:
             },
             success=True,
             timestamp=datetime.utcnow(),
-            risk_level="high"
+            risk_level="high",
+            details_safe=True
         )
         
         await self.log_event(event, db)
@@ -419,41 +899,160 @@ class MLMAuditService:
         """
         ユーザー監査データ匿名化（GDPR対応）
         """
-        anonymized_user_id = f"anonymized_user_{hashlib.md5(str(user_id).encode()).hexdigest()[:8]}"
+        anonymized_user_id = f"anonymized_user_{hashlib.blake2b(str(user_id).encode(), digest_size=4).hexdigest()}"
         
-        # 監査ログの個人情報を匿名化
-        logs = db.query(UserAccessLog).filter(UserAccessLog.user_id == user_id).all()
+        # 監査ログの個人情報を匿名化（PostgreSQLではサーバー側の一括UPDATEで処理）
+        if db.get_bind().dialect.name == "postgresql":
+            await run_in_threadpool(self._anonymize_logs_in_batches, db, user_id)
+        else:
+            logs = db.query(UserAccessLog).filter(UserAccessLog.user_id == user_id).all()
+            
+            for log in logs:
+                # user_idを匿名化IDに置換
+                log.user_id = None  # 匿名化
+                # IPアドレスを部分マスキング
+                log.ip_address = _mask_ip(log.ip_address)
+            
+            db.commit()
         
-        for log in logs:
-            # user_idを匿名化IDに置換
-            log.user_id = None  # 匿名化
-            # IPアドレスを部分マスキング
-            if log.ip_address:
-                ip_parts = log.ip_address.split('.')
-                if len(ip_parts) == 4:
-                    log.ip_address = f"{ip_parts[0]}.{ip_parts[1]}.xxx.xxx"
+        # 時間別集計にもユーザーID・IPアドレスが残るため同様に匿名化
+        await run_in_threadpool(self._anonymize_hourly_stats, db, user_id)
+    
+    def _anonymize_hourly_stats(self, db: Session, user_id: int):
+        """
+        対象ユーザーの時間別集計を「不明ユーザー（0）・マスク済みIP」の行に合算し直す
+        匿名化後の集計軸が既存行と重なる場合は件数を加算する
+        """
+        stats = db.query(AuditHourlyStat).filter(AuditHourlyStat.user_id == user_id).all()
+        if not stats:
+            return
         
+        counts = Counter()
+        for stat in stats:
+            counts[(stat.day, stat.hour, 0, _mask_ip(stat.ip_address), stat.action, stat.success)] += stat.count
+        
+        db.execute(
+            delete(AuditHourlyStat).where(AuditHourlyStat.user_id == user_id),
+            execution_options={"synchronize_session": False}
+        )
+        _add_hourly_counts(db, counts)
         db.commit()
     
+    def _anonymize_logs_in_batches(self, db: Session, user_id: int):
+        """
+        対象ユーザーの監査ログを一定件数ごとにUPDATEで匿名化
+        ロック保持時間を抑えるため、バッチごとにコミットする
+        """
+        while True:
+            batch_ids = select(UserAccessLog.id).where(
+                UserAccessLog.user_id == user_id
+            ).limit(_CLEANUP_BATCH_SIZE).scalar_subquery()
+            
+            result = db.execute(
+                update(UserAccessLog).where(UserAccessLog.id.in_(batch_ids)).values(
+                    user_id=None,
+                    ip_address=func.regexp_replace(
+                        UserAccessLog.ip_address, r"^(\d+\.\d+)\.\d+\.\d+$", r"\1.xxx.xxx"
+                    )
+                ),
+                execution_options={"synchronize_session": False}
+            )
+            db.commit()
+            
+            if result.rowcount < _CLEANUP_BATCH_SIZE:
+                return
+    
     async def cleanup_expired_audit_data(self, db: Session):
         """期限切れ監査データクリーンアップ"""
         cutoff_date = datetime.utcnow() - timedelta(days=self.retention_days)
         
-        expired_logs = db.query(UserAccessLog).filter(
-            UserAccessLog.created_at < cutoff_date
-        ).delete()
+        deleted = await run_in_threadpool(self._delete_audit_logs_before, db, cutoff_date)
+        # 時間別集計も保存期間を過ぎた分は削除
+        await run_in_threadpool(self._delete_hourly_stats_before, db, cutoff_date)
+        return deleted
+    
+    def _delete_hourly_stats_before(self, db: Session, cutoff_date: datetime) -> int:
+        """指定日時より前に完結する時間別集計を一定件数ごとに削除し、削除件数を返す"""
+        deleted = 0
+        while True:
+            batch_ids = select(AuditHourlyStat.id).where(
+                _hour_key_before(cutoff_date)
+            ).limit(_CLEANUP_BATCH_SIZE).scalar_subquery()
+            
+            result = db.execute(
+                delete(AuditHourlyStat).where(AuditHourlyStat.id.in_(batch_ids)),
+                execution_options={"synchronize_session": False}
+            )
+            db.commit()
+            
+            deleted += result.rowcount
+            if result.rowcount < _CLEANUP_BATCH_SIZE:
+                return deleted
+    
+    def rebuild_hourly_stats(
+        self,
+        db: Session,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> int:
+        """
+        時間別集計を生ログから再構築し、集計した生ログ件数を返す
+        集計テーブル導入前の期間のバックフィルに使用する（時単位に丸めた期間が対象）
+        未指定時は生ログの最古時刻から現在の時の開始時刻まで
+        実行中に対象期間の生ログが追加されると二重計上になるため、書き込みの少ない時間帯に実行する
+        """
+        if start_date is None:
+            start_date = db.query(func.min(UserAccessLog.created_at)).scalar()
+            if start_date is None:
+                return 0
+        start_date = start_date.replace(minute=0, second=0, microsecond=0)
+        end_date = (end_date or datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
         
-        db.commit()
+        # 対象期間の既存集計を削除してから生ログを加算し直す
+        db.execute(
+            delete(AuditHourlyStat).where(
+                ~_hour_key_before(start_date),
+                _hour_key_before(end_date)
+            ),
+            execution_options={"synchronize_session": False}
+        )
+        
+        logs = db.execute(
+            select(*(UserAccessLog.__table__.c[col] for col in _HOURLY_SOURCE_COLUMNS)).where(
+                UserAccessLog.created_at >= start_date,
+                UserAccessLog.created_at < end_date
+            ).execution_options(yield_per=_ROLLUP_REBUILD_BATCH_SIZE)
+        ).mappings()
         
-        return expired_logs
+        rebuilt = 0
+        for partition in logs.partitions():
+            _upsert_hourly_stats(db, partition)
+            rebuilt += len(partition)
+        
+        db.commit()
+        return rebuilt
     
-    async def _update_audit_statistics(self, event: AuditEvent, db: Session):
-        """監査統計更新"""
-        # 実装では統計テーブル更新
-        # - 日別/時間別統計
-        # - ユーザー別統計
-        # - イベント種別統計
-        pass
+    def _delete_audit_logs_before(self, db: Session, cutoff_date: datetime) -> int:
+        """
+        指定日時より古い監査ログを削除し、削除件数を返す
+        一定件数ごとに削除・コミットしてロック範囲とWALを抑える
+        """
+        deleted = 0
+        while True:
+            batch_ids = select(UserAccessLog.id).where(
+                UserAccessLog.created_at < cutoff_date
+            ).limit(_CLEANUP_BATCH_SIZE).scalar_subquery()
+            
+            result = db.execute(
+                delete(UserAccessLog).where(UserAccessLog.id.in_(batch_ids)),
+                execution_options={"synchronize_session": False}
+            )
+            db.commit()
+            
+            deleted += result.rowcount
+            if result.rowcount < _CLEANUP_BATCH_SIZE:
+                return deleted
+
 
 # グローバルインスタンス
 mlm_audit_service = MLMAuditService()
\ No newline at end of file
@@ -1,12 +1,13 @@
 # IROAS BOSS V2 - 認証サービス
 # Phase 21対応・MLMビジネス要件準拠
 
-import json
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from typing import Optional, List, Dict, Any, Tuple, Union
+from sqlalchemy.orm import Session, load_only, raiseload
+from sqlalchemy import Integer, and_, any_, bindparam, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 
 from app.models.user import (
     User, UserSession, UserAccessLog, UserPermission, UserRolePermission,
@@ -20,8 +21,34 @@ from app.schemas.auth import (
 from app.core.security import security, ACCESS_TOKEN_EXPIRE_MINUTES, REFRESH_TOKEN_EXPIRE_DAYS
 from app.database import SessionLocal
 from app.services.security_service import security_service
-from app.services.audit_service import mlm_audit_service, AuditEvent, AuditEventType
+from app.services.audit_service import mlm_audit_service, audit_log_buffer, AuditEvent, AuditEventType
 from app.services.notification_service import security_notification_service
+from app.services.permission_service import role_permissions_cache, user_permissions_cache
+
+# セッション一括無効化文（構築は1回のみ）
+# PostgreSQLではID配列を1つのパラメータ（= ANY）で渡し、IN句の展開をしない
+def _revoke_sessions_statement(id_condition):
+    return update(UserSession).where(
+        UserSession.user_id == bindparam("uid"),
+        id_condition
+    ).values(
+        is_active=False,
+        revoked_at=bindparam("ts"),
+        revoked_reason=bindparam("reason")
+    ).execution_options(synchronize_session=False)
+
+_REVOKE_SESSIONS = {
+    "postgresql": _revoke_sessions_statement(
+        UserSession.id == any_(bindparam("ids", type_=ARRAY(Integer)))
+    ),
+    "default": _revoke_sessions_statement(
+        UserSession.id.in_(bindparam("ids", expanding=True))
+    ),
+}
+
+def _user_exists(db: Session, *conditions) -> bool:
+    """条件に一致するユーザーの有無のみを確認（行の取得・ORMオブジェクト化は行わない）"""
+    return db.execute(select(User.id).where(and_(*conditions)).limit(1)).first() is not None
 
 class AuthService:
     """認証サービス（MLMビジネス要件準拠）"""
@@ -42,13 +69,13 @@ class AuthService:
     ) -> LoginResponse:
         """ユーザー認証・ログイン処理（セキュリティ強化統合）"""
         
-        # ユーザー取得
-        user = db.query(User).filter(
-            or_(
-                User.username == login_data.username,
-                User.email == login_data.username
-            )
-        ).first()
+        # 監査ログ・セッション・アクセスログの時刻を揃えるため、処理開始時刻を1回だけ取得
+        now = datetime.utcnow()
+        
+        # ユーザー取得（"@" を含む場合はメールアドレス、それ以外はユーザー名の一意インデックスで検索）
+        login_id = login_data.username
+        login_filter = User.email == login_id if "@" in login_id else User.username == login_id
+        user = db.query(User).filter(login_filter).first()
         
         if not user:
             # 監査ログ記録
@@ -65,12 +92,12 @@ class AuthService:
                     "failure_reason": "user_not_found"
                 },
                 success=False,
-                timestamp=datetime.utcnow(),
+                timestamp=now,
                 risk_level="medium"
             )
             await mlm_audit_service.log_event(audit_event, db)
             
-            await self._log_access(None, "login_failed", ip_address, user_agent, False, "ユーザーが存在しません", db)
+            await self._log_access(None, "login_failed", ip_address, user_agent, False, "ユーザーが存在しません", db, now=now)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="ユーザー名またはパスワードが正しくありません"
@@ -78,14 +105,14 @@ class AuthService:
         
         # アカウント状態チェック
         if not user.is_active:
-            await self._log_access(user.id, "login_failed", ip_address, user_agent, False, "アカウントが無効です", db)
+            await self._log_access(user.id, "login_failed", ip_address, user_agent, False, "アカウントが無効です", db, now=now)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="アカウントが無効です"
             )
         
         if user.status != UserStatus.ACTIVE:
-            await self._log_access(user.id, "login_failed", ip_address, user_agent, False, f"アカウント状態: {user.status.value}", db)
+            await self._log_access(user.id, "login_failed", ip_address, user_agent, False, f"アカウント状態: {user.status.value}", db, now=now)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail=f"アカウント状態が無効です: {user.status.value}"
@@ -93,7 +120,7 @@ class AuthService:
         
         # アカウントロックチェック
         if self.security.is_account_locked(user):
-            await self._log_access(user.id, "login_failed", ip_address, user_agent, False, "アカウントがロックされています", db)
+            await self._log_access(user.id, "login_failed", ip_address, user_agent, False, "アカウントがロックされています", db, now=now)
             raise HTTPException(
                 status_code=status.HTTP_423_LOCKED,
                 detail="アカウントがロックされています。しばらく待ってから再試行してください。"
@@ -120,7 +147,7 @@ class AuthService:
                     "security_analysis": security_analysis
                 },
                 success=False,
-                timestamp=datetime.utcnow(),
+                timestamp=now,
                 risk_level="critical"
             )
             await mlm_audit_service.log_event(audit_event, db)
@@ -142,9 +169,12 @@ class AuthService:
             )
         
         # パスワード検証
-        if not self.security.verify_password(login_data.password, user.hashed_password):
+        password_valid, upgraded_hash = await self.security.verify_and_update_password_async(
+            login_data.password, user.hashed_password
+        )
+        if not password_valid:
             self.security.increment_login_attempts(user, db)
-            await self._log_access(user.id, "login_failed", ip_address, user_agent, False, "パスワードが正しくありません", db)
+            await self._log_access(user.id, "login_failed", ip_address, user_agent, False, "パスワードが正しくありません", db, now=now)
             
             remaining_attempts = 5 - user.login_attempts
             if remaining_attempts > 0:
@@ -170,7 +200,7 @@ class AuthService:
             # MFAコード検証
             if not self._verify_mfa_code(user, login_data.mfa_code):
                 self.security.increment_login_attempts(user, db)
-                await self._log_access(user.id, "mfa_failed", ip_address, user_agent, False, "MFAコードが正しくありません", db)
+                await self._log_access(user.id, "mfa_failed", ip_address, user_agent, False, "MFAコードが正しくありません", db, now=now)
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="認証コードが正しくありません"
@@ -178,14 +208,14 @@ class AuthService:
         
         # 疑わしいアクティビティチェック
         if self.security.check_suspicious_activity(user, ip_address, db):
-            await self._log_access(user.id, "suspicious_login", ip_address, user_agent, False, "疑わしいアクティビティを検出", db)
+            await self._log_access(user.id, "suspicious_login", ip_address, user_agent, False, "疑わしいアクティビティを検出", db, now=now)
             # 管理者に通知（実装は省略）
         
         # ログイン成功
         self.security.reset_login_attempts(user, db)
         
         # セッション作成
-        session = await self._create_session(user, ip_address, user_agent, login_data.remember_me, db)
+        session = await self._create_session(user, ip_address, user_agent, login_data.remember_me, db, now=now)
         
         # トークン生成
         access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -202,13 +232,14 @@ class AuthService:
         
         # セッションにトークン情報を保存
         session.session_token = access_token[:50]  # セキュリティのため一部のみ保存
+        session.session_token_hash = self.security.hash_session_token(access_token)
         session.refresh_token = refresh_token[:50]
-        db.commit()
         
-        # ユーザー情報更新
-        user.last_login_at = datetime.utcnow()
+        # ユーザー情報更新（旧方式のパスワードハッシュは新パラメータで置き換え）
+        user.last_login_at = now
         user.last_login_ip = ip_address
-        db.commit()
+        if upgraded_hash:
+            user.hashed_password = upgraded_hash
         
         # 監査ログ記録（成功）
         audit_event = AuditEvent(
@@ -227,10 +258,14 @@ class AuthService:
                 "security_analysis": security_analysis
             },
             success=True,
-            timestamp=datetime.utcnow(),
+            timestamp=now,
             risk_level="low" if security_analysis["risk_score"] < 3 else "medium"
         )
+        
+        # 監査ログ・アクセスログ記録（同一セッションを使う同期処理のため順に実行）
         await mlm_audit_service.log_event(audit_event, db)
+        await self._log_access(user.id, "login_success", ip_address, user_agent, True, "ログイン成功", db, commit=False, now=now)
+        permissions = await self.get_user_permissions(user, db)
         
         # 追加認証が必要な場合のユーザー通知
         if security_analysis["require_additional_auth"]:
@@ -252,15 +287,12 @@ class AuthService:
                 details={
                     "ip_address": ip_address,
                     "user_agent": user_agent,
-                    "login_time": datetime.utcnow().isoformat()
+                    "login_time": now.isoformat()
                 }
             )
         
-        # アクセスログ記録
-        await self._log_access(user.id, "login_success", ip_address, user_agent, True, "ログイン成功", db)
-        
-        # 権限取得
-        permissions = await self.get_user_permissions(user.id, db)
+        # セッション・ユーザー情報・アクセスログの更新を1回でコミット
+        db.commit()
         
         return LoginResponse(
             access_token=access_token,
@@ -281,18 +313,20 @@ class AuthService:
     ) -> LoginResponse:
         """リフレッシュトークンを使用してアクセストークンを更新"""
         
+        now = datetime.utcnow()
+        
         # リフレッシュトークンを検証
         try:
             payload = self.security.verify_token(refresh_token, "refresh")
         except HTTPException:
-            await self._log_access(None, "refresh_failed", ip_address, user_agent, False, "無効なリフレッシュトークン", db)
+            await self._log_access(None, "refresh_failed", ip_address, user_agent, False, "無効なリフレッシュトークン", db, now=now)
             raise
         
         user_id = int(payload.get("sub"))
         jti = payload.get("jti")
         
         # ユーザー取得
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user or not user.is_active:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -305,12 +339,12 @@ class AuthService:
                 UserSession.user_id == user_id,
                 UserSession.jti == jti,
                 UserSession.is_active == True,
-                UserSession.refresh_expires_at > datetime.utcnow()
+                UserSession.refresh_expires_at > now
             )
         ).first()
         
         if not session:
-            await self._log_access(user_id, "refresh_failed", ip_address, user_agent, False, "セッションが無効または期限切れ", db)
+            await self._log_access(user_id, "refresh_failed", ip_address, user_agent, False, "セッションが無効または期限切れ", db, now=now)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="セッションが無効です"
@@ -324,15 +358,14 @@ class AuthService:
         )
         
         # セッション更新
-        session.last_used_at = datetime.utcnow()
+        session.last_used_at = now
         session.session_token = access_token[:50]
+        session.session_token_hash = self.security.hash_session_token(access_token)
         db.commit()
         
-        # アクセスログ記録
-        await self._log_access(user_id, "token_refresh", ip_address, user_agent, True, "トークンリフレッシュ成功", db)
-        
-        # 権限取得
-        permissions = await self.get_user_permissions(user.id, db)
+        # アクセスログ記録・権限取得
+        await self._log_access(user_id, "token_refresh", ip_address, user_agent, True, "トークンリフレッシュ成功", db, now=now)
+        permissions = await self.get_user_permissions(user, db)
         
         return LoginResponse(
             access_token=access_token,
@@ -351,36 +384,56 @@ class AuthService:
         ip_address: str,
         user_agent: str,
         db: Session
-    ):
-        """ユーザーログアウト処理"""
+    ) -> List[int]:
+        """ユーザーログアウト処理（無効化したセッションIDを返す）"""
+        
+        now = datetime.utcnow()
         
         if all_devices:
             # 全デバイスからログアウト
-            db.query(UserSession).filter(
-                UserSession.user_id == user_id
-            ).update({
-                "is_active": False,
-                "revoked_at": datetime.utcnow(),
-                "revoked_reason": "全デバイスログアウト"
-            })
+            target = UserSession.user_id == user_id
+            revoked_reason = "全デバイスログアウト"
         else:
             # 現在のセッションのみログアウト
-            db.query(UserSession).filter(
+            target = and_(
+                UserSession.user_id == user_id,
+                UserSession.session_token_hash == self.security.hash_session_token(session_token)
+            )
+            revoked_reason = "ログアウト"
+        
+        revoked_ids = self._revoke_sessions_returning_ids(db, target, now, revoked_reason)
+        
+        if not revoked_ids and not all_devices:
+            # ハッシュ列追加前に作成されたセッション（ハッシュ未設定）は従来どおりトークン先頭50文字で照合する
+            # 保存済みなのは先頭のみで元のトークンを復元できないため、ハッシュのバックフィルはできない
+            revoked_ids = self._revoke_sessions_returning_ids(
+                db,
                 and_(
                     UserSession.user_id == user_id,
+                    UserSession.session_token_hash.is_(None),
                     UserSession.session_token == session_token[:50]
-                )
-            ).update({
-                "is_active": False,
-                "revoked_at": datetime.utcnow(),
-                "revoked_reason": "ログアウト"
-            })
+                ),
+                now,
+                revoked_reason
+            )
         
         db.commit()
         
         # アクセスログ記録
         logout_type = "logout_all_devices" if all_devices else "logout"
-        await self._log_access(user_id, logout_type, ip_address, user_agent, True, "ログアウト成功", db)
+        await self._log_access(user_id, logout_type, ip_address, user_agent, True, "ログアウト成功", db, now=now)
+        
+        return revoked_ids
+    
+    def _revoke_sessions_returning_ids(self, db: Session, target, now: datetime, revoked_reason: str) -> List[int]:
+        """無効化と対象セッションIDの取得を1回のUPDATE ... RETURNINGで行う"""
+        return db.execute(
+            update(UserSession).where(target).values(
+                is_active=False,
+                revoked_at=now,
+                revoked_reason=revoked_reason
+            ).returning(UserSession.id).execution_options(synchronize_session=False)
+        ).scalars().all()
     
     # ===================
     # ユーザー管理
@@ -395,21 +448,20 @@ class AuthService:
         """ユーザー作成"""
         
         # 重複チェック
-        existing_user = db.query(User).filter(
+        if _user_exists(
+            db,
             or_(
                 User.username == user_data.username,
                 User.email == user_data.email
             )
-        ).first()
-        
-        if existing_user:
+        ):
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
                 detail="ユーザー名またはメールアドレスが既に使用されています"
             )
         
         # パスワードハッシュ化
-        hashed_password = self.security.hash_password(user_data.password)
+        hashed_password = await self.security.hash_password_async(user_data.password)
         
         # ユーザー作成
         new_user = User(
@@ -442,73 +494,74 @@ class AuthService:
     ) -> UserSummary:
         """ユーザー更新"""
         
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="ユーザーが見つかりません"
-            )
-        
         # 更新可能フィールドの更新
         update_data = user_data.dict(exclude_unset=True)
         
         # メールアドレス重複チェック
         if "email" in update_data:
-            existing_user = db.query(User).filter(
-                and_(
-                    User.email == update_data["email"],
-                    User.id != user_id
-                )
-            ).first()
-            
-            if existing_user:
+            if _user_exists(db, User.email == update_data["email"], User.id != user_id):
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
                     detail="メールアドレスが既に使用されています"
                 )
         
-        # 更新実行
-        for field, value in update_data.items():
-            setattr(user, field, value)
+        # 更新実行（事前の読み込みは行わず、UPDATE ... RETURNINGで更新後の値を取得）
+        user = db.execute(
+            update(User).where(User.id == user_id).values(
+                **update_data, updated_at=datetime.utcnow()
+            ).returning(User)
+        ).scalar_one_or_none()
+        
+        if not user:
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="ユーザーが見つかりません"
+            )
         
-        user.updated_at = datetime.utcnow()
+        # コミットで属性が失効する前にレスポンスを確定
+        user_summary = UserSummary.from_orm(user)
         db.commit()
-        db.refresh(user)
+        
+        # ロール・有効状態の変更は権限チェック結果に影響するためキャッシュを破棄
+        if update_data.keys() & {"role", "is_active", "status"}:
+            user_permissions_cache.invalidate(user_id)
         
         # アクセスログ記録
-        await self._log_access(updated_by, "user_updated", None, None, True, f"ユーザー更新: {user.username}", db)
+        await self._log_access(updated_by, "user_updated", None, None, True, f"ユーザー更新: {user_summary.username}", db)
         
-        return UserSummary.from_orm(user)
+        return user_summary
     
     # ===================
     # 権限管理
     # ===================
     
-    async def get_user_permissions(self, user_id: int, db: Session) -> List[str]:
-        """ユーザーの権限一覧を取得"""
+    async def get_user_permissions(self, user_or_id: Union[User, int], db: Session) -> List[str]:
+        """ユーザーの権限一覧を取得（取得済みのUserを渡した場合は再取得しない）"""
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = user_or_id if isinstance(user_or_id, User) else db.get(User, user_or_id)
         if not user:
             return []
         
-        # ロールベースの権限を取得
-        role_permissions = db.query(UserRolePermission).filter(
-            and_(
-                UserRolePermission.role == user.role,
-                UserRolePermission.is_granted == True
-            )
-        ).all()
-        
-        permission_ids = [rp.permission_id for rp in role_permissions]
+        cached = role_permissions_cache.get(user.role)
+        if cached is not None:
+            return list(cached)
         
-        permissions = db.query(UserPermission).filter(
-            and_(
-                UserPermission.id.in_(permission_ids),
-                UserPermission.is_active == True
-            )
-        ).all()
-        
-        return [p.permission_code for p in permissions]
+        # ロールベースの権限を取得（権限コード列のみを1クエリで）
+        permission_codes = [
+            code for (code,) in db.query(UserPermission.permission_code).join(
+                UserRolePermission,
+                UserRolePermission.permission_id == UserPermission.id
+            ).filter(
+                and_(
+                    UserRolePermission.role == user.role,
+                    UserRolePermission.is_granted == True,
+                    UserPermission.is_active == True
+                )
+            ).all()
+        ]
+        role_permissions_cache.set(user.role, tuple(permission_codes))
+        return permission_codes
     
     async def check_permission(
         self, 
@@ -518,8 +571,12 @@ class AuthService:
     ) -> bool:
         """ユーザーの権限をチェック"""
         
-        user_permissions = await self.get_user_permissions(user_id, db)
-        return permission_code in user_permissions or "admin.*" in user_permissions
+        user_permissions = user_permissions_cache.get(user_id)
+        if user_permissions is None:
+            user_permissions = frozenset(await self.get_user_permissions(user_id, db))
+            user_permissions_cache.set(user_id, user_permissions)
+        
+        return "admin.*" in user_permissions or permission_code in user_permissions
     
     # ===================
     # セッション管理
@@ -528,7 +585,15 @@ class AuthService:
     async def get_user_sessions(self, user_id: int, db: Session) -> List[SessionInfo]:
         """ユーザーのセッション一覧を取得"""
         
-        sessions = db.query(UserSession).filter(
+        # SessionInfo に必要な列のみ読み込み、リレーションの遅延読み込み（N+1）は禁止
+        sessions = db.query(UserSession).options(
+            load_only(
+                UserSession.id, UserSession.ip_address, UserSession.user_agent,
+                UserSession.device_info, UserSession.created_at,
+                UserSession.last_used_at, UserSession.expires_at
+            ),
+            raiseload("*")
+        ).filter(
             and_(
                 UserSession.user_id == user_id,
                 UserSession.is_active == True,
@@ -547,16 +612,13 @@ class AuthService:
     ):
         """指定されたセッションを無効化"""
         
-        db.query(UserSession).filter(
-            and_(
-                UserSession.user_id == user_id,
-                UserSession.id.in_(session_ids)
-            )
-        ).update({
-            "is_active": False,
-            "revoked_at": datetime.utcnow(),
-            "revoked_reason": reason
-        }, synchronize_session=False)
+        statement = _REVOKE_SESSIONS.get(db.get_bind().dialect.name, _REVOKE_SESSIONS["default"])
+        db.execute(statement, {
+            "uid": user_id,
+            "ids": list(session_ids),
+            "ts": datetime.utcnow(),
+            "reason": reason
+        })
         
         db.commit()
     
@@ -572,7 +634,7 @@ class AuthService:
     ) -> MFASetupResponse:
         """MFA設定"""
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -584,12 +646,14 @@ class AuthService:
             if not user.mfa_secret:
                 user.mfa_secret = self.security.generate_mfa_secret()
             
-            # QRコード生成
-            qr_code = self.security.generate_mfa_qr_code(user.username, user.mfa_secret)
+            # QRコード生成（PNG描画はCPU処理のためイベントループ外で実行）
+            qr_code = await run_in_threadpool(
+                self.security.generate_mfa_qr_code, user.username, user.mfa_secret
+            )
             
             # バックアップコード生成
             backup_codes = self.security.generate_backup_codes()
-            user.mfa_backup_codes = json.dumps(self.security.hash_backup_codes(backup_codes))
+            user.mfa_backup_codes = self.security.hash_backup_codes(backup_codes)
             
             # 認証コード検証（初回設定時）
             if mfa_request.verification_code:
@@ -633,32 +697,33 @@ class AuthService:
         ip_address: str,
         user_agent: str,
         remember_me: bool,
-        db: Session
+        db: Session,
+        now: Optional[datetime] = None
     ) -> UserSession:
         """セッションを作成"""
         
+        now = now or datetime.utcnow()
         device_info = self.security.extract_device_info(user_agent)
         
         # セッション期間設定
         if remember_me:
-            expires_at = datetime.utcnow() + timedelta(days=30)
+            expires_at = now + timedelta(days=30)
         else:
-            expires_at = datetime.utcnow() + timedelta(hours=8)
+            expires_at = now + timedelta(hours=8)
         
         session = UserSession(
             user_id=user.id,
             session_token="",  # 後で更新
             ip_address=ip_address,
             user_agent=user_agent,
-            device_info=json.dumps(device_info),
+            device_info=device_info,
             expires_at=expires_at,
-            refresh_expires_at=datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+            refresh_expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
             is_active=True
         )
         
         db.add(session)
-        db.commit()
-        db.refresh(session)
+        db.flush()  # 主キーのみ確定し、コミットは呼び出し側でまとめて行う
         
         return session
     
@@ -670,21 +735,35 @@ class AuthService:
         user_agent: str,
         success: bool,
         message: str,
-        db: Session
+        db: Session,
+        commit: bool = True,
+        now: Optional[datetime] = None
     ):
-        """アクセスログを記録"""
-        
-        log = UserAccessLog(
-            user_id=user_id,
-            action=action,
-            ip_address=ip_address,
-            user_agent=user_agent,
-            success=success,
-            error_message=message if not success else None
-        )
-        
-        db.add(log)
-        db.commit()
+        """
+        アクセスログを記録
+        通常は監査ログバッファ経由で一括書き込みし、バッファ未稼働時は直接INSERTする
+        ユーザー不明（user_id なし）の認証失敗ログは、user_id のNULL許可化が未適用の
+        データベースでも他のログを巻き込まないよう、バッファを経由せず直接INSERTする
+        （commit=False の場合は呼び出し側でコミット）
+        """
+        
+        row = {
+            "user_id": user_id,
+            "action": action,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "path": None,
+            "method": None,
+            "success": success,
+            "error_message": message if not success else None,
+            "created_at": now or datetime.utcnow(),
+        }
+        if user_id is not None and audit_log_buffer.put(row):
+            return
+        
+        db.add(UserAccessLog(**row))
+        if commit:
+            db.commit()
     
     def _verify_mfa_code(self, user: User, code: str) -> bool:
         """MFAコードまたはバックアップコードを検証"""
@@ -695,16 +774,12 @@ class AuthService:
         
         # バックアップコード検証
         if user.mfa_backup_codes:
-            try:
-                backup_codes = json.loads(user.mfa_backup_codes)
-                is_valid, updated_codes = self.security.verify_backup_code(backup_codes, code)
-                
-                if is_valid:
-                    # 使用済みコードを更新
-                    user.mfa_backup_codes = json.dumps(updated_codes)
-                    return True
-            except (json.JSONDecodeError, TypeError):
-                pass
+            is_valid, updated_codes = self.security.verify_backup_code(user.mfa_backup_codes, code)
+            
+            if is_valid:
+                # 使用済みコードを更新
+                user.mfa_backup_codes = updated_codes
+                return True
         
         return False
 
@@ -15,14 +15,17 @@ Phase E-1a: データ管理API群（8.1-8.4）
 import os
 import json
 import base64
+import fcntl
 import zipfile
 import shutil
-from typing import List, Optional, Dict, Any, BinaryIO
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any, BinaryIO, Iterator
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from pathlib import Path
 import pandas as pd
-from io import BytesIO, StringIO
+from io import BytesIO
 
 from app.models.member import Member
 from app.schemas.data import (
@@ -38,6 +41,9 @@ from app.schemas.data import (
 )
 from app.services.activity_service import ActivityService
 
+# バックアップ書き出し時に圧縮スレッドへまとめて渡す文字数の目安
+BACKUP_WRITE_BUFFER_SIZE = int(os.getenv("BACKUP_WRITE_BUFFER_SIZE", str(1024 * 1024)))
+
 
 class DataService:
     """
@@ -50,6 +56,7 @@ class DataService:
         self.activity_service = ActivityService(db)
         self.backup_dir = Path("/tmp/iroas_backups")
         self.backup_dir.mkdir(exist_ok=True)
+        self.backup_index_path = self.backup_dir / ".index.json"
 
     async def import_member_data(
         self,
@@ -157,24 +164,25 @@ class DataService:
         backup_path = self.backup_dir / backup_filename
         
         try:
-            # バックアップデータ収集
-            backup_data = await self._collect_backup_data(backup_request.backup_type)
+            table_counts = {"members": 0, "payments": 0, "rewards": 0}
             
             # バックアップファイル作成
-            with zipfile.ZipFile(backup_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            compression = zipfile.ZIP_DEFLATED if backup_request.compression else zipfile.ZIP_STORED
+            with zipfile.ZipFile(
+                backup_path, 'w', compression, compresslevel=backup_request.compression_level
+            ) as zipf:
                 
                 if backup_request.backup_type in [BackupTypeEnum.FULL, BackupTypeEnum.MEMBERS]:
-                    # 会員データ
-                    members_data = self._export_members_data()
-                    zipf.writestr("members.json", json.dumps(members_data, ensure_ascii=False, indent=2))
+                    # 会員データ（全件をメモリに載せずアーカイブへ直接書き出す）
+                    table_counts["members"] = self._write_members_json(zipf)
                 
                 if backup_request.backup_type in [BackupTypeEnum.FULL, BackupTypeEnum.PAYMENTS]:
                     # 決済データ（実装予定）
-                    zipf.writestr("payments.json", json.dumps([], ensure_ascii=False, indent=2))
+                    zipf.writestr("payments.json", "[]", compress_type=zipfile.ZIP_STORED)
                 
                 if backup_request.backup_type in [BackupTypeEnum.FULL, BackupTypeEnum.REWARDS]:
                     # 報酬データ（実装予定）
-                    zipf.writestr("rewards.json", json.dumps([], ensure_ascii=False, indent=2))
+                    zipf.writestr("rewards.json", "[]", compress_type=zipfile.ZIP_STORED)
                 
                 if backup_request.backup_type in [BackupTypeEnum.FULL, BackupTypeEnum.SETTINGS]:
                     # 設定データ
@@ -203,7 +211,7 @@ class DataService:
                 user_id="system"
             )
             
-            return BackupResponse(
+            backup = BackupResponse(
                 backup_id=hash(backup_filename) % 1000000,  # 簡易ID生成
                 backup_name=backup_name,
                 backup_type=backup_request.backup_type,
@@ -211,17 +219,23 @@ class DataService:
                 file_name=backup_filename,
                 file_size_bytes=file_size,
                 file_path=str(backup_path),
-                is_compressed=True,
+                is_compressed=backup_request.compression,
                 is_encrypted=backup_request.encryption,
                 compression_ratio=75.0,  # 概算
-                total_records=len(backup_data.get("members", [])),
-                table_counts=self._get_table_counts(backup_data),
+                total_records=sum(table_counts.values()),
+                table_counts=table_counts,
                 created_at=started_at,
                 created_by="system",
                 backup_duration_seconds=(completed_at - started_at).total_seconds(),
                 status="completed"
             )
             
+            # 一覧用インデックスへ登録
+            with self._locked_backup_index() as index:
+                index[backup_filename] = backup.model_dump(mode="json")
+            
+            return backup
+            
         except Exception as e:
             await self.activity_service.log_activity(
                 action="バックアップ作成失敗",
@@ -259,46 +273,96 @@ class DataService:
         if not self.backup_dir.exists():
             return backups
         
-        for backup_file in self.backup_dir.glob("*.zip"):
-            try:
-                # メタデータ読み込み
-                with zipfile.ZipFile(backup_file, 'r') as zipf:
-                    metadata_content = zipf.read("metadata.json").decode('utf-8')
-                    metadata = json.loads(metadata_content)
-                
-                file_size = backup_file.stat().st_size
-                created_time = datetime.fromtimestamp(backup_file.stat().st_ctime)
+        # インデックスを正としつつ、実ファイルとの差分だけを反映する
+        with self._locked_backup_index() as index:
+            file_names = set()
+            for entry in os.scandir(self.backup_dir):
+                if not entry.name.endswith(".zip") or not entry.is_file():
+                    continue
+                file_names.add(entry.name)
                 
-                backup = BackupResponse(
-                    backup_id=hash(backup_file.name) % 1000000,
-                    backup_name=metadata.get("backup_name", backup_file.stem),
-                    backup_type=BackupTypeEnum(metadata.get("backup_type", "full")),
-                    description=metadata.get("description"),
-                    file_name=backup_file.name,
-                    file_size_bytes=file_size,
-                    file_path=str(backup_file),
-                    is_compressed=True,
-                    is_encrypted=False,  # 暫定
-                    compression_ratio=75.0,
-                    total_records=0,  # メタデータから取得可能
-                    table_counts={},
-                    created_at=created_time,
-                    created_by="system",
-                    backup_duration_seconds=0,
-                    status="completed"
-                )
+                cached = index.get(entry.name)
+                if cached is not None:
+                    backups.append(BackupResponse(**cached))
+                    continue
                 
+                # インデックス未登録のファイルのみメタデータを読み込む
+                backup = self._read_backup_metadata(entry)
+                if backup is None:
+                    continue
+                index[entry.name] = backup.model_dump(mode="json")
                 backups.append(backup)
-                
-            except Exception as e:
-                # 読み込めないファイルはスキップ
-                continue
+            
+            # 削除済みファイルのエントリを除去
+            for file_name in index.keys() - file_names:
+                del index[file_name]
         
         # 作成日時順にソート
         backups.sort(key=lambda x: x.created_at, reverse=True)
         
         return backups
 
+    def _read_backup_metadata(self, entry: os.DirEntry) -> Optional[BackupResponse]:
+        """
+        バックアップファイルからメタデータを読み込む（読み込めない場合はNone）
+        """
+        try:
+            # メタデータ読み込み
+            with zipfile.ZipFile(entry.path, 'r') as zipf:
+                metadata_content = zipf.read("metadata.json").decode('utf-8')
+                metadata = json.loads(metadata_content)
+            
+            # DirEntryのstat結果はキャッシュされるため1回のシステムコールで済む
+            stat = entry.stat()
+            
+            return BackupResponse(
+                backup_id=hash(entry.name) % 1000000,
+                backup_name=metadata.get("backup_name", Path(entry.name).stem),
+                backup_type=BackupTypeEnum(metadata.get("backup_type", "full")),
+                description=metadata.get("description"),
+                file_name=entry.name,
+                file_size_bytes=stat.st_size,
+                file_path=entry.path,
+                is_compressed=True,
+                is_encrypted=False,  # 暫定
+                compression_ratio=75.0,
+                total_records=0,  # メタデータから取得可能
+                table_counts={},
+                created_at=datetime.fromtimestamp(stat.st_ctime),
+                created_by="system",
+                backup_duration_seconds=0,
+                status="completed"
+            )
+            
+        except Exception:
+            # 読み込めないファイルはスキップ
+            return None
+
+    @contextmanager
+    def _locked_backup_index(self) -> Iterator[Dict[str, Dict[str, Any]]]:
+        """
+        バックアップ一覧インデックスを排他ロック下で読み込み、変更があれば書き戻す
+        """
+        lock_path = self.backup_index_path.with_suffix(".lock")
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                try:
+                    index = json.loads(self.backup_index_path.read_text(encoding="utf-8"))
+                except (FileNotFoundError, ValueError):
+                    # 未作成・破損時は空から再構築する
+                    index = {}
+                original = dict(index)
+                
+                yield index
+                
+                if index != original:
+                    tmp_path = self.backup_index_path.with_suffix(".tmp")
+                    tmp_path.write_text(json.dumps(index, ensure_ascii=False), encoding="utf-8")
+                    os.replace(tmp_path, self.backup_index_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
     async def restore_backup(
         self,
         backup_id: int,
@@ -324,7 +388,8 @@ class DataService:
                 pre_backup_request = BackupRequest(
                     backup_type=BackupTypeEnum.FULL,
                     backup_name=f"pre_restore_{started_at.strftime('%Y%m%d_%H%M%S')}",
-                    description=f"リストア前自動バックアップ（復元対象: {target_backup.backup_name}）"
+                    description=f"リストア前自動バックアップ（復元対象: {target_backup.backup_name}）",
+                    compression_level=1  # 一時的な退避用のため速度を優先
                 )
                 pre_backup = await self.create_backup(pre_backup_request)
                 pre_restore_backup_id = pre_backup.backup_id
@@ -399,19 +464,22 @@ class DataService:
         """
         CSV読み込み（エンコーディング自動判定対応）
         """
+        # 文字列へのデコードを挟まずバイト列のままCエンジンで読み込む
+        # 会員番号は型推論させず文字列として扱う（先頭ゼロの欠落防止）
+        buffer = BytesIO(file_content)
+        read_options = {"engine": "c", "dtype": {"member_number": str}}
         try:
             # 指定エンコーディングで試行
-            content_str = file_content.decode(encoding)
-            return pd.read_csv(StringIO(content_str))
+            return pd.read_csv(buffer, encoding=encoding, **read_options)
         except UnicodeDecodeError:
             # Shift-JISで再試行
             try:
-                content_str = file_content.decode('shift_jis')
-                return pd.read_csv(StringIO(content_str))
+                buffer.seek(0)
+                return pd.read_csv(buffer, encoding='shift_jis', **read_options)
             except UnicodeDecodeError:
                 # UTF-8で再試行
-                content_str = file_content.decode('utf-8')
-                return pd.read_csv(StringIO(content_str))
+                buffer.seek(0)
+                return pd.read_csv(buffer, encoding='utf-8', **read_options)
 
     def _validate_import_data(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -426,12 +494,17 @@ class DataService:
         if missing_columns:
             errors.append(f"必須カラムが不足: {missing_columns}")
         
-        # データ型チェック
-        for idx, row in df.iterrows():
-            if pd.isna(row.get('member_number')):
-                errors.append(f"行{idx+1}: 会員番号が空です")
-            elif not str(row['member_number']).isdigit():
-                warnings.append(f"行{idx+1}: 会員番号が数字ではありません")
+        # データ型チェック（行ごとではなく列単位で判定）
+        if 'member_number' in df.columns:
+            member_numbers = df['member_number']
+            empty_mask = member_numbers.isna()
+            non_digit_mask = ~empty_mask & ~member_numbers.astype(str).str.isdigit()
+        else:
+            empty_mask = pd.Series(True, index=df.index)
+            non_digit_mask = ~empty_mask
+        
+        errors.extend(f"行{idx+1}: 会員番号が空です" for idx in df.index[empty_mask.to_numpy()])
+        warnings.extend(f"行{idx+1}: 会員番号が数字ではありません" for idx in df.index[non_digit_mask.to_numpy()])
         
         return {
             "is_valid": len(errors) == 0,
@@ -464,25 +537,43 @@ class DataService:
             "summary": {}
         }
         
-        for idx, row in df.iterrows():
+        # 行ごとのSeries生成を避けるため、辞書のリストへ1回で変換
+        records = df.to_dict(orient='records')
+        member_numbers = [str(record.get('member_number', '')) for record in records]
+        
+        # 会員番号による重複チェック（既存会員を1クエリでまとめて取得）
+        # 値は既存会員のID、またはこのインポートで追加予定の行データ
+        existing: Dict[str, Any] = dict(
+            self.db.query(Member.member_number, Member.id).filter(
+                Member.member_number.in_(set(member_numbers))
+            ).all()
+        )
+        to_insert: List[Dict[str, Any]] = []
+        to_update: Dict[int, Dict[str, Any]] = {}
+        
+        for idx, record, member_number in zip(df.index, records, member_numbers):
             try:
-                # 会員番号による重複チェック
-                member_number = str(row.get('member_number', ''))
-                existing_member = self.db.query(Member).filter(Member.member_number == member_number).first()
+                existing_member = existing.get(member_number)
                 
-                if existing_member:
+                if existing_member is not None:
                     if duplicate_handling == "skip":
                         results["skipped_count"] += 1
                         continue
                     elif duplicate_handling == "update" and update_existing:
-                        # 既存会員更新
-                        self._update_member_from_row(existing_member, row)
+                        # 既存会員更新（追加予定の行と重複した場合はその行データを上書き）
+                        changes = self._member_changes_from_row(record)
+                        if isinstance(existing_member, dict):
+                            existing_member.update(changes)
+                        else:
+                            to_update.setdefault(existing_member, {"id": existing_member}).update(changes)
                         results["updated_count"] += 1
                     elif duplicate_handling == "error":
                         raise ValueError(f"重複する会員番号: {member_number}")
                 else:
                     # 新規会員作成
-                    self._create_member_from_row(row)
+                    new_member = self._member_mapping_from_row(record)
+                    to_insert.append(new_member)
+                    existing[member_number] = new_member
                     results["success_count"] += 1
                 
                 results["processed_rows"] += 1
@@ -494,43 +585,72 @@ class DataService:
                 if stop_on_error or results["error_count"] >= max_errors:
                     break
         
+        # 一括書き込み
+        if to_insert:
+            self.db.bulk_insert_mappings(Member, to_insert)
+        if to_update:
+            self.db.bulk_update_mappings(Member, list(to_update.values()))
+        
         self.db.commit()
         
         return results
 
-    def _export_members_data(self) -> List[Dict[str, Any]]:
-        """
-        会員データエクスポート
+    def _serialize_member(self, member: Member) -> Dict[str, Any]:
         """
-        members = self.db.query(Member).all()
-        members_data = []
-        
-        for member in members:
-            member_dict = {
-                "id": member.id,
-                "status": member.status.value if member.status else None,
-                "member_number": member.member_number,
-                "name": member.name,
-                "kana": member.kana,
-                "email": member.email,
-                # 他の30項目も同様に追加
-                "created_at": member.created_at.isoformat() if member.created_at else None,
-                "updated_at": member.updated_at.isoformat() if member.updated_at else None
-            }
-            members_data.append(member_dict)
-        
-        return members_data
-
-    def _get_table_counts(self, backup_data: Dict[str, Any]) -> Dict[str, int]:
-        """
-        テーブル別レコード数取得
+        会員データを1件分のバックアップ形式に変換
         """
         return {
-            "members": len(backup_data.get("members", [])),
-            "payments": len(backup_data.get("payments", [])),
-            "rewards": len(backup_data.get("rewards", []))
+            "id": member.id,
+            "status": member.status.value if member.status else None,
+            "member_number": member.member_number,
+            "name": member.name,
+            "kana": member.kana,
+            "email": member.email,
+            # 他の30項目も同様に追加
+            "created_at": member.created_at.isoformat() if member.created_at else None,
+            "updated_at": member.updated_at.isoformat() if member.updated_at else None
         }
 
+    def _write_members_json(self, zipf: zipfile.ZipFile) -> int:
+        """
+        会員データをJSON配列としてアーカイブへ逐次書き出し、件数を返す
+        """
+        count = 0
+        parts: List[str] = ["["]
+        size = 0
+        pending: Optional[Future] = None
+        # 圧縮・書き込みは別スレッドで行い、次ブロックのシリアライズと並行させる
+        with zipf.open("members.json", "w") as dest, ThreadPoolExecutor(max_workers=1) as compressor:
+            for member in self.db.query(Member).yield_per(1000):
+                if count:
+                    parts.append(",")
+                record = json.dumps(self._serialize_member(member), ensure_ascii=False)
+                parts.append(record)
+                size += len(record)
+                count += 1
+                if size >= BACKUP_WRITE_BUFFER_SIZE:
+                    pending = self._submit_backup_block(compressor, dest, parts, pending)
+                    parts, size = [], 0
+            parts.append("]")
+            self._submit_backup_block(compressor, dest, parts, pending).result()
+        
+        return count
+
+    @staticmethod
+    def _submit_backup_block(
+        compressor: ThreadPoolExecutor,
+        dest: BinaryIO,
+        parts: List[str],
+        pending: Optional[Future]
+    ) -> Future:
+        """
+        前ブロックの書き込み完了を待ってから次ブロックを圧縮スレッドへ渡す
+        """
+        block = "".join(parts).encode("utf-8")
+        if pending is not None:
+            pending.result()
+        return compressor.submit(dest.write, block)
+
     def _validate_backup_file(self, file_path: str) -> Dict[str, Any]:
         """
         バックアップファイル検証
@@ -551,17 +671,6 @@ class DataService:
         except Exception as e:
             return {"is_valid": False, "errors": [str(e)]}
 
-    async def _collect_backup_data(self, backup_type: BackupTypeEnum) -> Dict[str, Any]:
-        """
-        バックアップデータ収集
-        """
-        data = {}
-        
-        if backup_type in [BackupTypeEnum.FULL, BackupTypeEnum.MEMBERS]:
-            data["members"] = self._export_members_data()
-        
-        return data
-
     async def _execute_restore(
         self,
         backup_path: str,
@@ -602,30 +711,28 @@ class DataService:
         
         return restore_results
 
-    def _create_member_from_row(self, row: pd.Series) -> Member:
+    def _member_mapping_from_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
         """
-        行データから会員作成
+        行データから新規会員の登録内容を作成
         """
         # 実装は省略（実際にはすべての30項目をマッピング）
-        new_member = Member(
-            member_number=str(row.get('member_number', '')),
-            name=str(row.get('name', '')),
-            kana=str(row.get('kana', '')),
-            email=str(row.get('email', '')) if pd.notna(row.get('email')) else None,
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
-        
-        self.db.add(new_member)
-        return new_member
+        now = datetime.now()
+        return {
+            "member_number": str(row.get('member_number', '')),
+            "name": str(row.get('name', '')),
+            "kana": str(row.get('kana', '')),
+            "email": str(row.get('email', '')) if pd.notna(row.get('email')) else None,
+            "created_at": now,
+            "updated_at": now
+        }
 
-    def _update_member_from_row(self, member: Member, row: pd.Series):
+    def _member_changes_from_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
         """
-        行データから会員更新
+        行データから会員の更新内容を作成（行にない項目は変更しない）
         """
-        member.name = str(row.get('name', member.name))
-        member.kana = str(row.get('kana', member.kana))
-        member.updated_at = datetime.now()
+        changes = {key: str(row[key]) for key in ('name', 'kana') if key in row}
+        changes["updated_at"] = datetime.now()
+        return changes
 
     def _restore_members_data(self, members_data: List[Dict[str, Any]], overwrite_existing: bool) -> int:
         """
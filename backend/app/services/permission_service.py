@@ -1,13 +1,54 @@
 # IROAS BOSS V2 - 権限管理サービス  
 # Phase 21対応・MLMビジネス要件準拠
 
-from typing import List, Dict, Any, Optional
+import os
+import time
+import threading
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 
 from app.models.user import UserPermission, UserRolePermission, UserRole, User
 from app.schemas.auth import PermissionSummary, RolePermissionsResponse
 
+class PermissionsCache:
+    """
+    権限情報のプロセス内キャッシュ（TTL付き）
+    ロール権限はほぼ更新されないため、ログイン・トークン更新・権限チェックごとの権限取得クエリを省略する
+    権限・ロールを書き換えた場合は invalidate / clear で破棄する
+    """
+    
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Any, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: Any) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+    
+    def set(self, key: Any, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+    
+    def invalidate(self, key: Any):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# ロール別の権限コード（tuple）、ユーザー別の権限コード集合（frozenset）
+role_permissions_cache = PermissionsCache(
+    ttl_seconds=int(os.getenv("ROLE_PERMISSIONS_CACHE_TTL", "300"))
+)
+user_permissions_cache = PermissionsCache(
+    ttl_seconds=int(os.getenv("USER_PERMISSIONS_CACHE_TTL", "60"))
+)
+
 class PermissionService:
     """権限管理サービス（MLMビジネス要件準拠）"""
     
@@ -366,6 +407,8 @@ class PermissionService:
                     db.add(role_permission)
         
         db.commit()
+        role_permissions_cache.clear()
+        user_permissions_cache.clear()
     
     # ===================
     # 権限管理
@@ -425,7 +468,7 @@ class PermissionService:
     ) -> bool:
         """ユーザーの特定権限をチェック"""
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user:
             return False
         
@@ -464,7 +507,7 @@ class PermissionService:
     ) -> bool:
         """ユーザーのリソースアクセス権限をチェック"""
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user:
             return False
         
@@ -499,6 +542,72 @@ class PermissionService:
         
         return False
     
+    async def check_user_permissions_bulk(
+        self, 
+        user_id: int, 
+        permission_codes: List[str], 
+        db: Session
+    ) -> Dict[str, bool]:
+        """ユーザーの複数権限を一括チェック（1クエリ）"""
+        
+        user = db.get(User, user_id)
+        if not user:
+            return {code: False for code in permission_codes}
+        
+        # スーパーユーザーは全権限を持つ
+        if user.is_superuser:
+            return {code: True for code in permission_codes}
+        
+        granted_codes = {
+            code for (code,) in db.query(UserPermission.permission_code).join(
+                UserRolePermission,
+                UserRolePermission.permission_id == UserPermission.id
+            ).filter(
+                and_(
+                    UserPermission.permission_code.in_(permission_codes),
+                    UserPermission.is_active == True,
+                    UserRolePermission.role == user.role,
+                    UserRolePermission.is_granted == True
+                )
+            ).all()
+        }
+        
+        return {code: code in granted_codes for code in permission_codes}
+    
+    async def check_user_resource_access_bulk(
+        self, 
+        user_id: int, 
+        resource_actions: List[Tuple[str, str]], 
+        db: Session
+    ) -> Dict[Tuple[str, str], bool]:
+        """ユーザーの複数リソースアクセス権限を一括チェック（1クエリ）"""
+        
+        user = db.get(User, user_id)
+        if not user:
+            return {key: False for key in resource_actions}
+        
+        # スーパーユーザーは全権限を持つ
+        if user.is_superuser:
+            return {key: True for key in resource_actions}
+        
+        granted = {
+            (resource, action) for resource, action in db.query(
+                UserPermission.resource, UserPermission.action
+            ).join(
+                UserRolePermission,
+                UserRolePermission.permission_id == UserPermission.id
+            ).filter(
+                and_(
+                    UserPermission.resource.in_([resource for resource, _ in resource_actions]),
+                    UserPermission.is_active == True,
+                    UserRolePermission.role == user.role,
+                    UserRolePermission.is_granted == True
+                )
+            ).all()
+        }
+        
+        return {key: key in granted for key in resource_actions}
+    
     async def get_user_accessible_resources(
         self, 
         user_id: int, 
@@ -506,7 +615,7 @@ class PermissionService:
     ) -> Dict[str, List[str]]:
         """ユーザーがアクセス可能なリソース・アクション一覧を取得"""
         
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user:
             return {}
         
@@ -545,6 +654,59 @@ class PermissionService:
         
         return resource_actions
     
+    async def get_accessible_resources_for_users(
+        self, 
+        user_ids: List[int], 
+        db: Session
+    ) -> Dict[int, Dict[str, List[str]]]:
+        """複数ユーザーのアクセス可能リソース・アクション一覧を一括取得"""
+        
+        users = db.query(User.id, User.role, User.is_superuser).filter(
+            User.id.in_(user_ids)
+        ).all()
+        
+        roles = {user.role for user in users if not user.is_superuser}
+        
+        # ロール単位でまとめて取得（ユーザー数に依存しないクエリ数）
+        role_rows = db.query(
+            UserRolePermission.role, UserPermission.resource, UserPermission.action
+        ).join(
+            UserPermission,
+            UserRolePermission.permission_id == UserPermission.id
+        ).filter(
+            and_(
+                UserRolePermission.role.in_(roles),
+                UserRolePermission.is_granted == True,
+                UserPermission.is_active == True
+            )
+        ).all() if roles else []
+        
+        rows_by_role: Dict[UserRole, List[Tuple[str, str]]] = {}
+        for role, resource, action in role_rows:
+            rows_by_role.setdefault(role, []).append((resource, action))
+        
+        # スーパーユーザーは全リソースにアクセス可能
+        if any(user.is_superuser for user in users):
+            all_rows = db.query(UserPermission.resource, UserPermission.action).filter(
+                UserPermission.is_active == True
+            ).all()
+        else:
+            all_rows = []
+        
+        result = {user_id: {} for user_id in user_ids}
+        for user in users:
+            rows = all_rows if user.is_superuser else rows_by_role.get(user.role, [])
+            
+            # リソース別アクション一覧を作成
+            resource_actions = result[user.id]
+            for resource, action in rows:
+                if resource:
+                    actions = resource_actions.setdefault(resource, [])
+                    if action and action not in actions:
+                        actions.append(action)
+        
+        return result
+    
     # ===================
     # MLMビジネス固有権限チェック
     # ===================
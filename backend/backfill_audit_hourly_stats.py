@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+監査ログ時間別集計バックフィルスクリプト
+集計テーブル導入前の期間を含め、生ログ（user_access_logs）から
+audit_hourly_stats を再構築する
+
+使い方:
+    python backfill_audit_hourly_stats.py [開始日時 [終了日時]]
+    日時は ISO 形式（例: 2025-01-01T00:00:00）、未指定時は全期間
+"""
+
+import sys
+import os
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal
+from app.services.audit_service import mlm_audit_service
+
+def main():
+    start_date = datetime.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+    end_date = datetime.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else None
+    
+    print("Rebuilding audit hourly stats...")
+    db = SessionLocal()
+    try:
+        rebuilt = mlm_audit_service.rebuild_hourly_stats(db, start_date, end_date)
+        print(f"✅ Aggregated {rebuilt} access log rows into audit_hourly_stats")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Error rebuilding audit hourly stats: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+pytest設定ファイル（サービス層の単体テスト用）
+
+サービスクラスには一時ファイルのSQLiteに接続したセッションを渡す
+バックグラウンド書き込み等、モジュールの SessionLocal を直接使う処理は
+test_session_factory で差し替える
+"""
+
+import os
+import sys
+import tempfile
+from typing import Generator
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.database import Base
+from app.models import *  # 全モデルをインポート
+from app.models.user import User, UserSession, UserAccessLog, AuditHourlyStat  # 認証系モデル
+
+
+@pytest.fixture(scope="function")
+def test_engine():
+    """テスト用SQLiteエンジン作成（テストごとに空のデータベース）"""
+    temp_db = tempfile.NamedTemporaryFile(delete=False, suffix=".db")
+    engine = create_engine(
+        f"sqlite:///{temp_db.name}",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+
+    yield engine
+
+    engine.dispose()
+    temp_db.close()
+    os.unlink(temp_db.name)
+
+
+@pytest.fixture(scope="function")
+def test_session_factory(test_engine):
+    """テスト用セッションファクトリー"""
+    return sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
+
+
+@pytest.fixture(scope="function")
+def test_session(test_session_factory) -> Generator:
+    """テスト用セッション作成"""
+    session = test_session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,119 @@
+"""
+アクティビティログサービスのテスト
+キーセット方式のページング（カーソル）と、ログ記録時の列の対応付けを確認する
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.activity import ActivityLevel, ActivityLog, ActivityType
+from app.services.activity_service import ActivityService
+
+
+@pytest.fixture
+def activity_logs(test_session):
+    """作成日時の重複を含むログ7件（新しい順の id 一覧を返す）"""
+    base = datetime(2026, 10, 1, 12, 0, 0)
+    # 同一日時の行を含め、(created_at, id) の複合キーで順序が決まることを確認する
+    offsets = [0, 0, 0, 1, 2, 2, 3]
+    logs = [
+        ActivityLog(
+            activity_type=ActivityType.OTHER,
+            activity_level=ActivityLevel.INFO,
+            description=f"テストログ{i}",
+            created_at=base + timedelta(minutes=offset)
+        )
+        for i, offset in enumerate(offsets)
+    ]
+    test_session.add_all(logs)
+    test_session.commit()
+    return [log.id for log in sorted(logs, key=lambda log: (log.created_at, log.id), reverse=True)]
+
+
+class TestActivityLogCursor:
+    """キーセット方式のページング"""
+
+    @pytest.mark.asyncio
+    async def test_cursor_pages_cover_all_logs_once(self, test_session, activity_logs):
+        """カーソルで辿ると全件を重複・欠落なく新しい順に取得できる"""
+        service = ActivityService(test_session)
+
+        first = await service.get_activity_logs(per_page=3)
+        seen = [log.id for log in first.logs]
+        cursor = first.next_cursor
+        while cursor:
+            page = await service.get_activity_logs(per_page=3, cursor=cursor)
+            assert page.total_count is None
+            seen.extend(log.id for log in page.logs)
+            cursor = page.next_cursor
+
+        assert seen == activity_logs
+
+    @pytest.mark.asyncio
+    async def test_last_page_has_no_cursor(self, test_session, activity_logs):
+        """件数ちょうどで終わるページでは次ページカーソルを返さない"""
+        service = ActivityService(test_session)
+
+        page = await service.get_activity_logs(per_page=len(activity_logs))
+
+        assert page.next_cursor is None
+        assert page.has_next is False
+        assert page.total_count == len(activity_logs)
+
+    @pytest.mark.asyncio
+    async def test_filter_cursor_with_total(self, test_session, activity_logs):
+        """検索でもカーソル指定時は include_total 指定時のみ件数を返す"""
+        service = ActivityService(test_session)
+
+        first = await service.filter_activity_logs(search_query="テストログ", per_page=4)
+        second = await service.filter_activity_logs(search_query="テストログ", per_page=4, cursor=first.next_cursor)
+        counted = await service.filter_activity_logs(
+            search_query="テストログ", per_page=4, cursor=first.next_cursor, include_total=True
+        )
+
+        assert [log.id for log in first.logs + second.logs] == activity_logs
+        assert second.total_count is None
+        assert counted.total_count == len(activity_logs)
+
+    @pytest.mark.asyncio
+    async def test_invalid_cursor_is_rejected(self, test_session, activity_logs):
+        """解析できないカーソルは ValueError"""
+        service = ActivityService(test_session)
+
+        with pytest.raises(ValueError):
+            await service.get_activity_logs(cursor="not-a-cursor")
+
+
+class TestLogActivity:
+    """log_activity の列の対応付け（バッファ未稼働時の即時書き込み）"""
+
+    @pytest.mark.asyncio
+    async def test_failure_action_is_recorded_as_error(self, test_session):
+        """「失敗」で終わる操作は失敗・ERROR として記録する"""
+        service = ActivityService(test_session)
+
+        response = await service.log_activity(
+            action="バックアップ作成失敗",
+            details="エラー: disk full",
+            user_id="system",
+            target_id=42
+        )
+
+        assert response.activity_type == ActivityType.DATA_BACKUP
+        assert response.activity_level == ActivityLevel.ERROR
+        assert response.is_success is False
+        assert response.description == "バックアップ作成失敗"
+        assert response.details == {"message": "エラー: disk full"}
+        assert response.error_message == "エラー: disk full"
+        assert response.target_id == "42"
+
+    @pytest.mark.asyncio
+    async def test_unknown_action_falls_back_to_other(self, test_session):
+        """種別を判定できない操作は OTHER として記録する"""
+        service = ActivityService(test_session)
+
+        response = await service.log_activity(action="会員一覧取得", details="取得件数: 10件", user_id="system")
+
+        assert response.activity_type == ActivityType.OTHER
+        assert response.activity_level == ActivityLevel.INFO
+        assert response.is_success is True
@@ -0,0 +1,119 @@
+"""
+ログアウト時のセッション照合テスト
+トークンのハッシュで照合し、ハッシュ未設定の旧セッションのみ先頭50文字で照合することを確認する
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.security import security
+from app.models.user import User, UserRole, UserSession, UserStatus
+from app.services.auth_service import AuthService
+
+# JWTはヘッダー部が共通のため、先頭50文字が一致する別トークンを用意する
+_SHARED_PREFIX = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJzdWIiOiIxIiwi"
+TOKEN_A = _SHARED_PREFIX + "token-a.signature"
+TOKEN_B = _SHARED_PREFIX + "token-b.signature"
+
+
+@pytest.fixture
+def user(test_session):
+    user = User(
+        username="session01",
+        email="session01@example.com",
+        hashed_password="not-used",
+        role=UserRole.VIEWER,
+        status=UserStatus.ACTIVE,
+        is_active=True
+    )
+    test_session.add(user)
+    test_session.commit()
+    return user
+
+
+def _add_session(db, user, session_token, session_token_hash):
+    session = UserSession(
+        user_id=user.id,
+        session_token=session_token,
+        session_token_hash=session_token_hash,
+        expires_at=datetime.utcnow() + timedelta(hours=1),
+        is_active=True
+    )
+    db.add(session)
+    db.commit()
+    return session
+
+
+async def _logout(db, user, token, all_devices=False):
+    return await AuthService().logout_user(
+        user.id, token, all_devices, ip_address="127.0.0.1", user_agent="pytest", db=db
+    )
+
+
+class TestLogoutSessionLookup:
+    """logout_user のセッション照合"""
+
+    @pytest.mark.asyncio
+    async def test_revokes_session_by_token_hash(self, test_session, user):
+        """ハッシュが一致するセッションを無効化する"""
+        session = _add_session(test_session, user, TOKEN_A[:50], security.hash_session_token(TOKEN_A))
+
+        revoked_ids = await _logout(test_session, user, TOKEN_A)
+
+        assert revoked_ids == [session.id]
+        test_session.refresh(session)
+        assert session.is_active is False
+        assert session.revoked_reason == "ログアウト"
+
+    @pytest.mark.asyncio
+    async def test_prefix_match_does_not_revoke_hashed_session(self, test_session, user):
+        """先頭50文字が同じ別トークンでは、ハッシュ設定済みのセッションを無効化しない"""
+        session = _add_session(test_session, user, TOKEN_A[:50], security.hash_session_token(TOKEN_A))
+
+        revoked_ids = await _logout(test_session, user, TOKEN_B)
+
+        assert revoked_ids == []
+        test_session.refresh(session)
+        assert session.is_active is True
+
+    @pytest.mark.asyncio
+    async def test_legacy_session_falls_back_to_token_prefix(self, test_session, user):
+        """ハッシュ未設定の旧セッションは先頭50文字で照合する"""
+        session = _add_session(test_session, user, TOKEN_A[:50], None)
+
+        revoked_ids = await _logout(test_session, user, TOKEN_A)
+
+        assert revoked_ids == [session.id]
+        test_session.refresh(session)
+        assert session.is_active is False
+
+    @pytest.mark.asyncio
+    async def test_legacy_fallback_is_scoped_to_user(self, test_session, user):
+        """旧方式の照合でも他ユーザーのセッションは無効化しない"""
+        other = User(
+            username="session02",
+            email="session02@example.com",
+            hashed_password="not-used",
+            role=UserRole.VIEWER,
+            status=UserStatus.ACTIVE,
+            is_active=True
+        )
+        test_session.add(other)
+        test_session.commit()
+        session = _add_session(test_session, other, TOKEN_A[:50], None)
+
+        revoked_ids = await _logout(test_session, user, TOKEN_A)
+
+        assert revoked_ids == []
+        test_session.refresh(session)
+        assert session.is_active is True
+
+    @pytest.mark.asyncio
+    async def test_all_devices_revokes_every_session(self, test_session, user):
+        """全デバイスログアウトはハッシュの有無に関わらず全セッションを無効化する"""
+        hashed = _add_session(test_session, user, TOKEN_A[:50], security.hash_session_token(TOKEN_A))
+        legacy = _add_session(test_session, user, "legacy-session-token", None)
+
+        revoked_ids = await _logout(test_session, user, TOKEN_A, all_devices=True)
+
+        assert sorted(revoked_ids) == sorted([hashed.id, legacy.id])
@@ -0,0 +1,102 @@
+"""
+バックアップ一覧インデックスのテスト
+登録済みのファイルはメタデータを読み直さず、実ファイルとの差分のみ反映することを確認する
+"""
+import json
+import zipfile
+
+import pytest
+
+from app.services.data_service import DataService
+
+
+def _write_backup(backup_dir, backup_name, backup_type="full"):
+    """metadata.json を持つバックアップファイルを作成"""
+    path = backup_dir / f"{backup_name}.zip"
+    with zipfile.ZipFile(path, "w") as zipf:
+        zipf.writestr("metadata.json", json.dumps({
+            "backup_name": backup_name,
+            "backup_type": backup_type,
+            "created_at": "2026-10-01T12:00:00",
+            "description": None,
+            "version": "1.0"
+        }))
+    return path
+
+
+@pytest.fixture
+def data_service(test_session, tmp_path):
+    """バックアップ保存先を一時ディレクトリに向けた DataService"""
+    service = DataService(test_session)
+    service.backup_dir = tmp_path
+    service.backup_index_path = tmp_path / ".index.json"
+    return service
+
+
+def _read_index(service):
+    return json.loads(service.backup_index_path.read_text(encoding="utf-8"))
+
+
+class TestBackupIndex:
+    """list_backups とインデックス"""
+
+    @pytest.mark.asyncio
+    async def test_first_listing_builds_index(self, data_service, tmp_path):
+        """未登録のファイルはメタデータを読み込んでインデックスへ登録する"""
+        _write_backup(tmp_path, "backup_a")
+        _write_backup(tmp_path, "backup_b", backup_type="members")
+
+        backups = await data_service.list_backups()
+
+        assert sorted(b.file_name for b in backups) == ["backup_a.zip", "backup_b.zip"]
+        assert set(_read_index(data_service)) == {"backup_a.zip", "backup_b.zip"}
+        assert _read_index(data_service)["backup_b.zip"]["backup_type"] == "members"
+
+    @pytest.mark.asyncio
+    async def test_indexed_files_are_not_reopened(self, data_service, tmp_path, monkeypatch):
+        """登録済みのファイルはアーカイブを開かずにインデックスから返す"""
+        _write_backup(tmp_path, "backup_a")
+        await data_service.list_backups()
+
+        def fail(entry):
+            raise AssertionError(f"登録済みのファイルを読み込みました: {entry.name}")
+        monkeypatch.setattr(data_service, "_read_backup_metadata", fail)
+
+        backups = await data_service.list_backups()
+
+        assert [b.file_name for b in backups] == ["backup_a.zip"]
+
+    @pytest.mark.asyncio
+    async def test_deleted_files_are_removed_from_index(self, data_service, tmp_path):
+        """削除されたファイルのエントリはインデックスから除去する"""
+        _write_backup(tmp_path, "backup_a")
+        removed = _write_backup(tmp_path, "backup_b")
+        await data_service.list_backups()
+
+        removed.unlink()
+        backups = await data_service.list_backups()
+
+        assert [b.file_name for b in backups] == ["backup_a.zip"]
+        assert set(_read_index(data_service)) == {"backup_a.zip"}
+
+    @pytest.mark.asyncio
+    async def test_corrupted_index_is_rebuilt(self, data_service, tmp_path):
+        """破損したインデックスは空から再構築する"""
+        _write_backup(tmp_path, "backup_a")
+        data_service.backup_index_path.write_text("{not json", encoding="utf-8")
+
+        backups = await data_service.list_backups()
+
+        assert [b.file_name for b in backups] == ["backup_a.zip"]
+        assert set(_read_index(data_service)) == {"backup_a.zip"}
+
+    @pytest.mark.asyncio
+    async def test_unreadable_archive_is_skipped(self, data_service, tmp_path):
+        """メタデータを読めないファイルは一覧・インデックスに含めない"""
+        _write_backup(tmp_path, "backup_a")
+        (tmp_path / "broken.zip").write_bytes(b"not a zip file")
+
+        backups = await data_service.list_backups()
+
+        assert [b.file_name for b in backups] == ["backup_a.zip"]
+        assert set(_read_index(data_service)) == {"backup_a.zip"}
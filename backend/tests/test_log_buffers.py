@@ -0,0 +1,156 @@
+"""
+監査ログ・アクティビティログの一括書き込みバッファのテスト
+満杯時の破棄、停止時の書き出し、不正な行の隔離を確認する
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.models.activity import ActivityLevel, ActivityLog, ActivityType
+from app.models.user import UserAccessLog
+from app.services import activity_service, audit_service
+from app.services.activity_service import ActivityLogBuffer
+from app.services.audit_service import AuditLogBuffer
+
+
+def _activity_row(description):
+    return {
+        "activity_type": ActivityType.OTHER,
+        "activity_level": ActivityLevel.INFO,
+        "user_id": "system",
+        "ip_address": "127.0.0.1",
+        "user_agent": "pytest",
+        "target_id": None,
+        "description": description,
+        "details": {"message": "test"},
+        "is_success": True,
+        "error_message": None,
+        "created_at": datetime(2026, 10, 1, 12, 0, 0)
+    }
+
+
+def _access_row(action):
+    return {
+        "user_id": 1,
+        "action": action,
+        "ip_address": "192.168.0.1",
+        "user_agent": "pytest",
+        "path": "/api/v1/auth/login",
+        "method": "POST",
+        "success": True,
+        "error_message": None,
+        "created_at": datetime(2026, 10, 1, 12, 0, 0)
+    }
+
+
+@pytest.fixture
+def recorded_batches(monkeypatch):
+    """_write_batch を差し替え、書き込まれたバッチを記録する"""
+    batches = []
+    monkeypatch.setattr(ActivityLogBuffer, "_write_batch", lambda self, batch: batches.append(list(batch)))
+    monkeypatch.setattr(AuditLogBuffer, "_write_batch", lambda self, batch: batches.append(list(batch)))
+    return batches
+
+
+@pytest.fixture
+def dedicated_connection(monkeypatch):
+    """接続を共有しない環境（PostgreSQL等）として扱う"""
+    monkeypatch.setattr(activity_service, "SHARED_CONNECTION", False)
+    monkeypatch.setattr(audit_service, "SHARED_CONNECTION", False)
+
+
+class TestActivityLogBuffer:
+    """ActivityLogBuffer"""
+
+    @pytest.mark.asyncio
+    async def test_not_started_on_shared_connection(self, monkeypatch):
+        """接続共有環境では開始せず、put は即時書き込みへの切り替えを促す"""
+        monkeypatch.setattr(activity_service, "SHARED_CONNECTION", True)
+        buffer = ActivityLogBuffer(batch_size=10, batch_ms=10, max_queue_size=10)
+
+        buffer.start()
+
+        assert buffer.is_running is False
+        assert buffer.put(_activity_row("log")) is False
+
+    @pytest.mark.asyncio
+    async def test_drops_when_full_and_flushes_on_stop(self, dedicated_connection, recorded_batches):
+        """満杯時は破棄して計上し、停止時はキューに残った分を全て書き出す"""
+        buffer = ActivityLogBuffer(batch_size=10, batch_ms=60000, max_queue_size=3)
+        buffer.start()
+
+        # 書き込みタスクに制御を渡さずに積むため、4件目は満杯で破棄される
+        results = [buffer.put(_activity_row(f"log{i}")) for i in range(4)]
+        await buffer.stop()
+
+        assert results == [True, True, True, True]
+        assert buffer.dropped_count == 1
+        assert [row["description"] for batch in recorded_batches for row in batch] == ["log0", "log1", "log2"]
+        assert buffer.put(_activity_row("after-stop")) is False
+
+    @pytest.mark.asyncio
+    async def test_flushes_by_batch_size(self, dedicated_connection, recorded_batches):
+        """件数に達したバッチは経過時間を待たずに書き込む"""
+        buffer = ActivityLogBuffer(batch_size=2, batch_ms=60000, max_queue_size=10)
+        buffer.start()
+
+        for i in range(4):
+            buffer.put(_activity_row(f"log{i}"))
+        for _ in range(100):
+            if len(recorded_batches) == 2:
+                break
+            await asyncio.sleep(0.01)
+
+        assert [len(batch) for batch in recorded_batches] == [2, 2]
+        await buffer.stop()
+
+    def test_failed_batch_is_retried_row_by_row(self, monkeypatch, test_session, test_session_factory):
+        """一括書き込みに失敗した場合、書き込める行は残し、不正な行のみ隔離する"""
+        monkeypatch.setattr(activity_service, "SessionLocal", test_session_factory)
+        buffer = ActivityLogBuffer(batch_size=10, batch_ms=10, max_queue_size=10)
+
+        buffer._write_batch([_activity_row("valid"), _activity_row(None)])
+
+        assert buffer.failed_count == 1
+        assert [log.description for log in test_session.query(ActivityLog).all()] == ["valid"]
+
+
+class TestAuditLogBuffer:
+    """AuditLogBuffer"""
+
+    @pytest.mark.asyncio
+    async def test_not_started_on_shared_connection(self, monkeypatch):
+        """接続共有環境では書き込みスレッドを開始しない"""
+        monkeypatch.setattr(audit_service, "SHARED_CONNECTION", True)
+        buffer = AuditLogBuffer(batch_size=10, batch_ms=10, max_queue_size=10)
+
+        buffer.start()
+
+        assert buffer.is_running is False
+        assert buffer.put(_access_row("login_success")) is False
+
+    @pytest.mark.asyncio
+    async def test_drops_when_full_and_flushes_on_stop(self, dedicated_connection, recorded_batches):
+        """満杯時は破棄して計上し、停止時は残り全件をバッチ件数ごとに書き出す"""
+        # 件数・経過時間のどちらにも達しないため、停止までスレッドは書き込まない
+        buffer = AuditLogBuffer(batch_size=100, batch_ms=60000, max_queue_size=3)
+        buffer.start()
+
+        results = [buffer.put(_access_row(f"action{i}")) for i in range(4)]
+        await buffer.stop()
+
+        assert results == [True, True, True, True]
+        assert buffer.dropped_count == 1
+        assert [row["action"] for batch in recorded_batches for row in batch] == ["action0", "action1", "action2"]
+        assert buffer.put(_access_row("after-stop")) is False
+
+    def test_invalid_rows_are_quarantined(self, monkeypatch, test_session, test_session_factory):
+        """必須項目が欠けた行は事前に隔離し、残りの行は書き込む"""
+        monkeypatch.setattr(audit_service, "SessionLocal", test_session_factory)
+        buffer = AuditLogBuffer(batch_size=10, batch_ms=10, max_queue_size=10)
+
+        buffer._write_batch([_access_row("login_success"), _access_row(None)])
+
+        assert buffer.failed_count == 1
+        assert [log.action for log in test_session.query(UserAccessLog).all()] == ["login_success"]
@@ -0,0 +1,119 @@
+"""
+権限キャッシュのテスト
+ロール・有効状態の変更や権限の再初期化の後に、古い権限判定が残らないことを確認する
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.user import User, UserRole, UserStatus
+from app.schemas.auth import UserUpdate
+from app.services import permission_service as permission_module
+from app.services.auth_service import AuthService
+from app.services.permission_service import (
+    PermissionsCache,
+    permission_service,
+    role_permissions_cache,
+    user_permissions_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_permission_caches():
+    """テスト間でプロセス内キャッシュを持ち越さない"""
+    role_permissions_cache.clear()
+    user_permissions_cache.clear()
+    yield
+    role_permissions_cache.clear()
+    user_permissions_cache.clear()
+
+
+@pytest.fixture
+def viewer(test_session):
+    """閲覧者ロールのテストユーザー"""
+    user = User(
+        username="viewer01",
+        email="viewer01@example.com",
+        hashed_password="not-used",
+        role=UserRole.VIEWER,
+        status=UserStatus.ACTIVE,
+        is_active=True
+    )
+    test_session.add(user)
+    test_session.commit()
+    return user
+
+
+class TestPermissionsCache:
+    """PermissionsCache 単体"""
+
+    def test_entry_expires_after_ttl(self, monkeypatch):
+        """TTL経過後のエントリは返さない"""
+        clock = SimpleNamespace(now=1000.0)
+        monkeypatch.setattr(permission_module, "time", SimpleNamespace(monotonic=lambda: clock.now))
+
+        cache = PermissionsCache(ttl_seconds=60)
+        cache.set("key", "value")
+        assert cache.get("key") == "value"
+
+        clock.now += 61
+        assert cache.get("key") is None
+
+    def test_invalidate_removes_only_target_key(self):
+        """invalidate は指定キーのみ破棄する"""
+        cache = PermissionsCache(ttl_seconds=60)
+        cache.set(1, frozenset({"member.view"}))
+        cache.set(2, frozenset({"member.view"}))
+
+        cache.invalidate(1)
+
+        assert cache.get(1) is None
+        assert cache.get(2) == frozenset({"member.view"})
+
+
+class TestPermissionsCacheInvalidation:
+    """権限・ユーザー更新時のキャッシュ破棄"""
+
+    @pytest.mark.asyncio
+    async def test_update_user_role_invalidates_user_cache(self, test_session, viewer):
+        """ロール変更後は新しいロールの権限で判定される"""
+        await permission_service.initialize_permissions(test_session)
+        auth_service = AuthService()
+
+        assert not await auth_service.check_permission(viewer.id, "member.manage", test_session)
+        assert user_permissions_cache.get(viewer.id) is not None
+
+        await auth_service.update_user(
+            viewer.id, UserUpdate(role=UserRole.MLM_MANAGER), updated_by=viewer.id, db=test_session
+        )
+
+        assert user_permissions_cache.get(viewer.id) is None
+        assert await auth_service.check_permission(viewer.id, "member.manage", test_session)
+
+    @pytest.mark.asyncio
+    async def test_update_user_profile_keeps_user_cache(self, test_session, viewer):
+        """権限に影響しない項目の更新ではキャッシュを破棄しない"""
+        await permission_service.initialize_permissions(test_session)
+        auth_service = AuthService()
+        await auth_service.check_permission(viewer.id, "member.view", test_session)
+
+        await auth_service.update_user(
+            viewer.id, UserUpdate(full_name="閲覧 太郎"), updated_by=viewer.id, db=test_session
+        )
+
+        assert user_permissions_cache.get(viewer.id) is not None
+
+    @pytest.mark.asyncio
+    async def test_initialize_permissions_clears_caches(self, test_session, viewer):
+        """権限の再初期化でロール別・ユーザー別のキャッシュを全て破棄する"""
+        role_permissions_cache.set(UserRole.VIEWER, ("stale.permission",))
+        user_permissions_cache.set(viewer.id, frozenset({"stale.permission"}))
+
+        await permission_service.initialize_permissions(test_session)
+
+        assert role_permissions_cache.get(UserRole.VIEWER) is None
+        assert user_permissions_cache.get(viewer.id) is None
+
+        permissions = await AuthService().get_user_permissions(viewer.id, test_session)
+        assert "member.view" in permissions
+        assert "stale.permission" not in permissions
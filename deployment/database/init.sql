@@ -184,17 +184,38 @@ CREATE TABLE payouts (
     updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
--- アクティビティログテーブル
+-- アクティビティログテーブル（created_at による月別レンジパーティション）
 CREATE TABLE activity_logs (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     user_id VARCHAR(50),
     activity_type VARCHAR(100) NOT NULL,
     description TEXT NOT NULL,
     target_member_id INTEGER,
     ip_address INET,
     user_agent TEXT,
-    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    search_blob TEXT GENERATED ALWAYS AS (coalesce(description, '') || ' ' || coalesce(host(ip_address), '')) STORED,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- アクティビティログ月別パーティション作成関数
+CREATE OR REPLACE FUNCTION create_activity_logs_partition(target_month DATE)
+RETURNS void AS $$
+DECLARE
+    start_date DATE := date_trunc('month', target_month)::date;
+    end_date DATE := (date_trunc('month', target_month) + INTERVAL '1 month')::date;
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF activity_logs FOR VALUES FROM (%L) TO (%L)',
+        'activity_logs_' || to_char(start_date, 'YYYY_MM'), start_date, end_date
+    );
+END;
+$$ language 'plpgsql';
+
+-- 当月から3か月分のパーティションを作成（以降はアプリケーションが起動時・日次で事前作成: ACTIVITY_LOG_PARTITION_MONTHS_AHEAD）
+SELECT create_activity_logs_partition((CURRENT_DATE + make_interval(months => n))::date)
+FROM generate_series(0, 2) AS n;
+CREATE TABLE activity_logs_default PARTITION OF activity_logs DEFAULT;
 
 -- 組織調整履歴テーブル
 CREATE TABLE organization_adjustments (
@@ -242,7 +263,13 @@ CREATE INDEX idx_payouts_status ON payouts(status);
 -- アクティビティログテーブル用インデックス
 CREATE INDEX idx_activity_logs_user_id ON activity_logs(user_id);
 CREATE INDEX idx_activity_logs_activity_type ON activity_logs(activity_type);
-CREATE INDEX idx_activity_logs_created_at ON activity_logs(created_at);
+-- 追記のみで時系列順に並ぶため、期間検索はBRINで十分（B-treeより大幅に小さい）
+CREATE INDEX idx_activity_logs_created_at_brin ON activity_logs USING brin (created_at) WITH (pages_per_range = 32);
+-- 一覧表示（新しい順）のページング用複合インデックス
+CREATE INDEX idx_activity_logs_created_at_id ON activity_logs(created_at DESC, id DESC);
+-- 部分一致検索（ILIKE '%...%'）用トライグラムインデックス
+CREATE INDEX idx_activity_logs_search_blob_trgm ON activity_logs USING gin (search_blob gin_trgm_ops);
+CREATE INDEX idx_activity_logs_user_id_trgm ON activity_logs USING gin (user_id gin_trgm_ops);
 
 -- 組織調整履歴テーブル用インデックス
 CREATE INDEX idx_organization_adjustments_member_id ON organization_adjustments(member_id);